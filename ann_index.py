@@ -0,0 +1,198 @@
+import argparse
+import os
+import time
+import numpy as np
+from catalog import Catalog, normalize_rows
+
+# --- IVF-FLAT ANN INDEX ---
+# Product vectors are clustered with spherical k-means into `nlist` coarse
+# lists. A query only scans the rows of the `nprobe` lists whose centroids are
+# closest to it, so the cost per search is ~ nprobe / nlist of an exact scan.
+# embed_products.py builds the index at ingest time and saves it next to the
+# DB (product_search.ivf.npz); both search paths load it when present.
+
+# Searches only go through the index once the catalog is big enough for a
+# brute-force scan to hurt; below that the exact scan is used.
+ANN_NPROBE = int(os.environ.get("ANN_NPROBE", 8))
+ANN_MIN_ROWS = int(os.environ.get("ANN_MIN_ROWS", 50000))
+
+TRAIN_POINTS_PER_LIST = 256 # k-means is trained on a sample, like faiss does
+ASSIGN_CHUNK = 65536
+
+class IVFIndex:
+    def __init__(self, centroids, offsets, ids):
+        self.centroids = centroids  # (nlist, dim) float32, unit-norm
+        self.offsets = offsets      # (nlist + 1,) start of each list in `ids`
+        self.ids = ids              # product_ids grouped by list
+        self.rows = None            # same entries as catalog row positions (see bind)
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, vectors, product_ids, nlist=None, iters=20, seed=0, vector_rows=None):
+        # vector_rows: product -> row of `vectors` when products share vectors
+        # (Catalog.vector_rows); clustering then runs on the distinct vectors only
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        if nlist is None:
+            nlist = default_nlist(len(product_ids))
+        nlist = max(1, min(nlist, len(vectors)))
+
+        centroids = kmeans(vectors, nlist, iters=iters, seed=seed)
+        assign = assign_lists(vectors, centroids)
+        if vector_rows is not None:
+            assign = assign[vector_rows]
+        order = np.argsort(assign, kind='stable')
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assign, minlength=nlist))
+        return cls(centroids, offsets, product_ids[order])
+
+    @classmethod
+    def build_for_catalog(cls, catalog, nlist=None):
+        return cls.build(catalog.matrix, catalog.product_ids, nlist=nlist, vector_rows=catalog.vector_rows)
+
+    def save(self, path):
+        # np.savez appends .npz unless it is already there
+        np.savez(path, centroids=self.centroids, offsets=self.offsets, ids=self.ids)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['centroids'], data['offsets'], data['ids'])
+
+    def bind(self, catalog_ids):
+        # Translate the stored product_ids into row positions of a loaded catalog.
+        # Returns False when the index was built for a different set of products.
+        catalog_ids = np.asarray(catalog_ids, dtype=np.int64)
+        if len(catalog_ids) != len(self.ids):
+            return False
+        order = np.argsort(catalog_ids)
+        pos = np.searchsorted(catalog_ids[order], self.ids)
+        pos[pos == len(order)] = 0
+        if not np.array_equal(catalog_ids[order][pos], self.ids):
+            return False
+        self.rows = order[pos]
+        return True
+
+    def probe(self, query_vector, nprobe=ANN_NPROBE):
+        # Positions (into self.ids / self.rows) of every entry in the nprobe closest lists
+        q = np.asarray(query_vector, dtype=np.float32)
+        nprobe = max(1, min(nprobe, self.nlist))
+        centroid_scores = self.centroids @ q
+        if nprobe < self.nlist:
+            lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            lists = np.arange(self.nlist)
+        return np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+
+    def probe_ids(self, query_vector, nprobe=ANN_NPROBE):
+        return self.ids[self.probe(query_vector, nprobe)]
+
+    def probe_rows(self, query_vector, nprobe=ANN_NPROBE):
+        # Catalog rows to score, in catalog order (keeps tie-breaks identical to a full scan)
+        return np.sort(self.rows[self.probe(query_vector, nprobe)])
+
+# --- HELPERS ---
+def index_path_for(db_path):
+    return os.path.splitext(db_path)[0] + ".ivf.npz"
+
+def load_index(db_path):
+    path = index_path_for(db_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        return IVFIndex.load(path)
+    except Exception as e:
+        print(f"Error loading ANN index {path}: {e}")
+        return None
+
+def default_nlist(n):
+    return max(1, int(round(np.sqrt(n))))
+
+def assign_lists(vectors, centroids):
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        chunk = vectors[start:start + ASSIGN_CHUNK]
+        assign[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assign
+
+def kmeans(vectors, k, iters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), k * TRAIN_POINTS_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+    centroids = sample[rng.choice(len(sample), k, replace=False)].copy()
+    for _ in range(iters):
+        assign = assign_lists(sample, centroids)
+        order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=k)
+        filled = np.flatnonzero(counts)
+        sums = np.add.reduceat(sample[order], np.concatenate(([0], np.cumsum(counts)[:-1]))[filled], axis=0)
+        centroids[filled] = normalize_rows(sums)
+        # Re-seed empty lists with random sample points
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+    return centroids
+
+# --- RECALL / LATENCY REPORT ---
+def recall_report(db_path, num_queries=200, k=10, noise=0.5, seed=0):
+    # Queries are perturbed product vectors, so the report needs no model download.
+    catalog = Catalog.from_db(db_path)
+    index = load_index(db_path)
+    if index is None or not index.bind(catalog.product_ids):
+        print("No up-to-date ANN index found, building one in memory...")
+        index = IVFIndex.build_for_catalog(catalog)
+        index.bind(catalog.product_ids)
+
+    rng = np.random.default_rng(seed)
+    picks = catalog.vector_rows[rng.choice(len(catalog), min(num_queries, len(catalog)), replace=False)]
+    queries = normalize_rows(catalog.matrix[picks] + noise * rng.standard_normal((len(picks), catalog.matrix.shape[1]), dtype=np.float32) / np.sqrt(catalog.matrix.shape[1]))
+
+    # The catalog has many identical vectors, so a hit is any returned row that
+    # scores at least as high as the exact k-th best (tie-aware recall).
+    exact_kth, exact_ms = [], []
+    for q in queries:
+        start = time.perf_counter()
+        scores = catalog.semantic_scores(q)
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        exact_ms.append((time.perf_counter() - start) * 1000)
+        exact_kth.append(kth)
+
+    print(f"Catalog: {len(catalog)} products, nlist={index.nlist}, {len(queries)} queries, recall@{k}")
+    print(f"{'nprobe':>8} {'recall':>8} {'p50 ms':>8} {'p95 ms':>8} {'scanned':>9}")
+    print(f"{'exact':>8} {1.0:>8.3f} {np.percentile(exact_ms, 50):>8.3f} {np.percentile(exact_ms, 95):>8.3f} {100.0:>8.1f}%")
+
+    nprobes = sorted({p for p in (1, 2, 4, 8, 16, 32, 64) if p < index.nlist} | {index.nlist})
+    for nprobe in nprobes:
+        hits, latencies, scanned = 0, [], 0
+        for q, kth in zip(queries, exact_kth):
+            start = time.perf_counter()
+            rows = index.probe_rows(q, nprobe)
+            scores = catalog.semantic_scores(q, rows)
+            top = np.argpartition(-scores, min(k, len(rows)) - 1)[:k]
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += int(np.sum(scores[top] >= kth - 1e-6))
+            scanned += len(rows)
+        recall = hits / (k * len(queries))
+        print(f"{nprobe:>8} {recall:>8.3f} {np.percentile(latencies, 50):>8.3f} {np.percentile(latencies, 95):>8.3f} {100.0 * scanned / (len(queries) * len(catalog)):>8.1f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or evaluate the IVF ANN index")
+    parser.add_argument('command', choices=['build', 'report'])
+    parser.add_argument('db_path', nargs='?', default='product_search.db')
+    parser.add_argument('--nlist', type=int, default=None)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        catalog = Catalog.from_db(args.db_path)
+        IVFIndex.build_for_catalog(catalog, nlist=args.nlist).save(index_path_for(args.db_path))
+        print(f"ANN index saved to {index_path_for(args.db_path)}")
+    else:
+        recall_report(args.db_path, num_queries=args.queries)
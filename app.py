@@ -1,36 +1,31 @@
 import gradio as gr
-import json
+import os
 import time
 
 # --- IMPORT BACKEND ---
+# The search engine runs in this process: expert_search returns result
+# objects directly (no JSON round trip through lambda_handler)
 try:
-    from lambda_handler import lambda_handler
+    from lambda_handler import expert_search as engine_search
+    from query_cache import LRUCache
 except ImportError:
-    lambda_handler = None
+    engine_search = None
+
+CARD_CACHE_SIZE = int(os.environ.get("CARD_CACHE_SIZE", 4096))       # Rendered product cards kept
+GRADIO_CONCURRENCY = int(os.environ.get("GRADIO_CONCURRENCY", 4))    # Searches running at once
+GRADIO_QUEUE_SIZE = int(os.environ.get("GRADIO_QUEUE_SIZE", 64))     # Waiting requests before new ones are refused
 
 # --- EXPERT SEARCH LOGIC ---
 def expert_search(query_text, min_p, max_p, cat):
     start = time.time()
     if not query_text: return "Please enter a product name.", ""
-    
-    event = {
-        "query": query_text,
-        "min_price": min_p,
-        "max_price": max_p,
-        "category": cat
-    }
-    
-    results = []
-    if lambda_handler:
-        try:
-            resp = lambda_handler(event, None)
-            if resp.get('statusCode') != 200:
-                return f"Error: {resp.get('body')}", ""
-            results = json.loads(resp['body'])
-        except Exception as e:
-            return f"Error: {str(e)}", ""
-    else:
-        results = [{"error": "Backend Disconnected"}]
+    if engine_search is None:
+        return "Error: Backend Disconnected", ""
+
+    try:
+        results = engine_search(query_text, min_p, max_p, cat)
+    except Exception as e:
+        return f"Error: {str(e)}", ""
         
     dur = round(time.time() - start, 2)
     html = generate_expert_cards(results)
@@ -40,64 +35,86 @@ def expert_search(query_text, min_p, max_p, cat):
         
     return f"Found {len(results)} expert recommendations in {dur}s.", html
 
-def generate_expert_cards(results):
-    html = "<div style='display: flex; flex-direction: column; gap: 15px;'>"
-    if not isinstance(results, list): return str(results)
-    
-    for idx, item in enumerate(results):
-        name = item.get('product_name', 'Unknown')
-        price = int(item.get('price', 0)) # FORCE INT
-        specs = item.get('specifications', 'No Specs')
-        rating = item.get('rating', 0)
-        score = item.get('score', 0)
-        
-        # UI Logic
-        badge = ""
-        border_color = "#ddd"
-        bg_color = "white"
-        
-        if idx == 0:
-            badge = "<div style='background: #FFD700; color: #000; font-weight: bold; padding: 4px 10px; border-radius: 4px; display: inline-block; margin-bottom: 8px;'>🏆 AI BEST CHOICE</div>"
-            border_color = "#FFD700"
-            bg_color = "#fffbe6"
-        elif rating >= 4.5:
-             badge = "<div style='background: #2ecc71; color: white; font-size: 11px; padding: 3px 8px; border-radius: 4px; display: inline-block; margin-bottom: 8px;'>★ TOP RATED</div>"
-        
-        # High Contrast Specification Pills
-        spec_list = specs.split("|")
-        # Bold text, Darker background pill
-        spec_html = "".join([f"<span style='background: #e3f2fd; color: #1565c0; padding: 4px 8px; border-radius: 6px; font-size: 13px; font-weight: 600; margin-right: 8px; display:inline-block; margin-bottom:4px;'>{s.strip()}</span>" for s in spec_list])
+# --- CARD RENDERING ---
+# The name, spec pills, price and rating of a card never change for a given
+# catalog version, so that HTML is rendered once per product and cached by
+# (catalog version, product_id). A request only fills in the border, badge
+# and match score around it.
+card_cache = LRUCache(maxsize=CARD_CACHE_SIZE) if engine_search is not None else None
 
-        html += f"""
+BEST_CHOICE_BADGE = "<div style='background: #FFD700; color: #000; font-weight: bold; padding: 4px 10px; border-radius: 4px; display: inline-block; margin-bottom: 8px;'>🏆 AI BEST CHOICE</div>"
+TOP_RATED_BADGE = "<div style='background: #2ecc71; color: white; font-size: 11px; padding: 3px 8px; border-radius: 4px; display: inline-block; margin-bottom: 8px;'>★ TOP RATED</div>"
+# Bold text, Darker background pill
+SPEC_PILL = "<span style='background: #e3f2fd; color: #1565c0; padding: 4px 8px; border-radius: 6px; font-size: 13px; font-weight: 600; margin-right: 8px; display:inline-block; margin-bottom:4px;'>{}</span>"
+
+CARD_HEAD = """
         <div style="border: 2px solid {border_color}; background: {bg_color}; padding: 18px; border-radius: 10px; display: flex; justify-content: space-between; align_items: start; box-shadow: 0 4px 6px rgba(0,0,0,0.05);">
             <div style="flex: 3;">
-                {badge}
+                """
+# Card openings: AI best choice (first result), top rated, plain
+CARD_HEADS = (
+    CARD_HEAD.format(border_color="#FFD700", bg_color="#fffbe6") + BEST_CHOICE_BADGE,
+    CARD_HEAD.format(border_color="#ddd", bg_color="white") + TOP_RATED_BADGE,
+    CARD_HEAD.format(border_color="#ddd", bg_color="white"),
+)
+CARD_BODY = """
                 <h2 style="margin: 0 0 10px 0; color: #2c3e50; font-size: 20px;">{name}</h2>
                 <div style="margin-top: 8px;">{spec_html}</div>
             </div>
             <div style="flex: 1; text-align: right; min-width: 120px;">
                 <div style="font-size: 24px; font-weight: 800; color: #2c3e50;">₹{price:,}</div>
                 <div style="color: #f39c12; font-size: 16px; margin-top: 5px; font-weight: bold;">★ {rating} / 5.0</div>
-                <div style="font-size: 11px; color: #7f8c8d; margin-top: 5px;">Match: {int(score*100)}%</div>
+                <div style="font-size: 11px; color: #7f8c8d; margin-top: 5px;">Match: """
+CARD_TAIL = """%</div>
             </div>
         </div>
         """
-    html += "</div>"
-    return html
+
+def card_body(result):
+    # Static HTML of a product's card (cached)
+    key = (result.version, result.product_id)
+    body = card_cache.get(key)
+    if body is None:
+        item = result.record()
+        # High Contrast Specification Pills
+        specs = item.get('specifications', 'No Specs')
+        spec_html = "".join([SPEC_PILL.format(s.strip()) for s in specs.split("|")])
+        body = CARD_BODY.format(name=item.get('product_name', 'Unknown'), spec_html=spec_html,
+                                price=int(item.get('price', 0)), rating=item.get('rating', 0)) # FORCE INT price
+        card_cache.put(key, body)
+    return body
+
+def generate_expert_cards(results):
+    if not isinstance(results, list): return str(results)
+    
+    cards = []
+    for idx, result in enumerate(results):
+        # UI Logic
+        if idx == 0:
+            cards.append(CARD_HEADS[0])
+        elif result.rating >= 4.5:
+            cards.append(CARD_HEADS[1])
+        else:
+            cards.append(CARD_HEADS[2])
+        cards.append(card_body(result))
+        cards.append(str(int(result.score * 100)))
+        cards.append(CARD_TAIL)
+    return "<div style='display: flex; flex-direction: column; gap: 15px;'>" + "".join(cards) + "</div>"
 
 # --- CHATBOT LOGIC ---
 def chat_response(message, history):
     # Reuse Search to get context
     results = []
-    if lambda_handler:
-        resp = lambda_handler({"query": message}, None)
-        if resp.get('statusCode') == 200:
-            results = json.loads(resp['body'])
+    if engine_search:
+        try:
+            results = engine_search(message, k=1)
+        except Exception:
+            results = []
     
     if not results:
         return "Sorry, I couldn't find any products related to that. Try searching for Laptops, Phones, or FMCG items."
     
-    top = results[0]
+    top = results[0].record()
     return f"Based on your request, I recommend the **{top['product_name']}** (₹{int(top['price']):,}).\n\nIt features: {top['specifications']}.\n\nIs there anything specific you are looking for in terms of specs or price?"
 
 # --- UI ---
@@ -137,6 +154,9 @@ with gr.Blocks(theme=gr.themes.Soft(primary_hue="blue"), title="AI Product Exper
     </div>
     """)
 
+# Requests wait in one queue; up to GRADIO_CONCURRENCY of them run at once
+# instead of one at a time per event
+demo.queue(default_concurrency_limit=GRADIO_CONCURRENCY, max_size=GRADIO_QUEUE_SIZE)
+
 if __name__ == "__main__":
-    import os
     demo.launch(server_name="0.0.0.0", server_port=int(os.getenv("PORT", 7860)))
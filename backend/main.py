@@ -1,11 +1,13 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, Response
 from pydantic import BaseModel
-import sqlite3
-import json
+from typing import List, Optional
 import numpy as np
-from sentence_transformers import SentenceTransformer
+import asyncio
+import threading
+import time
 
 # --- INIT ---
 app = FastAPI(title="AI Product Search API")
@@ -26,139 +28,400 @@ class SearchRequest(BaseModel):
     max_price: int = 500000
     category: str = "All"
 
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchRequest]
+
 class ChatRequest(BaseModel):
     message: str
     context: list = []
+    session_id: Optional[str] = None # Follow-ups re-rank this session's candidates (chat_sessions.py)
 
 # --- GLOBAL VARS ---
+MODEL_NAME = 'all-MiniLM-L6-v2'
+BATCH_QUERY_CHUNK = 64   # Queries scored per matrix product in /search/batch (bounds memory)
 model = None
-# We will load the model on startup to save time
-# (In a real production app, this might be handled differently)
+encoder = None # Micro-batching front for `model`, shared by all request threads
+catalog = None
+ann_index = None
+live_catalog = None # shared_index.LiveCatalog: swaps in newly published index versions
+shards = None       # sharded_search.ShardedSearch when SEARCH_SHARDS >= 2
+_shards_starting = False # A new shard set is being started in the background
+_shards_lock = threading.Lock()
+_model_lock = threading.Lock()
+# We will load the model and the product catalog on startup to save time
+# (LAZY_STARTUP=1 defers the model, and the torch import, to the first search)
 
 # --- DATABASE PATH ---
 import os
+import sys
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "..", "product_search.db")
+ROOT_DIR = os.path.join(BASE_DIR, "..")
+DB_PATH = os.path.join(ROOT_DIR, "product_search.db")
+
+# Shared search modules live at the repo root (next to lambda_handler.py)
+sys.path.insert(0, ROOT_DIR)
+from catalog import top_k, top_k_rows
+from shared_index import get_live_catalog, process_memory
+from hybrid_scoring import EXACT_MATCH_BOOST, KEYWORD_WEIGHT, score_candidates
+from sharded_search import SEARCH_SHARDS, SHARD_MIN_ROWS, ShardedSearch
+from query_cache import encode_queries, encode_query, query_cache
+from batch_encoder import BatchEncoder
+from startup import LAZY_STARTUP, load_model, startup_report
+from response_cache import response_cache, response_key
+from json_fragments import dumps, render_results
+from http_encoding import compressed_cache, encode_body
+from inference_pool import RETRY_AFTER_SECONDS, InferencePool, Overloaded
+from chat_sessions import CHAT_CANDIDATES, ChatSession, get_session, price_range, refine, save_session, sessions
+from quantization import QUANT_MARGIN, QUANT_RESCORE
+import metrics
+from metrics import log_event, stage
+
+inference = InferencePool() # Encoding + scoring for the async endpoints: bounded, sheds load
 
 @app.on_event("startup")
 def load_resources():
-    global model
+    global catalog, ann_index, live_catalog
     print(f"DEBUG: Using DB Path: {DB_PATH}")
     if not os.path.exists(DB_PATH):
         print("CRITICAL ERROR: Database file not found!")
+    else:
+        print("Loading Product Catalog...")
+        try:
+            # Published index (memory-mapped, shared with the other workers) if there is one, else SQLite
+            live_catalog = get_live_catalog(DB_PATH)
+            catalog, ann_index = live_catalog.get()
+            print(f"Worker {os.getpid()} memory: {process_memory()}")
+        except Exception as e:
+            print(f"CRITICAL ERROR: Could not load catalog: {e}")
+
+        if catalog is not None and SEARCH_SHARDS >= 2 and len(catalog) >= SHARD_MIN_ROWS:
+            if start_shards(catalog) is not None:
+                print(f"Sharded search: {SEARCH_SHARDS} shard processes")
     
-    print("Loading AI Model...")
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    print("Model Loaded!")
+    if LAZY_STARTUP:
+        print("LAZY_STARTUP: AI Model will load on the first search.")
+    else:
+        get_encoder()
+    startup_report.print_report()
+
+def get_encoder():
+    global model, encoder
+    if encoder is None:
+        with _model_lock: # Lazy mode: the first concurrent requests must not load it twice
+            if encoder is None:
+                print("Loading AI Model...")
+                model = load_model(MODEL_NAME)
+                encoder = BatchEncoder(model)
+                print("Model Loaded!")
+    return encoder
 
 # --- HELPER FUNCTIONS ---
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def current_catalog():
+    # (catalog, ann_index) of the live index version. A search takes this pair
+    # once, so a version swap never mixes two catalogs within one request.
+    global catalog, ann_index
+    if live_catalog is None:
+        return catalog, ann_index
+    snapshot = live_catalog.get()
+    catalog, ann_index = snapshot
+    return snapshot
+
+def current_shards(for_catalog):
+    # Shard processes holding `for_catalog`, or None to search in-process. When
+    # a new version goes live (or a shard died) a new shard set is started in
+    # the background and searches run in-process until it is ready; starting
+    # shards spawns processes and loads their slices, which no request waits on.
+    # A request still running on an older version just searches in-process.
+    global _shards_starting
+    if SEARCH_SHARDS < 2 or len(for_catalog) < SHARD_MIN_ROWS:
+        return None
+    pool = shards
+    if pool is not None and not pool.broken and pool.version == for_catalog.version:
+        return pool
+    if for_catalog is catalog:
+        with _shards_lock:
+            if not _shards_starting:
+                _shards_starting = True
+                threading.Thread(target=start_shards, args=(for_catalog,), daemon=True).start()
+    return None
+
+def start_shards(for_catalog):
+    # Start shard processes for `for_catalog` and swap them in for the old ones
+    global shards, _shards_starting
+    try:
+        published = live_catalog.published if live_catalog is not None else None
+        new_shards = ShardedSearch(DB_PATH, for_catalog, SEARCH_SHARDS, published)
+    except Exception as e:
+        log_event("shard_error", always=True, error=str(e))
+        new_shards = None
+    with _shards_lock:
+        old_shards = None
+        if new_shards is not None:
+            old_shards, shards = shards, new_shards
+        _shards_starting = False
+    if old_shards is not None:
+        old_shards.close() # A search still on them fails over to in-process
+    return new_shards
+
+@app.on_event("shutdown")
+def stop_shards():
+    if shards is not None:
+        shards.close()
+    inference.close()
+
+def search_rows(query, min_price, max_price, category, k=10):
+    # (catalog, rows, scores) of the top k, best first. `catalog` is the
+    # version the search ran on (None if none is loaded); rows index into it.
+    no_rows = (np.empty(0, dtype=np.intp), np.empty(0))
+    try:
+        catalog, ann_index = current_catalog()
+        if catalog is None:
+            log_event("search_error", always=True, error="catalog not loaded")
+            return (None, *no_rows)
+
+        # Large catalogs with SEARCH_SHARDS: filtering and scoring run in the shard processes
+        sharded = current_shards(catalog)
+
+        # 1. Price / Category Filter
+        if sharded is None:
+            with stage("filter"):
+                candidates = np.flatnonzero(catalog.filter_mask(min_price, max_price, category))
+
+            if len(candidates) == 0:
+                return (catalog, *no_rows)
+
+        # 2. Vector Search (Semantic): one matrix-vector product over the candidates
+        with stage("query_encode"):
+            query_embedding = encode_query(get_encoder(), query, MODEL_NAME) # Cached + batched with concurrent requests
+
+        if sharded is not None:
+            with stage("scoring"):
+                found = sharded.search(query, query_embedding, min_price, max_price, category, k)
+            if found is not None:
+                rows, scores, scanned, dropped = found
+                metrics.candidates_scanned.inc(scanned)
+                metrics.results_below_threshold.inc(dropped)
+                return catalog, rows, scores
+            # A shard failed: this search runs in-process, the next one restarts the shards
+            candidates = np.flatnonzero(catalog.filter_mask(min_price, max_price, category))
+
+        with stage("scoring"):
+            candidates, final_scores, scanned, dropped = score_candidates(catalog, query, query_embedding, candidates, ann_index)
+            metrics.candidates_scanned.inc(scanned)
+            metrics.results_below_threshold.inc(dropped)
+
+        # 3. Top k by Score
+        with stage("top_k"):
+            best = top_k(final_scores, k)
+            return catalog, candidates[best], final_scores[best]
+
+    except Exception as e:
+        log_event("search_error", always=True, error=str(e), query=query)
+        return (None, *no_rows)
 
 def search_products(query, min_price, max_price, category):
+    # Result dicts of search_rows (the HTTP API renders its JSON straight from the rows)
+    catalog, rows, scores = search_rows(query, min_price, max_price, category)
+    return [catalog.result(row, score) for row, score in zip(rows, scores)]
+
+def search_rows_batch(requests):
+    # Many (query, min_price, max_price, category) searches at once: one encode
+    # call, then one (queries x products) matrix product per chunk of queries.
+    # Always an exact scan; the ANN index only serves single searches.
+    # -> (catalog, [(rows, scores) per search])
+    no_rows = (np.empty(0, dtype=np.intp), np.empty(0))
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # 1. Base Query
-        sql = "SELECT * FROM products_vectors WHERE price BETWEEN ? AND ?"
-        params = [min_price, max_price]
-
-        if category and category != "All":
-            sql += " AND category = ?"
-            params.append(category)
-
-        cursor.execute(sql, params)
-        rows = [dict(row) for row in cursor.fetchall()]
-        
-        if not rows:
-            print("DEBUG: No products found in DB for price/category filters")
-            return []
-
-        # 2. Vector Search (Semantic) + Keyword Boosting
-        query_embedding = model.encode(query)
-        query_lower = query.lower()
-        
-        scored_results = []
-        for row in rows:
-            if row.get('vector'):
-                # Decode JSON vector
-                product_embedding = np.array(json.loads(row['vector']), dtype=np.float32)
-                # Cosine Similarity
-                cos_score = np.dot(query_embedding, product_embedding) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(product_embedding)
-                )
-                
-                # --- KEYWORD BOOSTING ---
-                name_lower = row['product_name'].lower()
-                keyword_boost = 0.0
-                
-                # Exact brand or name match boost
-                if query_lower in name_lower:
-                    keyword_boost += 10.0 # Extreme boost for direct mention
-                
-                # Partial match boost
-                for word in query_lower.split():
-                    if len(word) > 3 and word in name_lower:
-                        keyword_boost += 2.0
-
-                # --- HYBRID SCORE ---
-                # Factor in semantic similarity + keyword boost
-                # We also add a threshold: if no keyword match AND similarity is low, we penalize
-                
-                semantic_score = float(cos_score)
-                final_score = (semantic_score + keyword_boost) * (1 + (row['rating'] / 10))
-                
-                # FILTERING: If the semantic score is too low AND there's no keyword boost, 
-                # we don't want to show this garbage result as a "Best Match"
-                if keyword_boost == 0 and semantic_score < 0.4:
-                    continue # Skip unrelated items
-
-                # Add score to result
-                row['score'] = final_score
-                # Remove large vector from response
-                del row['vector'] 
-                scored_results.append(row)
-
-        # 3. Sort by Score
-        scored_results.sort(key=lambda x: x['score'], reverse=True)
-        return scored_results[:10] # Top 10
+        catalog, _ = current_catalog()
+        if catalog is None:
+            log_event("search_error", always=True, error="catalog not loaded")
+            return None, [no_rows for _ in requests]
+
+        queries = [r[0] for r in requests]
+        with stage("query_encode"):
+            query_embeddings = encode_queries(get_encoder(), queries, MODEL_NAME)
+
+        results = []
+        for start in range(0, len(requests), BATCH_QUERY_CHUNK):
+            chunk = requests[start:start + BATCH_QUERY_CHUNK]
+            chunk_queries = queries[start:start + BATCH_QUERY_CHUNK]
+            chunk_embeddings = query_embeddings[start:start + BATCH_QUERY_CHUNK]
+
+            with stage("filter"):
+                masks = catalog.filter_masks([(mn, mx, cat) for _, mn, mx, cat in chunk])
+
+            with stage("scoring"):
+                # Per-query semantic and BM25 scores: (queries, products)
+                semantic_scores = catalog.approx_semantic_scores_batch(chunk_embeddings) # Exact unless quantized
+                lexical_scores = catalog.lexical.scores_batch(chunk_queries)
+
+                exact_match = np.zeros(lexical_scores.shape, dtype=bool)
+                for i, query in enumerate(chunk_queries):
+                    hits = np.flatnonzero(lexical_scores[i])
+                    exact_match[i, hits] = catalog.name_phrase_match(query, hits)
+
+                # Same hybrid score and threshold as search_products
+                keyword_boost = np.where(exact_match, EXACT_MATCH_BOOST, 0.0) + KEYWORD_WEIGHT * lexical_scores
+                final_scores = (semantic_scores + keyword_boost) * (1 + (catalog.ratings / 10))
+                threshold = 0.4 - (QUANT_MARGIN if catalog.quantized is not None else 0.0)
+                keep = masks & ~((keyword_boost == 0) & (semantic_scores < threshold))
+                metrics.candidates_scanned.inc(int(masks.sum()))
+                metrics.results_below_threshold.inc(int(masks.sum() - keep.sum()))
+                final_scores = np.where(keep, final_scores, -np.inf)
+
+                # Quantized catalog: rescore each query's shortlist at full precision
+                if catalog.quantized is not None:
+                    for i, rows in enumerate(top_k_rows(final_scores, QUANT_RESCORE)):
+                        rows = np.sort(rows)
+                        exact = catalog.semantic_scores(chunk_embeddings[i], rows)
+                        rescored = (exact + keyword_boost[i, rows]) * (1 + (catalog.ratings[rows] / 10))
+                        rescored[(keyword_boost[i, rows] == 0) & (exact < 0.4)] = -np.inf
+                        final_scores[i] = -np.inf
+                        final_scores[i, rows] = rescored
+
+            with stage("top_k"):
+                for i, best in enumerate(top_k_rows(final_scores, 10)):
+                    results.append((best, final_scores[i, best]))
+        return catalog, results
 
     except Exception as e:
-        print(f"Error: {e}")
-        return []
-    finally:
-        if conn: conn.close()
+        log_event("search_error", always=True, error=str(e), queries=len(requests))
+        return None, [no_rows for _ in requests]
+
+def search_products_batch(requests):
+    catalog, found = search_rows_batch(requests)
+    return [[catalog.result(row, score) for row, score in zip(rows, scores)] for rows, scores in found]
 
 # --- ENDPOINTS ---
 
+def catalog_version():
+    # Version of the live catalog. Checked on every call: the global `catalog`
+    # is only refreshed when a search runs, and cached responses must never be
+    # keyed by a version that was already swapped out.
+    live, _ = current_catalog()
+    return live.version if live is not None else None
+
+def json_response(http_request, body):
+    # `body` is JSON bytes; sent compressed, or as an empty 304 when the
+    # client already has it (http_encoding.py)
+    with stage("http_encode"):
+        status, content, headers = encode_body(
+            body, http_request.headers.get("accept-encoding"), http_request.headers.get("if-none-match"))
+    metrics.http_responses.inc(encoding="not_modified" if status == 304 else headers.get("Content-Encoding", "identity"))
+    return Response(content, status_code=status, headers=headers, media_type="application/json" if status == 200 else None)
+
+def render(catalog, rows, scores):
+    # Result JSON from the catalog's pre-serialized records (json_fragments.py)
+    return render_results(catalog, rows, scores) if catalog is not None else b"[]"
+
+async def run_inference(fn, *args):
+    # fn(*args) on the bounded inference pool; 429 / 503 when it is saturated
+    try:
+        return await inference.run(fn, *args)
+    except Overloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+def search_json(query, min_price, max_price, category):
+    # (result count, JSON body, catalog searched) of one search. The catalog
+    # is None when the search failed (no catalog, encoder / DB error): its
+    # empty result must not be cached.
+    found_catalog, rows, scores = search_rows(query, min_price, max_price, category)
+    with stage("serialize"):
+        return len(rows), render(found_catalog, rows, scores), found_catalog
+
+def search_batch_json(requests):
+    found_catalog, found = search_rows_batch(requests)
+    with stage("serialize"):
+        return b"[" + b",".join(render(found_catalog, rows, scores) for rows, scores in found) + b"]"
+
+async def off_loop(fn, *args):
+    # Blocking calls that are not inference (response cache socket round trips,
+    # live catalog check) on the default executor: never on the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+def cached_response(endpoint, query, *filters):
+    # (catalog version, cache key, cached response or None)
+    version = catalog_version()
+    key = response_key(endpoint, version, query, *filters)
+    return version, key, response_cache.get(key)
+
+def cache_response(key, value):
+    # Stored without making the client wait for it
+    asyncio.get_running_loop().run_in_executor(None, response_cache.put, key, value)
+
+def cacheable(searched, version):
+    # A response is cached under `version` only if its search ran, on that
+    # version (a swap can land between the cache key and the search)
+    return searched is not None and searched.version == version
+
 @app.post("/search")
-def api_search(request: SearchRequest):
-    print(f"DEBUG: Received Search Request: {request.query}")
-    results = search_products(
-        request.query, 
-        request.min_price, 
-        request.max_price, 
-        request.category
-    )
-    print(f"DEBUG: Returning {len(results)} results")
-    return results
+async def api_search(request: SearchRequest, http_request: Request):
+    start = time.perf_counter()
+    # Cached as [result count, JSON text]
+    version, key, entry = await off_loop(
+        cached_response, "search_json", request.query, request.min_price, request.max_price, request.category)
+    cached = entry is not None
+    if cached:
+        count, body = entry[0], entry[1].encode('utf-8')
+    else:
+        count, body, searched = await run_inference(
+            search_json,
+            request.query, 
+            request.min_price, 
+            request.max_price, 
+            request.category
+        )
+        if cacheable(searched, version):
+            cache_response(key, [count, body.decode('utf-8')])
+
+    response = json_response(http_request, body)
+    log_event("search", query=request.query, min_price=request.min_price, max_price=request.max_price,
+              category=request.category, results=count, cached=cached,
+              ms=round((time.perf_counter() - start) * 1000, 2))
+    return response
+
+@app.post("/search/batch")
+async def api_search_batch(request: BatchSearchRequest, http_request: Request):
+    start = time.perf_counter()
+    body = await run_inference(search_batch_json, [
+        (q.query, q.min_price, q.max_price, q.category) for q in request.queries
+    ])
+    response = json_response(http_request, body)
+    log_event("search_batch", queries=len(request.queries), ms=round((time.perf_counter() - start) * 1000, 2))
+    return response
 
 @app.post("/chat")
-def api_chat(request: ChatRequest):
-    print(f"DEBUG: Received Chat Message: {request.message}")
-    
+async def api_chat(request: ChatRequest, http_request: Request):
+    start = time.perf_counter()
+    if request.session_id:
+        # Depends on the session's earlier turns: not response-cached
+        response = await run_inference(chat_turn, request.message, request.session_id)
+        cached = False
+    else:
+        version, key, response = await off_loop(cached_response, "chat", request.message)
+        cached = response is not None
+        if not cached:
+            response, searched = await run_inference(chat_response, request.message)
+            if cacheable(searched, version):
+                cache_response(key, response)
+
+    log_event("chat", message=request.message, product_id=response.get("product_id"), cached=cached,
+              turn=response.get("turn"), ms=round((time.perf_counter() - start) * 1000, 2))
+    with stage("serialize"):
+        body = dumps(response)
+    return json_response(http_request, body)
+
+def chat_response(message):
+    # (response, catalog searched or None), as in search_json
     # Use search logic to find the best matching product for the chat query
-    results = search_products(request.message, 0, 1000000, "All")
-    
-    if not results:
-        return {"response": "I'm sorry, I couldn't find any products matching your requirements. Could you try describing it differently?"}
-    
+    found_catalog, rows, scores = search_rows(message, 0, 1000000, "All")
     # Pick the top result
-    best = results[0]
-    
+    best = found_catalog.result(rows[0], scores[0]) if len(rows) else None
+    return chat_reply(best), found_catalog
+
+def chat_reply(best):
+    if best is None:
+        return {"response": "I'm sorry, I couldn't find any products matching your requirements. Could you try describing it differently?"}
+
     # Generate a friendly expert response
     expert_response = f"Based on your request, I highly recommend the **{best['product_name']}**. "
     expert_response += f"It's currently priced at ₹{best['price']:,}. "
@@ -172,6 +435,85 @@ def api_chat(request: ChatRequest):
         "best_match": best
     }
 
+def chat_turn(message, session_id):
+    # One turn of a chat session. A follow-up is answered from the candidates
+    # of the session's last search when it still fits them (chat_sessions.py);
+    # otherwise the catalog is searched and the session starts over from it.
+    catalog, _ = current_catalog()
+    session = get_session(session_id)
+    found = None
+    turn = "search"
+    if catalog is not None and session is not None and session.version != catalog.version:
+        # A new catalog version was published since the last turn: rebuild the candidates
+        found_catalog, rows, scores = search_rows(session.query, 0, 1000000, "All", CHAT_CANDIDATES)
+        previous = session
+        session = None
+        if found_catalog is catalog and len(rows):
+            session = ChatSession(catalog.version, previous.query, previous.query_embedding, rows, scores)
+            session.shown = int(rows[0]) # Old row numbers do not carry over
+    if catalog is not None and session is not None and session.version == catalog.version:
+        with stage("chat_refine"):
+            found = refine(catalog, session, message, lambda: encode_query(get_encoder(), message, MODEL_NAME))
+        turn = "refined" if found is not None else "intent_change"
+        if found is not None and len(found[0]) == 0:
+            # The price asked for excludes every candidate: search the last query again within it
+            low, high = price_range(message, catalog, session)
+            found_catalog, rows, scores = search_rows(session.query, low, high, "All", CHAT_CANDIDATES)
+            found = (rows, scores) if found_catalog is catalog else (rows[:0], scores[:0])
+            if len(rows):
+                session = ChatSession(catalog.version, session.query, session.query_embedding, rows, scores)
+            turn = "exhausted"
+
+    if found is None:
+        catalog, rows, scores = search_rows(message, 0, 1000000, "All", CHAT_CANDIDATES)
+        found = (rows, scores)
+        if catalog is not None and len(rows):
+            session = ChatSession(catalog.version, message, encode_query(get_encoder(), message, MODEL_NAME), rows, scores)
+
+    rows, scores = found
+    metrics.chat_turns.inc(turn=turn)
+    if not len(rows):
+        response = chat_reply(None)
+    else:
+        response = chat_reply(catalog.result(rows[0], scores[0]))
+        session.shown = int(rows[0])
+        save_session(session_id, session)
+    response["session_id"] = session_id
+    response["turn"] = turn
+    return response
+
+@app.get("/stats")
+def api_stats():
+    return {
+        "query_cache": query_cache.stats(),
+        "encoder": encoder.stats() if encoder else None,
+        "startup_ms": startup_report.as_dict(),
+        "response_cache": response_cache.stats(),
+        "compressed_cache": compressed_cache.stats(),
+        "catalog_version": catalog_version(),
+        "embeddings": catalog.embedding_stats() if catalog is not None else None,
+        "index": live_catalog.stats() if live_catalog is not None else None,
+        "worker": process_memory(),
+        "shards": shards.stats() if shards is not None else None,
+        "inference": inference.stats(),
+        "chat_sessions": sessions.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def api_metrics():
+    # Prometheus text format: stage latency histograms, scan/threshold counters
+    # and the numeric parts of /stats as gauges
+    return metrics.render({
+        "query_cache": query_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "encoder": encoder.stats() if encoder else None,
+        "index": live_catalog.stats() if live_catalog is not None else None,
+        "worker": process_memory(),
+        "shards": shards.stats() if shards is not None else None,
+        "inference": inference.stats(),
+        "chat_sessions": sessions.stats(),
+    })
+
 # Serve Static Files (MUST BE LAST)
 # In production/deployment, we'll serve the compiled Next.js output
 frontend_path = os.path.join(BASE_DIR, "..", "frontend", "out")
@@ -185,4 +527,10 @@ if __name__ == "__main__":
     import uvicorn
     # Use environment port for HF Space compatibility
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # WEB_CONCURRENCY > 1 runs that many worker processes; they share one copy
+    # of the published index (shared_index.py) instead of loading one each
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    if workers > 1:
+        uvicorn.run("main:app", app_dir=BASE_DIR, host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,108 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+
+# --- MICRO-BATCHING ENCODER ---
+# FastAPI runs the sync /search and /chat handlers in a thread pool, and each
+# thread used to call model.encode() on one string, so the threads fought over
+# the same model and CPU inference was never batched. BatchEncoder collects the
+# requests that arrive within a short window (or until max_batch are waiting),
+# runs a single batched model.encode() and hands each caller its own vector.
+# It exposes the same encode(text) call as the model, so it can be passed to
+# query_cache.encode_query() in its place. A list of texts (/search/batch) goes
+# through the same queue as one request, so the worker thread is the only
+# caller of model.encode().
+
+ENCODER_BATCH_WINDOW_MS = float(os.environ.get("ENCODER_BATCH_WINDOW_MS", 3))
+ENCODER_MAX_BATCH = int(os.environ.get("ENCODER_MAX_BATCH", 32))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+DELAY_SAMPLES = 1000 # Recent queueing delays kept for percentiles
+
+class BatchEncoder:
+    def __init__(self, model, window_ms=ENCODER_BATCH_WINDOW_MS, max_batch=ENCODER_MAX_BATCH):
+        self.model = model
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.batch_size_counts = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self._delays_ms = deque(maxlen=DELAY_SAMPLES)
+
+        self._worker = threading.Thread(target=self._run, name="batch-encoder", daemon=True)
+        self._worker.start()
+
+    def encode(self, text):
+        # One text -> its vector; a list of texts -> (n, dim) array
+        single = isinstance(text, str)
+        texts = [text] if single else list(text)
+        future = Future()
+        self._queue.put((texts, time.perf_counter(), future))
+        vectors = future.result()
+        return vectors[0] if single else vectors
+
+    def _collect(self):
+        # Block for the first request, then gather more until the window closes
+        # or max_batch texts are waiting (a larger list is encoded on its own)
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.window
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request[0])
+        return batch, size
+
+    def _run(self):
+        while True:
+            batch, size = self._collect()
+            started = time.perf_counter()
+            try:
+                vectors = np.asarray(self.model.encode([text for texts, _, _ in batch for text in texts]))
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self._record(size, [(started - queued_at) * 1000 for _, queued_at, _ in batch])
+            offset = 0
+            for texts, _, future in batch:
+                future.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
+
+    def _record(self, batch_size, delays_ms):
+        with self._lock:
+            self.batches += 1
+            self.items += batch_size
+            bucket = next((b for b in BATCH_SIZE_BUCKETS if batch_size <= b), BATCH_SIZE_BUCKETS[-1])
+            self.batch_size_counts[bucket] += 1
+            self._delays_ms.extend(delays_ms)
+
+    def stats(self):
+        with self._lock:
+            delays = np.array(self._delays_ms) if self._delays_ms else np.zeros(1)
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "batch_size_counts": {f"<={b}": n for b, n in self.batch_size_counts.items()},
+                "queue_delay_ms": {
+                    "p50": round(float(np.percentile(delays, 50)), 3),
+                    "p95": round(float(np.percentile(delays, 95)), 3),
+                    "max": round(float(delays.max()), 3),
+                },
+            }
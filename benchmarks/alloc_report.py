@@ -0,0 +1,98 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, ".."))
+sys.path.insert(0, BASE_DIR)
+
+# --- ALLOCATION REPORT ---
+# Python memory allocated by the search path, measured with tracemalloc on a
+# synthetic catalog (synthetic_catalog.py) and the HashEncoder:
+#
+#   resident   metadata held by the catalog: one dict per product vs the
+#              packed columns (packed_rows.py)
+#   per query  peak memory allocated while answering one search_products
+#              query, and how many product records were built for it:
+#                hydrate all   every scored candidate turned into a record
+#                              first, then ranked (how results used to be built)
+#                late          ranked on the id-aligned arrays, records built
+#                              for the top 10 only (what the API does)
+#
+#   python benchmarks/alloc_report.py --rows 10000 100000
+
+def traced(fn):
+    # (result, bytes still allocated, peak bytes) of one call
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    return result, current - before, peak - before
+
+def resident_report(catalog):
+    from packed_rows import pack_rows
+    dicts, dict_bytes, _ = traced(lambda: [dict(r) for r in catalog.rows])
+    _, packed_bytes, _ = traced(lambda: pack_rows(dicts))
+    print(f"  resident metadata: dicts {dict_bytes / 1e6:8.1f} MB   packed {packed_bytes / 1e6:8.1f} MB")
+
+def query_report(backend, workload):
+    from hybrid_scoring import score_candidates
+    from query_cache import encode_query
+    catalog, _ = backend.current_catalog()
+
+    def hydrate_all(q):
+        candidates = np.flatnonzero(catalog.filter_mask(q["min_price"], q["max_price"], q["category"]))
+        if len(candidates) == 0:
+            return []
+        query_embedding = encode_query(backend.get_encoder(), q["query"], backend.MODEL_NAME)
+        rows, scores, _, _ = score_candidates(catalog, q["query"], query_embedding, candidates)
+        records = [catalog.result(row, score) for row, score in zip(rows, scores)]
+        order = sorted(range(len(records)), key=lambda i: -records[i]['score']) # Stable: ties keep catalog order
+        return [records[i] for i in order[:10]], len(records)
+
+    def late(q):
+        results = backend.search_products(q["query"], q["min_price"], q["max_price"], q["category"])
+        return results, len(results)
+
+    for name, fn in (("hydrate all", hydrate_all), ("late", late)):
+        for q in workload[:10]:
+            fn(q) # Warm the query cache, so encoding is not measured
+        peaks, records = [], []
+        start = time.perf_counter()
+        for q in workload:
+            result, _, peak = traced(lambda: fn(q))
+            peaks.append(peak)
+            records.append(result[1] if result else 0)
+        ms = (time.perf_counter() - start) * 1000 / len(workload)
+        print(f"  {name:<12} peak {np.mean(peaks) / 1e3:9.1f} KB/query (p95 {np.percentile(peaks, 95) / 1e3:9.1f})"
+              f"   records {np.mean(records):9.1f}/query   {ms:7.2f} ms/query (traced)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Python allocations of the search path")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000])
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["LOG_SAMPLE_RATE"] = "0"
+    os.environ["RESPONSE_CACHE_SIZE"] = "0"
+    os.environ.setdefault("ANN_MIN_ROWS", str(10**12)) # Exact scans: same candidates in both modes
+    from synthetic_catalog import ensure_catalog
+    from hash_encoder import HashEncoder
+    from run_benchmarks import load_backend, make_workload
+
+    workload = make_workload(args.queries, args.seed)
+    tracemalloc.start()
+    for rows in args.rows:
+        backend = load_backend(ensure_catalog(rows, args.seed), HashEncoder())
+        catalog, _ = backend.current_catalog()
+        print(f"--- {rows} products ({backend.live_catalog.stats()['source']}) ---")
+        resident_report(catalog)
+        query_report(backend, workload)
+    tracemalloc.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import hashlib
+import re
+import time
+import numpy as np
+
+# --- DETERMINISTIC STAND-IN ENCODER ---
+# Drop-in replacement for SentenceTransformer in benchmarks: no network, no
+# model weights, and the same text always gives the same vector on every
+# machine. A text's vector is the sum of one fixed pseudo-random vector per
+# token (seeded from a hash of the token), so texts that share words still
+# score as similar and rankings look like real ones. `delay_ms` adds a fixed
+# cost per encode() call to mimic real model latency.
+
+DIM = 384 # all-MiniLM-L6-v2
+
+TOKEN_RE = re.compile(r"\w+")
+
+class HashEncoder:
+    def __init__(self, model_name='hash-encoder', dim=DIM, delay_ms=0.0):
+        self.model_name = model_name
+        self.dim = dim
+        self.delay = delay_ms / 1000
+        self._token_vectors = {} # the vocabulary of a catalog is small
+
+    def _token_vector(self, token):
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            self._token_vectors[token] = vector
+        return vector
+
+    def _encode_one(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in TOKEN_RE.findall(text.lower()):
+            vector += self._token_vector(token)
+        return vector
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False, **kwargs):
+        # Same shapes as SentenceTransformer.encode: (dim,) for a str, (n, dim) for a list
+        if self.delay:
+            time.sleep(self.delay)
+        if isinstance(texts, str):
+            return self._encode_one(texts)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self._encode_one(text)
+        return matrix
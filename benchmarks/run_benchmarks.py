@@ -0,0 +1,258 @@
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BASE_DIR, "..")
+RESULTS_DIR = os.path.join(BASE_DIR, "results")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BASE_DIR)
+
+# --- LOAD / LATENCY BENCHMARKS ---
+# Runs a seeded query workload against:
+#   search_products  backend/main.py search function, called in-process
+#   lambda_handler   lambda_handler.lambda_handler, called in-process
+#   http_search      POST /search on a local uvicorn server
+#   http_chat        POST /chat on the same server
+# at several concurrency levels (threads), over synthetic catalogs of several
+# sizes (benchmarks/synthetic_catalog.py), with the HashEncoder stand-in
+# instead of the real model. Every (target, rows, concurrency) run reports
+# p50/p95/p99/mean latency and QPS; the whole run is written as JSON, and
+# --compare prints the change against an earlier results file.
+#
+#   python benchmarks/run_benchmarks.py --rows 10000 100000 --concurrency 1 8 32
+#
+# The response cache is off by default (every request is a real search);
+# --response-cache turns it on, --no-query-cache turns the embedding cache off.
+
+TARGETS = ["search_products", "lambda_handler", "http_search", "http_chat"]
+HTTP_PORT = 8765
+
+GENERIC_QUERIES = [
+    "laptop for coding", "gaming laptop 16GB RAM", "antiseptic for cuts", "cheap watch", "smartwatch with gps",
+    "noise cancelling headphones", "running shoes", "leather jacket", "instant noodles", "5g phone with good camera",
+    "mirrorless camera 4k video", "bluetooth speaker", "formal shoes", "tea", "butter",
+]
+PRICE_RANGES = [(0, 5000), (1000, 50000), (20000, 150000), (0, 500000)]
+
+def make_workload(count, seed):
+    # Same queries and filters, in the same order, for a given seed
+    from generate_products import MODELS, product_name
+    rng = random.Random(seed)
+    names = [product_name(b, i) for brands in MODELS.values() for b, items in brands.items() for i in items]
+    brands = [b for brands in MODELS.values() for b in brands]
+    workload = []
+    for _ in range(count):
+        kind = rng.random()
+        query = rng.choice(GENERIC_QUERIES) if kind < 0.5 else rng.choice(names) if kind < 0.8 else rng.choice(brands)
+        if rng.random() < 0.5:
+            min_price, max_price, category = 0, 500000, "All"
+        else:
+            min_price, max_price = rng.choice(PRICE_RANGES)
+            category = rng.choice(list(MODELS))
+        workload.append({"query": query, "min_price": min_price, "max_price": max_price, "category": category})
+    return workload
+
+def run_load(call, workload, concurrency, warmup=20):
+    for item in workload[:warmup]:
+        call(item)
+
+    items = iter(workload)
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+
+    def worker():
+        local = []
+        while True:
+            with lock:
+                item = next(items, None)
+            if item is None:
+                break
+            start = time.perf_counter()
+            try:
+                call(item)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "qps": round(len(latencies) / wall, 1),
+    }
+
+# --- TARGETS ---
+def load_backend(db_path, encoder):
+    from batch_encoder import BatchEncoder
+    spec = importlib.util.spec_from_file_location("bench_backend", os.path.join(ROOT_DIR, "backend", "main.py"))
+    backend = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(backend)
+    backend.DB_PATH = db_path
+    backend.model = encoder
+    backend.encoder = BatchEncoder(encoder)
+    backend.load_resources()
+    return backend
+
+def load_lambda(db_path, encoder):
+    import lambda_handler
+    lambda_handler.DB_FILE = db_path
+    lambda_handler._model_cache = encoder
+    lambda_handler.get_catalog() # Warm container
+    return lambda_handler
+
+def start_server(app, port):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+def http_caller(port, path, body_of):
+    local = threading.local() # One keep-alive connection per client thread
+
+    def call(item):
+        conn = getattr(local, 'conn', None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        conn.request("POST", path, json.dumps(body_of(item)), {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+    return call
+
+def callers(targets, backend, lambda_module, port):
+    calls = {}
+    if "search_products" in targets:
+        calls["search_products"] = lambda q: backend.search_products(q["query"], q["min_price"], q["max_price"], q["category"])
+    if "lambda_handler" in targets:
+        def call_lambda(q):
+            if lambda_module.lambda_handler(dict(q), None)["statusCode"] != 200:
+                raise RuntimeError("lambda error")
+        calls["lambda_handler"] = call_lambda
+    if "http_search" in targets:
+        calls["http_search"] = http_caller(port, "/search", lambda q: q)
+    if "http_chat" in targets:
+        calls["http_chat"] = http_caller(port, "/chat", lambda q: {"message": q["query"]})
+    return calls
+
+# --- REPORTING ---
+def run_metadata(args):
+    try:
+        commit = subprocess.run(["git", "-C", ROOT_DIR, "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "requests_per_run": args.requests,
+        "encode_delay_ms": args.encode_delay_ms,
+        "response_cache": args.response_cache,
+        "query_cache": not args.no_query_cache,
+    }
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r["target"], r["rows"], r["concurrency"]): r for r in json.load(f)["results"]}
+    print(f"--- Compared with {baseline_path} ---")
+    for r in results:
+        old = baseline.get((r["target"], r["rows"], r["concurrency"]))
+        if old is None:
+            continue
+        p95 = (r["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        qps = (r["qps"] - old["qps"]) / old["qps"] * 100 if old["qps"] else 0.0
+        print(f"  {r['target']:<16} rows={r['rows']:<8} c={r['concurrency']:<3} p95 {p95:+6.1f}%  qps {qps:+6.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency / throughput benchmarks on synthetic catalogs")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--targets', nargs='+', choices=TARGETS, default=TARGETS)
+    parser.add_argument('--requests', type=int, default=500, help="Requests per (target, rows, concurrency) run")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--encode-delay-ms', type=float, default=0.0, help="Simulated model cost per encode() call")
+    parser.add_argument('--response-cache', action='store_true', help="Keep the full response cache on")
+    parser.add_argument('--no-query-cache', action='store_true', help="Turn the query embedding cache off")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the synthetic catalogs")
+    parser.add_argument('--port', type=int, default=HTTP_PORT)
+    parser.add_argument('--out', help="Results JSON (default: benchmarks/results/bench_<timestamp>.json)")
+    parser.add_argument('--compare', help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    # Read by the search modules at import time, so set before importing them
+    os.environ["LOG_SAMPLE_RATE"] = "0"
+    if not args.response_cache:
+        os.environ["RESPONSE_CACHE_SIZE"] = "0"
+    if args.no_query_cache:
+        os.environ["QUERY_CACHE_SIZE"] = "0"
+    from synthetic_catalog import ensure_catalog
+    from hash_encoder import HashEncoder
+
+    encoder = HashEncoder(delay_ms=args.encode_delay_ms)
+    workload = make_workload(args.requests, args.seed)
+    results = []
+    for rows in args.rows:
+        db_path = ensure_catalog(rows, args.seed, rebuild=args.rebuild)
+        backend = load_backend(db_path, encoder)
+        lambda_module = load_lambda(db_path, encoder) if "lambda_handler" in args.targets else None
+        server = None
+        if any(t.startswith("http_") for t in args.targets):
+            server, thread = start_server(backend.app, args.port)
+        try:
+            for target, call in callers(args.targets, backend, lambda_module, args.port).items():
+                for concurrency in args.concurrency:
+                    result = {"target": target, "rows": rows, "concurrency": concurrency,
+                              **run_load(call, workload, concurrency)}
+                    results.append(result)
+                    print(f"  {target:<16} rows={rows:<8} c={concurrency:<3} p50={result['p50_ms']:>8.2f}ms "
+                          f"p95={result['p95_ms']:>8.2f}ms p99={result['p99_ms']:>8.2f}ms qps={result['qps']:>8.1f}")
+        finally:
+            if server is not None:
+                server.should_exit = True
+                thread.join()
+
+    out = args.out or os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({"meta": run_metadata(args), "results": results}, f, indent=2)
+    print(f"Results written to {out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
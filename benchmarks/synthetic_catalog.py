@@ -0,0 +1,140 @@
+import argparse
+import csv
+import hashlib
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BASE_DIR, "..")
+DATA_DIR = os.path.join(BASE_DIR, "data")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BASE_DIR)
+
+from generate_products import MODELS, get_price, get_specs, product_name
+from vector_store import encode_vector
+from catalog import Catalog
+from ann_index import IVFIndex, index_path_for
+from shared_index import publish
+from hash_encoder import HashEncoder
+
+# --- SYNTHETIC CATALOGS ---
+# Catalogs of any size (10k, 100k, 1M rows...) built from the same brand
+# lineup and get_price/get_specs rules as generate_products.py. Everything is
+# drawn from one seed, so the same (rows, seed) always gives the same CSV and
+# DB. Names get a random variant suffix so large catalogs are not just
+# thousands of copies of ~150 names.
+#
+# The DB is written like embed_products.py would (schema.sql, shared float32
+# BLOBs in `embeddings`, ANN index, published search index), but embedded with the HashEncoder stand-in.
+
+DEFAULT_SEED = 42
+WRITE_BATCH = 10000
+
+VARIANTS = ["", "", "", "- Black", "- Silver", "- Blue", "(2024 Edition)", "Combo Pack", "Limited Edition"]
+
+INSERT_SQL = '''
+    INSERT INTO products_vectors (product_id, product_name, category, price, rating, specifications, content_hash, embedding_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def generate_rows(n, seed=DEFAULT_SEED):
+    random.seed(seed) # get_price / get_specs draw from the global random module
+    names = [
+        (category, product_name(brand, item))
+        for category, brands in MODELS.items() for brand, items in brands.items() for item in items
+    ]
+    for product_id in range(1, n + 1):
+        category, name = random.choice(names)
+        variant = random.choice(VARIANTS)
+        price = get_price(name, category)
+        price = (price // 100) * 100 + random.choice([0, 99]) # Round off
+        yield {
+            'product_id': product_id,
+            'product_name': f"{name} {variant}" if variant else name,
+            'category': category,
+            'price': price,
+            'rating': round(random.uniform(4.0, 5.0), 1),
+            'specifications': get_specs(category, name),
+        }
+
+def embed_text(row):
+    # Same text as embed_products.embed_texts
+    return f"{row['product_name']} {row['category']} {row['specifications']}"
+
+def write_csv(path, n, seed=DEFAULT_SEED):
+    # products.csv format, e.g. to benchmark embed_products.py itself
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['product_id', 'product_name', 'category', 'price', 'rating', 'specifications'])
+        for row in generate_rows(n, seed):
+            writer.writerow(row.values())
+
+def default_db_path(n, seed=DEFAULT_SEED):
+    return os.path.join(DATA_DIR, f"catalog_{n}_s{seed}.db")
+
+def build_catalog(db_path, n, seed=DEFAULT_SEED, encoder=None):
+    encoder = encoder or HashEncoder()
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    with open(os.path.join(ROOT_DIR, 'schema.sql'), 'r') as f:
+        conn.executescript(f.read())
+
+    # Many rows share a text (same name, variant and specs): each text is
+    # encoded and stored once in `embeddings`, like embed_products.py does
+    embedding_ids = {} # text -> (embedding_id, content_hash)
+    rows = generate_rows(n, seed)
+    while True:
+        batch = list(itertools.islice(rows, WRITE_BATCH))
+        if not batch:
+            break
+        texts = [embed_text(r) for r in batch]
+        new_texts = sorted({t for t in texts if t not in embedding_ids})
+        if new_texts:
+            for text, vector in zip(new_texts, encoder.encode(new_texts)):
+                text_hash = hashlib.sha256(f"{encoder.model_name}\n{text}".encode('utf-8')).hexdigest()
+                embedding_ids[text] = (len(embedding_ids) + 1, text_hash)
+                conn.execute("INSERT INTO embeddings (embedding_id, content_hash, vector) VALUES (?, ?, ?)",
+                             (*embedding_ids[text], encode_vector(vector)))
+        conn.executemany(INSERT_SQL, [
+            (r['product_id'], r['product_name'], r['category'], r['price'], r['rating'],
+             r['specifications'], embedding_ids[t][1], embedding_ids[t][0])
+            for r, t in zip(batch, texts)
+        ])
+    conn.execute("INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('version', ?)", (f"synthetic-{n}-s{seed}",))
+    conn.commit()
+    conn.close()
+
+    catalog = Catalog.from_db(db_path)
+    IVFIndex.build_for_catalog(catalog).save(index_path_for(db_path))
+    publish(catalog, db_path)
+    print(f"Built {db_path}: {n} rows, {len(embedding_ids)} unique texts in {time.perf_counter() - start:.1f}s")
+    return db_path
+
+def ensure_catalog(n, seed=DEFAULT_SEED, rebuild=False):
+    # Reuse a catalog built by an earlier run with the same (rows, seed)
+    db_path = default_db_path(n, seed)
+    if rebuild or not os.path.exists(db_path):
+        build_catalog(db_path, n, seed)
+    return db_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic product catalog")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--db', help="DB to build (default: benchmarks/data/catalog_<rows>_s<seed>.db)")
+    parser.add_argument('--csv', help="Only write a products.csv-style file to this path")
+    args = parser.parse_args()
+    if args.csv:
+        write_csv(args.csv, args.rows, args.seed)
+        print(f"Wrote {args.rows} rows to {args.csv}")
+    else:
+        build_catalog(args.db or default_db_path(args.rows, args.seed), args.rows, args.seed)
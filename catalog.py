@@ -0,0 +1,260 @@
+import os
+import sqlite3
+import numpy as np
+from db_reader import read_connection
+from metrics import stage
+from quantization import QUANT_KINDS, VECTOR_QUANTIZATION, QuantizedMatrix, release_pages
+from vector_store import decode_matrix
+from filter_index import FilterIndex
+from lexical_index import BM25Index, tokenize
+from packed_rows import pack_rows
+from json_fragments import build_fragments, record_fragment
+
+# --- IN-MEMORY CATALOG ---
+# All product embeddings are decoded once into a contiguous, L2-normalised
+# float32 matrix with the metadata held alongside it. A search is then one
+# matrix-vector product instead of a per-row JSON decode + norm computation.
+#
+# Many products share an embedding (copies of a model that only differ in
+# price/rating embed the same text), so the matrix holds each distinct vector
+# once and `vector_rows` maps every product to its row. Similarities are
+# computed per distinct vector and then fanned out to the products; price,
+# rating and keyword terms stay per product.
+
+class Catalog:
+    def __init__(self, rows, matrix, version=None, vector_rows=None, indexes=None):
+        self.rows = rows        # metadata records (no vector), one per product, in DB order (PackedRows or dicts)
+        self.matrix = matrix    # (n_vectors, dim) float32, unit-norm distinct vectors
+        self.version = version  # catalog_meta 'version' written by embed_products.py
+        # Product -> row of `matrix` (identity when there is no sharing)
+        self.vector_rows = np.arange(len(rows)) if vector_rows is None else np.asarray(vector_rows, dtype=np.intp)
+        self.shares_vectors = len(matrix) != len(rows)
+
+        # Columns + search indexes; a published index (shared_index.py) ships them prebuilt
+        indexes = indexes or build_indexes(rows)
+        self.product_ids = indexes['product_ids']
+        self.prices = indexes['prices']
+        self.ratings = indexes['ratings']
+        self.filters = indexes['filters']
+        self.lexical = indexes['lexical']
+        self.name_phrases = indexes['name_phrases']
+        self.fragments = indexes.get('fragments') # Pre-serialized result JSON (json_fragments.py)
+
+        # Optional int8/float16 copy for shortlisting (quantization.py). Only
+        # over a memory-mapped float32 matrix, whose pages can be dropped: next
+        # to an in-RAM matrix the copy would add memory, not save it.
+        self.quantized = indexes.get('quantized')
+        if self.quantized is None and VECTOR_QUANTIZATION in QUANT_KINDS and len(rows):
+            if isinstance(matrix, np.memmap):
+                self.quantized = QuantizedMatrix.quantize(matrix, VECTOR_QUANTIZATION)
+                release_pages(matrix)
+            else:
+                warn_not_quantized()
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def from_db(cls, db_path):
+        with stage("db_fetch"), read_connection(db_path) as conn:
+            if has_table(conn, 'embeddings'):
+                # Shared vectors live in `embeddings`; older rows may still hold their own
+                db_rows = conn.execute(
+                    "SELECT p.*, e.vector AS shared_vector FROM products_vectors p "
+                    "LEFT JOIN embeddings e ON e.embedding_id = p.embedding_id"
+                ).fetchall()
+            else:
+                db_rows = conn.execute("SELECT * FROM products_vectors").fetchall()
+            version = read_catalog_version(conn) or "sig-%d-%d" % db_signature(db_path)
+
+        with stage("vector_decode"):
+            rows, vectors, vector_rows = [], [], []
+            vector_index = {} # embedding_id, or the stored value itself for inline vectors
+            for db_row in db_rows:
+                row = dict(db_row)
+                row.pop('content_hash', None) # Ingest bookkeeping, not product data
+                embedding_id = row.pop('embedding_id', None)
+                shared_vector = row.pop('shared_vector', None)
+                vector = row.pop('vector', None)
+                if shared_vector:
+                    vector, key = shared_vector, ('id', embedding_id)
+                else:
+                    key = ('value', vector) # DBs built before the embeddings table: dedup by content
+                if not vector:
+                    continue # Same as the old per-row scan: products without a vector are never scored
+                if key not in vector_index:
+                    vector_index[key] = len(vectors)
+                    vectors.append(vector)
+                rows.append(row)
+                vector_rows.append(vector_index[key])
+
+            # float32 BLOBs are viewed in place; legacy JSON text is parsed once here
+            matrix = normalize_rows(decode_matrix(vectors).reshape(len(vectors), -1))
+
+        # Scoring reads only the arrays built here; records are packed column by
+        # column and only turned back into dicts for the results (packed_rows.py)
+        indexes = build_indexes(rows)
+        return cls(pack_rows(rows), matrix, version, vector_rows, indexes)
+
+    def _fan_out(self, score_vectors, query_vector, rows):
+        # Scores per product from `score_vectors(q, vector_rows)`, which scores
+        # rows of the distinct-vector matrix (None = all of them)
+        q = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return np.zeros(len(self) if rows is None else len(rows), dtype=np.float32)
+        q = q / norm
+        if not self.shares_vectors:
+            return score_vectors(q, rows)
+        vector_rows = self.vector_rows if rows is None else self.vector_rows[rows]
+        if len(vector_rows) >= len(self.matrix):
+            # Each distinct vector once, then broadcast to the products
+            return score_vectors(q, None)[vector_rows]
+        return score_vectors(q, vector_rows) # Fewer products than vectors (e.g. ANN probe)
+
+    def semantic_scores(self, query_vector, rows=None):
+        # Cosine similarity of the query against every product (or just `rows`)
+        return self._fan_out(lambda q, r: (self.matrix if r is None else self.matrix[r]) @ q, query_vector, rows)
+
+    def semantic_scores_batch(self, query_vectors):
+        # (n_queries, n_products) cosine similarities from one matrix product
+        scores = normalize_rows(np.asarray(query_vectors, dtype=np.float32)) @ self.matrix.T
+        return scores[:, self.vector_rows] if self.shares_vectors else scores
+
+    def approx_semantic_scores(self, query_vector, rows=None):
+        # Quantized scores when VECTOR_QUANTIZATION is on (only good enough to
+        # pick a shortlist for semantic_scores); exact scores otherwise
+        if self.quantized is None:
+            return self.semantic_scores(query_vector, rows)
+        return self._fan_out(self.quantized.scores, query_vector, rows)
+
+    def approx_semantic_scores_batch(self, query_vectors):
+        if self.quantized is None:
+            return self.semantic_scores_batch(query_vectors)
+        scores = self.quantized.scores_batch(normalize_rows(np.asarray(query_vectors, dtype=np.float32)))
+        return scores[:, self.vector_rows] if self.shares_vectors else scores
+
+    def embedding_stats(self):
+        stats = {
+            "products": len(self),
+            "distinct_vectors": len(self.matrix),
+            "dedup_ratio": round(len(self) / len(self.matrix), 2) if len(self.matrix) else 1.0,
+            "format": self.quantized.kind if self.quantized is not None else "float32",
+            "float32_mb": round(self.matrix.nbytes / 1e6, 2),
+            "float32_storage": "mmap" if isinstance(self.matrix, np.memmap) else "ram",
+        }
+        if self.quantized is not None:
+            stats["quantized_mb"] = round(self.quantized.nbytes / 1e6, 2)
+        return stats
+
+    def filter_mask(self, min_price, max_price, category=None):
+        return self.filters.mask(min_price, max_price, category)
+
+    def filter_masks(self, filters):
+        return self.filters.masks(filters)
+
+    def name_phrase_match(self, query, rows):
+        # True where the whole query appears, word for word, in the product name
+        phrase = " ".join(tokenize(query))
+        if not phrase or len(rows) == 0:
+            return np.zeros(len(rows), dtype=bool)
+        return np.char.find(self.name_phrases[rows], f" {phrase} ") >= 0
+
+    def result(self, idx, score):
+        item = dict(self.rows[idx])
+        item['score'] = float(score)
+        return item
+
+    def result_fragment(self, idx):
+        # JSON bytes of result(idx, ...) minus the score and the closing brace
+        if self.fragments is None:
+            return record_fragment(self.rows[idx])
+        offsets, blob = self.fragments
+        return bytes(blob[offsets[idx]:offsets[idx + 1]])
+
+_warned_not_quantized = False
+
+def warn_not_quantized():
+    global _warned_not_quantized
+    if not _warned_not_quantized:
+        _warned_not_quantized = True
+        print(f"WARNING: VECTOR_QUANTIZATION={VECTOR_QUANTIZATION} ignored: the catalog was loaded from SQLite, "
+              "so the float32 matrix stays in RAM and a quantized copy would only add to it. "
+              "Publish the index (embed_products.py) to serve quantized vectors.")
+
+def load_catalog(db_path):
+    # The published index (memory-mapped, shared by every worker) if it is
+    # fresh, else a scan of SQLite. Imported here: shared_index builds on Catalog.
+    from shared_index import attach_published
+    try:
+        catalog = attach_published(db_path)
+        if catalog is not None:
+            return catalog
+    except Exception as e:
+        print(f"Error attaching published index, falling back to DB: {e}")
+    return Catalog.from_db(db_path)
+
+def build_indexes(rows):
+    prices = np.array([r['price'] for r in rows], dtype=np.float64)
+    return {
+        'product_ids': np.array([r['product_id'] for r in rows]),
+        'prices': prices,
+        'ratings': np.array([r['rating'] for r in rows], dtype=np.float64),
+        'filters': FilterIndex(prices, [r['category'] for r in rows]),
+        'lexical': BM25Index([f"{r['product_name']} {r['specifications']}" for r in rows]),
+        # Names as " word word " strings, for whole-word phrase matches
+        'name_phrases': np.array([f" {' '.join(tokenize(r['product_name']))} " for r in rows], dtype=str),
+        'fragments': build_fragments(rows),
+    }
+
+# --- HELPERS ---
+def has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+def read_catalog_version(conn):
+    # None for DBs built before catalog_meta existed
+    try:
+        row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+def db_signature(db_path):
+    # Changes whenever the DB file is rewritten (used to invalidate cached catalogs)
+    st = os.stat(db_path)
+    return (st.st_mtime_ns, st.st_size)
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+def top_k(scores, k):
+    # Indices of the k highest scores, best first. Ties keep their original
+    # (catalog) order, exactly like a stable `list.sort(reverse=True)`.
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if n > k:
+        kth = np.argpartition(-scores, k - 1)[k - 1]
+        # Keep everything tied with the k-th score so the tie-break stays stable
+        idx = np.flatnonzero(scores >= scores[kth])
+    else:
+        idx = np.arange(n)
+    order = np.lexsort((idx, -scores[idx]))
+    return idx[order][:k]
+
+def top_k_rows(scores, k):
+    # top_k for every row of a (n_queries, n) score matrix; -inf marks rows that
+    # were filtered out. The k-th best score of every query comes from one
+    # np.partition; only the few rows at or above it are then ordered per query.
+    n_queries, n = scores.shape
+    if n == 0 or k <= 0:
+        return [np.empty(0, dtype=np.intp) for _ in range(n_queries)]
+    kth = -np.partition(-scores, min(k, n) - 1, axis=1)[:, min(k, n) - 1]
+    selected = (scores >= kth[:, None]) & (scores > -np.inf)
+    results = []
+    for row_scores, row_selected in zip(scores, selected):
+        idx = np.flatnonzero(row_selected)
+        results.append(idx[np.lexsort((idx, -row_scores[idx]))][:k])
+    return results
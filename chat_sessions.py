@@ -0,0 +1,212 @@
+import os
+import re
+import numpy as np
+from hybrid_scoring import KEYWORD_WEIGHT
+from lexical_index import tokenize
+from query_cache import LRUCache
+
+# --- CHAT SESSIONS ---
+# A /chat request with a session_id remembers the scored candidates of its
+# last full search (rows + scores, not product records). A follow-up such as
+# "cheaper one?", "under 50k", "better rated" or "with more RAM" is answered
+# by filtering and re-ranking those candidates instead of rescanning the
+# catalog. The catalog is searched again when:
+#   - there is no session yet, or it belongs to an older catalog version
+#   - the intent changed: the follow-up brings a new word that matches none of
+#     the candidates ("what about phones?", "samsung phone" -> "samsung tv"),
+#     or it neither reads like the previous query nor asks for a refinement
+#     (price, rating, "more RAM", ...)
+#   - a price constraint filtered out every candidate (re-searched with the
+#     previous query and the new price range)
+#
+# Sessions live in an LRU with a TTL (refreshed on every turn); each one
+# holds at most CHAT_CANDIDATES candidates and CHAT_SESSION_MAX_BYTES.
+
+CHAT_SESSIONS = int(os.environ.get("CHAT_SESSIONS", 1024))                   # sessions kept
+CHAT_SESSION_TTL = float(os.environ.get("CHAT_SESSION_TTL", 1800))           # seconds since the last turn
+CHAT_CANDIDATES = int(os.environ.get("CHAT_CANDIDATES", 200))                # candidates kept per session
+CHAT_SESSION_MAX_BYTES = int(os.environ.get("CHAT_SESSION_MAX_BYTES", 8192)) # arrays of one session
+CHAT_FOLLOWUP_SIMILARITY = 0.5 # Follow-up vs previous query cosine that still counts as the same intent
+MAX_SESSION_ID = 128
+
+class ChatSession:
+    def __init__(self, version, query, query_embedding, rows, scores):
+        self.version = version  # catalog version the rows index into
+        self.query = query      # last full-search query
+        self.query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        # Per-candidate bytes: row (int32) + score (float32)
+        limit = max(10, (CHAT_SESSION_MAX_BYTES - self.query_embedding.nbytes) // 8)
+        keep = min(len(rows), CHAT_CANDIDATES, limit)
+        self.rows = np.asarray(rows[:keep], dtype=np.int32)
+        self.scores = np.asarray(scores[:keep], dtype=np.float32)
+        self.shown = None       # row recommended last (reference for "cheaper", "more ...")
+
+    @property
+    def nbytes(self):
+        return self.query_embedding.nbytes + self.rows.nbytes + self.scores.nbytes
+
+sessions = LRUCache(maxsize=CHAT_SESSIONS, ttl=CHAT_SESSION_TTL)
+
+def get_session(session_id):
+    return sessions.get(session_id[:MAX_SESSION_ID])
+
+def save_session(session_id, session):
+    sessions.put(session_id[:MAX_SESSION_ID], session)
+
+# --- FOLLOW-UP PARSING ---
+CHEAPER = {"cheaper", "cheapest", "budget", "affordable", "inexpensive"}
+PRICIER = {"pricier", "costlier", "premium", "expensive", "flagship"}
+RATING = {"rated", "rating", "ratings", "reviews", "reviewed"}
+MORE = {"more", "bigger", "larger", "higher", "faster", "extra", "max", "maximum"}
+LESS = {"less", "smaller", "lighter", "lower", "fewer", "min", "minimum"}
+BELOW = {"under", "below", "within", "upto", "max", "maximum"}
+ABOVE = {"above", "over", "min", "minimum"}
+FILLER = {
+    "a", "an", "the", "one", "ones", "it", "that", "this", "these", "those", "some", "any", "something",
+    "show", "me", "give", "find", "get", "want", "need", "like", "please", "can", "could", "you", "i",
+    "do", "is", "are", "have", "has", "with", "without", "and", "or", "but", "than", "to", "in", "for",
+    "of", "on", "what", "about", "how", "which", "other", "another", "similar", "instead", "option",
+    "options", "alternative", "alternatives", "better", "best", "good", "great", "top", "highest",
+    "up", "price", "priced", "rs", "inr", "k", "lakh", "lakhs", "too", "much", "bit", "little", "also",
+    "between", "from", "at", "most", "least", "not", "no", "thousand",
+}
+CUES = CHEAPER | PRICIER | RATING | MORE | LESS | BELOW | ABOVE | FILLER
+
+# Prices are read from the raw message (after dropping "," and "₹"), since
+# tokenizing splits "1.5" and "50,000": "under 1.5 lakh", "less than 20000",
+# "above rs. 50k", "between 20k and 40k", "from 10 to 15 thousand"
+# A number followed by a spec unit ("at least 4 stars", "over 16 GB") is not a price
+NOT_PRICE = r"(?![.\d]|\s*(?:stars?|gb|tb|mb|mp|mah|hz|inch|inches|hours?|years?|months?)\b)"
+AMOUNT = r"(?:rs\.?|inr)?\s*(\d+(?:\.\d+)?)\s*(k|thousand|lakhs?|l)?\b" + NOT_PRICE
+UNITS = {None: 1, "k": 1000, "thousand": 1000, "lakh": 100000, "lakhs": 100000, "l": 100000}
+BETWEEN_RE = re.compile(r"\b(?:between|from)\s+" + AMOUNT + r"\s*(?:and|to|-)\s*" + AMOUNT)
+BELOW_RE = re.compile(r"\b(?:under|below|within|upto|up to|less than|lower than|cheaper than|at most"
+                      r"|max(?:imum)?(?: of)?|not more than|no more than)\s*" + AMOUNT)
+ABOVE_RE = re.compile(r"\b(?:above|over|more than|higher than|at least|min(?:imum)?(?: of)?|starting(?: at| from)?)\s*" + AMOUNT)
+
+def amount(number, unit):
+    return float(number) * UNITS[unit]
+
+def parse_prices(message):
+    # (min_price, max_price) a message asks for, None where it sets no bound
+    text = message.lower().replace(",", "").replace("₹", "")
+    low = high = None
+    between = BETWEEN_RE.search(text)
+    if between:
+        low_number, low_unit, high_number, high_unit = between.groups()
+        # "between 20 and 30k": the unit of the second amount applies to both
+        low, high = amount(low_number, low_unit or high_unit), amount(high_number, high_unit)
+        text = text[:between.start()] + text[between.end():]
+    text = re.sub(r"\bno(?:t)? more than\b", "upto", text) # Not a lower bound
+    below = BELOW_RE.search(text)
+    if below:
+        high = amount(*below.groups())
+    above = ABOVE_RE.search(text)
+    if above:
+        low = amount(*above.groups())
+    return low, high
+
+def parse_followup(message):
+    # Constraints a follow-up asks for, plus its remaining content words
+    text = message.lower()
+    tokens = tokenize(text)
+    words = set(tokens)
+    intent = {"min_price": None, "max_price": None, "cheaper": False, "pricier": False,
+              "rating": False, "attribute": None, "content": []}
+    if "less expensive" in text or "lower price" in text or words & CHEAPER:
+        intent["cheaper"] = True
+    elif words & PRICIER or "more expensive" in text:
+        intent["pricier"] = True
+    if words & RATING:
+        intent["rating"] = True
+
+    intent["min_price"], intent["max_price"] = parse_prices(message)
+    for i, token in enumerate(tokens):
+        # "more RAM", "bigger battery": rank by the number in that spec
+        if (token in MORE or token in LESS) and i + 1 < len(tokens) and tokens[i + 1] not in CUES \
+                and tokens[i + 1][0].isalpha():
+            intent["attribute"] = (tokens[i + 1], 1 if token in MORE else -1)
+
+    intent["content"] = [t for t in tokens if t not in CUES and not t[0].isdigit()]
+    return intent
+
+def spec_value(specifications, attribute):
+    # First number of the spec segment mentioning `attribute` ("16GB RAM" -> 16.0)
+    for segment in specifications.split("|"):
+        if attribute in tokenize(segment):
+            match = re.search(r"\d+(?:\.\d+)?", segment)
+            if match:
+                return float(match.group())
+    return np.nan
+
+# --- RE-RANKING ---
+def cosine(a, b):
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(np.dot(a, b) / norm) if norm else 0.0
+
+def refine(catalog, session, message, encode):
+    # (rows, search scores) for a follow-up, best first, from the session's candidates.
+    # None when the intent changed; an empty result when price constraints
+    # removed every candidate. `encode()` embeds the message (only called
+    # when the follow-up brings new words).
+    intent = parse_followup(message)
+    rows, scores = session.rows.astype(np.intp), session.scores.astype(np.float64)
+    content = " ".join(intent["content"])
+
+    ranking = scores
+    if content:
+        # Every new word must describe some candidate (sharing one word with the
+        # last query is not enough), and the message must mean much the same as
+        # the last query or ask for a refinement
+        new_words = set(intent["content"]) - set(tokenize(session.query))
+        if any(not catalog.lexical.scores(word)[rows].any() for word in new_words): # Postings of that word only
+            return None
+        embedding = encode()
+        refinement = (intent["min_price"] is not None or intent["max_price"] is not None or intent["cheaper"]
+                      or intent["pricier"] or intent["rating"] or intent["attribute"] is not None)
+        if not refinement and cosine(embedding, session.query_embedding) < CHAT_FOLLOWUP_SIMILARITY:
+            return None
+        # Ranked by the same hybrid score as a search, for the follow-up text,
+        # on top of the original; the original search score is returned
+        lexical = catalog.lexical.scores(content)[rows]
+        semantic = catalog.semantic_scores(embedding, rows)
+        ranking = scores + (semantic + KEYWORD_WEIGHT * lexical) * (1 + catalog.ratings[rows] / 10)
+
+    prices = catalog.prices[rows]
+    reference = catalog.prices[session.shown] if session.shown is not None else None
+    keep = np.ones(len(rows), dtype=bool)
+    if intent["max_price"] is not None:
+        keep &= prices <= intent["max_price"]
+    if intent["min_price"] is not None:
+        keep &= prices >= intent["min_price"]
+    if intent["cheaper"] and reference is not None and intent["max_price"] is None:
+        keep &= prices < reference
+    if intent["pricier"] and reference is not None and intent["min_price"] is None:
+        keep &= prices > reference
+    rows, scores, ranking = rows[keep], scores[keep], ranking[keep]
+
+    # Sort keys, most significant last (np.lexsort): row, score, then rating / attribute
+    keys = [rows, -ranking]
+    if intent["rating"]:
+        keys.append(-catalog.ratings[rows])
+    if intent["attribute"] is not None and len(rows):
+        attribute, direction = intent["attribute"]
+        values = np.array([spec_value(catalog.rows[r].get('specifications') or "", attribute) for r in rows.tolist()])
+        if not np.isnan(values).all():
+            has_value = ~np.isnan(values)
+            rows, scores, keys = rows[has_value], scores[has_value], [k[has_value] for k in keys]
+            keys.append(-direction * values[has_value])
+    order = np.lexsort(keys)
+    return rows[order], scores[order]
+
+def price_range(message, catalog, session):
+    # (min_price, max_price) a follow-up asks for, for a re-search of the last query
+    intent = parse_followup(message)
+    reference = catalog.prices[session.shown] if session.shown is not None else None
+    low = intent["min_price"] if intent["min_price"] is not None else 0
+    high = intent["max_price"] if intent["max_price"] is not None else 1000000
+    if intent["cheaper"] and reference is not None and intent["max_price"] is None:
+        high = float(np.nextafter(reference, -np.inf))
+    if intent["pricier"] and reference is not None and intent["min_price"] is None:
+        low = float(np.nextafter(reference, np.inf))
+    return low, high
@@ -0,0 +1,28 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+# --- READ-ONLY SQLITE CONNECTIONS ---
+# The DB is only read once per catalog version (Catalog.from_db); every
+# request is then served from memory. That one read goes through a
+# read-only connection, opened in `mode=ro` URI form and tuned with mmap_size
+# and cache_size for the single full scan, and closed straight after, so the
+# threads LiveCatalog loads on never leave handles on old DB files behind.
+# embed_products.py writes in WAL mode and hands the DB back in
+# rollback-journal mode, so `mode=ro` works from a read-only directory.
+
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_KB = int(os.environ.get("SQLITE_CACHE_KB", 64 * 1024))
+
+@contextmanager
+def read_connection(db_path):
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    try:
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_KB}") # negative = KiB
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        yield conn
+    finally:
+        conn.close()
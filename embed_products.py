@@ -1,60 +1,410 @@
 import sqlite3
 import pandas as pd
 from sentence_transformers import SentenceTransformer
+import argparse
+import hashlib
 import json
+import multiprocessing
 import os
+import queue
+import resource
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from vector_store import encode_vector
+from ann_index import IVFIndex, index_path_for
+from catalog import Catalog
+from shared_index import publish
 
 DB_FILE = 'product_search.db'
 CSV_FILE = 'products.csv'
+MODEL_NAME = 'all-MiniLM-L6-v2'
 
-def embed_products():
+# --- HELPERS ---
+def embed_texts(df):
+    # Embedding Strategy: Name + Category + Specifications
+    # This ensures "Laptop 16GB RAM" matches query "16gb laptop"
+    return df.apply(lambda x: f"{x['product_name']} {x['category']} {x['specifications']}", axis=1).tolist()
+
+def content_hash(text, model_name=MODEL_NAME):
+    # Same text + same model => same embedding, so the row can be reused as-is
+    return hashlib.sha256(f"{model_name}\n{text}".encode('utf-8')).hexdigest()
+
+def vector_value(embedding, vector_format):
+    # Compact float32 BLOB by default; 'json' keeps the legacy text format
+    if vector_format == 'json':
+        return json.dumps(embedding.tolist())
+    return encode_vector(embedding)
+
+def product_row(row, embedding_id, text_hash):
+    return (
+        int(row['product_id']),
+        row['product_name'],
+        row['category'],
+        row['price'],
+        row['rating'],
+        row['specifications'], # New Column
+        text_hash,
+        embedding_id,
+    )
+
+INSERT_SQL = '''
+    INSERT OR REPLACE INTO products_vectors (product_id, product_name, category, price, rating, specifications, content_hash, embedding_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# --- SHARED EMBEDDINGS ---
+# Copies of a model that only differ in price/rating embed the same text, so
+# each distinct text (content_hash) is encoded and stored once in `embeddings`
+# and products point at it through embedding_id.
+def embedding_ids(conn, hashes):
+    # content_hash -> embedding_id, for the hashes already stored
+    ids = {}
+    unique = list(set(hashes))
+    for start in range(0, len(unique), 500): # Stay under SQLite's bound-parameter limit
+        part = unique[start:start + 500]
+        ids.update(conn.execute(
+            f"SELECT content_hash, embedding_id FROM embeddings WHERE content_hash IN ({','.join('?' * len(part))})", part
+        ))
+    return ids
+
+def insert_embeddings(conn, hashes, embeddings, vector_format):
+    conn.executemany(
+        "INSERT OR IGNORE INTO embeddings (content_hash, vector) VALUES (?, ?)",
+        ((h, vector_value(e, vector_format)) for h, e in zip(hashes, embeddings)),
+    )
+
+def store_embeddings(conn, texts, hashes, encode, vector_format):
+    # embedding_id for every text; only hashes not stored yet are passed to encode()
+    ids = embedding_ids(conn, hashes)
+    missing = {h: t for h, t in zip(hashes, texts) if h not in ids}
+    if missing:
+        insert_embeddings(conn, list(missing), encode(list(missing.values())), vector_format)
+        ids.update(embedding_ids(conn, list(missing)))
+    return [ids[h] for h in hashes], len(missing)
+
+def delete_unused_embeddings(conn):
+    return conn.execute(
+        "DELETE FROM embeddings WHERE embedding_id NOT IN "
+        "(SELECT embedding_id FROM products_vectors WHERE embedding_id IS NOT NULL)"
+    ).rowcount
+
+def open_writer():
+    # WAL only while building: readers of the old file keep reading while we write
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
+
+def close_writer(conn):
+    # Fold the WAL back into the main file, so its mtime/size (db_signature)
+    # change and readers notice the new catalog. The journal mode is stored in
+    # the DB file: switch back to a rollback journal, so the shipped DB opens
+    # `mode=ro` from a read-only directory (Lambda's /var/task, read-only
+    # mounts) without needing to create -wal/-shm files next to it.
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.close()
+
+def remove_db():
+    for path in (DB_FILE, DB_FILE + "-wal", DB_FILE + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def upgrade_schema(conn):
+    # DBs built before incremental mode have no content_hash column yet,
+    # and ones built before shared embeddings no embedding_id
+    columns = [r[1] for r in conn.execute("PRAGMA table_info(products_vectors)")]
+    if 'content_hash' not in columns:
+        conn.execute("ALTER TABLE products_vectors ADD COLUMN content_hash TEXT")
+    if 'embedding_id' not in columns:
+        conn.execute("ALTER TABLE products_vectors ADD COLUMN embedding_id INTEGER REFERENCES embeddings (embedding_id)")
+    # Missing tables / indexes (embeddings, the (category, price) index, ...)
+    with open('schema.sql', 'r') as f:
+        conn.executescript(f.read())
+
+def bump_catalog_version(conn):
+    # Tags cached API responses (response_cache.py): a new version means old entries are stale
+    conn.execute("CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('version', ?)", (uuid.uuid4().hex,))
+
+def build_search_artifacts():
+    # ANN Index (IVF-flat) and shared search index, both rebuilt from the final DB
+    catalog = Catalog.from_db(DB_FILE)
+
+    print("Building ANN Index...")
+    index = IVFIndex.build_for_catalog(catalog)
+    index.save(index_path_for(DB_FILE))
+    print(f"ANN Index Ready! ({index.nlist} lists)")
+
+    # Published index: every API/Lambda worker memory-maps the same copy and
+    # switches to it on its next request (shared_index.py)
+    version = publish(catalog, DB_FILE)
+    print(f"Search Index Published! ({version})")
+
+# --- FULL BUILD ---
+def embed_products(vector_format='blob'):
     print("Loading Expert Model (All-MiniLM-L6-v2) for Text-Only Precision...")
     # Switched back to text-optimized model as we dropped images
-    model = SentenceTransformer('all-MiniLM-L6-v2') 
-    
+    model = SentenceTransformer(MODEL_NAME)
+
     # Read CSV
     df = pd.read_csv(CSV_FILE)
-    
+
     # Connect DB (Reset)
-    if os.path.exists(DB_FILE):
-        os.remove(DB_FILE)
-        
-    conn = sqlite3.connect(DB_FILE)
+    remove_db()
+
+    conn = open_writer()
     cursor = conn.cursor()
-    
+
     # Read Schema
     with open('schema.sql', 'r') as f:
         cursor.executescript(f.read())
-        
+
     print("Embedding Specifications...")
-    vectors = []
-    
-    # Embedding Strategy: Name + Category + Specifications
-    # This ensures "Laptop 16GB RAM" matches query "16gb laptop"
-    texts_to_embed = df.apply(lambda x: f"{x['product_name']} {x['category']} {x['specifications']}", axis=1).tolist()
-    embeddings = model.encode(texts_to_embed, show_progress_bar=True)
-    
+    texts_to_embed = embed_texts(df)
+    hashes = [content_hash(t) for t in texts_to_embed]
+    ids, encoded = store_embeddings(
+        conn, texts_to_embed, hashes, lambda texts: model.encode(texts, show_progress_bar=True), vector_format
+    )
+    print(f"Encoded {encoded} distinct texts for {len(texts_to_embed)} products "
+          f"(dedup ratio {len(texts_to_embed) / max(encoded, 1):.1f}x)")
+
     data_to_insert = []
     for idx, row in df.iterrows():
-        vec_json = json.dumps(embeddings[idx].tolist())
-        data_to_insert.append((
-            row['product_id'],
-            row['product_name'],
-            row['category'],
-            row['price'],
-            row['rating'],
-            row['specifications'], # New Column
-            vec_json
-        ))
-        
-    cursor.executemany('''
-        INSERT INTO products_vectors (product_id, product_name, category, price, rating, specifications, vector)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', data_to_insert)
-    
+        data_to_insert.append(product_row(row, ids[idx], hashes[idx]))
+
+    cursor.executemany(INSERT_SQL, data_to_insert)
+    bump_catalog_version(conn)
+
     conn.commit()
-    conn.close()
+    close_writer(conn)
+
+    build_search_artifacts()
+    print("Expert Database Ready!")
+
+# --- INCREMENTAL BUILD ---
+# Only rows whose embedded text (or the model) changed are re-encoded; rows
+# that disappeared from the CSV are deleted. Everything is applied to the
+# existing DB in one transaction, so readers never see a missing or
+# half-updated catalog.
+def embed_products_incremental(vector_format='blob'):
+    if not os.path.exists(DB_FILE):
+        print("No existing database found, running a full build.")
+        return embed_products(vector_format)
+
+    df = pd.read_csv(CSV_FILE)
+    texts = embed_texts(df)
+    hashes = [content_hash(t) for t in texts]
+    records = df.to_dict('records')
+
+    conn = open_writer()
+    upgrade_schema(conn)
+    existing = dict(conn.execute("SELECT product_id, content_hash FROM products_vectors").fetchall())
+
+    product_ids = [int(r['product_id']) for r in records]
+    changed = [i for i, (pid, h) in enumerate(zip(product_ids, hashes)) if existing.get(pid) != h]
+    changed_set = set(changed)
+    reused = [i for i in range(len(records)) if i not in changed_set]
+    removed = sorted(set(existing) - set(product_ids))
+
+    def encode(new_texts):
+        # Only texts with no stored embedding get here (another product may already share it)
+        print(f"Loading Expert Model ({MODEL_NAME})...")
+        model = SentenceTransformer(MODEL_NAME)
+        print(f"Embedding {len(new_texts)} new distinct texts...")
+        return model.encode(new_texts, show_progress_bar=True)
+
+    with conn: # One transaction for the whole update
+        # New / changed rows: point them at their (possibly new) shared embedding
+        ids, encoded = store_embeddings(conn, [texts[i] for i in changed], [hashes[i] for i in changed], encode, vector_format)
+        conn.executemany("DELETE FROM products_vectors WHERE product_id = ?", [(product_ids[i],) for i in changed])
+        conn.executemany(INSERT_SQL, [
+            product_row(records[i], ids[n], hashes[i]) for n, i in enumerate(changed)
+        ])
+        # Reused rows keep their embedding, but price/rating are not part of the hash
+        updated = conn.executemany(
+            "UPDATE products_vectors SET price = ?, rating = ? WHERE product_id = ? AND (price IS NOT ? OR rating IS NOT ?)",
+            [(records[i]['price'], records[i]['rating'], product_ids[i], records[i]['price'], records[i]['rating']) for i in reused],
+        ).rowcount
+        # Rows no longer in the CSV, and embeddings no product uses any more
+        conn.executemany("DELETE FROM products_vectors WHERE product_id = ?", [(pid,) for pid in removed])
+        unused = delete_unused_embeddings(conn)
+        if changed or removed or updated:
+            bump_catalog_version(conn)
+    close_writer(conn)
+
+    print("--- Incremental Embedding Report ---")
+    print(f"  Reused:      {len(reused)} ({updated} with new price/rating)")
+    print(f"  Re-embedded: {len(changed)} ({encoded} new distinct texts encoded)")
+    print(f"  Deleted:     {len(removed)} ({unused} unused embeddings dropped)")
+
+    if changed or removed or updated:
+        build_search_artifacts()
+    print("Expert Database Ready!")
+
+# --- STREAMING BUILD ---
+# For catalogs too big to hold in memory. Three pipelined stages:
+#   reader  - reads the CSV in chunks of `batch_size` rows
+#   encoder - encodes each chunk, in this process or on a pool of worker processes
+#   writer  - inserts each encoded chunk and commits it together with its progress
+# The queues between stages are bounded, so at most a few batches are in memory
+# at once. Progress is committed with each batch, so an interrupted run can
+# continue with --resume.
+# Only the ingestion is bounded: build_search_artifacts() then loads the whole
+# catalog (rows + float32 matrix) to build the ANN index and publish it, which
+# is O(N) in memory. The report gives the peak RSS of both steps.
+STREAM_BATCH_SIZE = 1024
+STREAM_QUEUE_DEPTH = 4
+
+_worker_model = None
+
+def _init_encoder_worker():
+    global _worker_model
+    _worker_model = SentenceTransformer(MODEL_NAME)
+
+def _encode_in_worker(texts):
+    return _worker_model.encode(texts)
+
+def peak_rss_mb():
+    # Peak RSS so far of this process or of its largest encoder worker
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024 # KB on Linux
+
+def _read_chunks(out_queue, batch_size, skip_rows):
+    try:
+        for chunk in pd.read_csv(CSV_FILE, chunksize=batch_size, skiprows=range(1, skip_rows + 1)):
+            out_queue.put(chunk)
+    except Exception as e:
+        out_queue.put(e)
+    out_queue.put(None)
+
+def _encode_chunks(in_queue, out_queue, model, pool, seen_hashes):
+    while True:
+        chunk = in_queue.get()
+        if chunk is None or isinstance(chunk, Exception):
+            out_queue.put(chunk)
+            return
+        texts = embed_texts(chunk)
+        hashes = [content_hash(t) for t in texts]
+        # Only texts not encoded earlier in this run (or stored before a --resume)
+        new = {h: t for h, t in zip(hashes, texts) if h not in seen_hashes}
+        seen_hashes.update(new)
+        try:
+            # With a pool, hand the future on right away so several batches encode in parallel
+            new_texts = list(new.values())
+            embeddings = pool.submit(_encode_in_worker, new_texts) if pool else model.encode(new_texts)
+        except Exception as e:
+            out_queue.put(e)
+            return
+        out_queue.put((chunk, hashes, list(new), embeddings))
+
+def embed_products_streaming(vector_format='blob', batch_size=STREAM_BATCH_SIZE, workers=0, resume=False):
+    conn = open_writer()
+    conn.execute("CREATE TABLE IF NOT EXISTS ingest_progress (source TEXT PRIMARY KEY, rows_done INTEGER NOT NULL)")
+    row = conn.execute("SELECT rows_done FROM ingest_progress WHERE source = ?", (CSV_FILE,)).fetchone() if resume else None
+    rows_done = row[0] if row else 0
+
+    if rows_done:
+        print(f"Resuming after {rows_done} already committed rows...")
+        upgrade_schema(conn)
+    else:
+        if resume:
+            print("Nothing to resume, starting from the beginning.")
+        # Connect DB (Reset)
+        conn.close()
+        remove_db()
+        conn = open_writer()
+        with open('schema.sql', 'r') as f:
+            conn.executescript(f.read())
+        conn.execute("CREATE TABLE ingest_progress (source TEXT PRIMARY KEY, rows_done INTEGER NOT NULL)")
+        conn.commit()
+
+    model, pool = None, None
+    if workers > 0:
+        print(f"Starting {workers} encoder worker processes ({MODEL_NAME})...")
+        context = multiprocessing.get_context("spawn") # torch is already imported (and may run threads): no fork
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_encoder_worker)
+    else:
+        print(f"Loading Expert Model ({MODEL_NAME})...")
+        model = SentenceTransformer(MODEL_NAME)
+
+    read_queue = queue.Queue(maxsize=STREAM_QUEUE_DEPTH)
+    write_queue = queue.Queue(maxsize=STREAM_QUEUE_DEPTH + workers)
+    threading.Thread(target=_read_chunks, args=(read_queue, batch_size, rows_done), daemon=True).start()
+    seen_hashes = {h for (h,) in conn.execute("SELECT content_hash FROM embeddings")}
+    threading.Thread(target=_encode_chunks, args=(read_queue, write_queue, model, pool, seen_hashes), daemon=True).start()
+
+    start = time.perf_counter()
+    written = encoded = 0
+    try:
+        while True:
+            item = write_queue.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            chunk, hashes, new_hashes, embeddings = item
+            if pool:
+                embeddings = embeddings.result()
+
+            with conn: # The batch and its progress marker commit together
+                insert_embeddings(conn, new_hashes, embeddings, vector_format)
+                ids = embedding_ids(conn, hashes)
+                data = [product_row(r, ids[h], h) for r, h in zip(chunk.to_dict('records'), hashes)]
+                conn.executemany(INSERT_SQL, data)
+                conn.execute("INSERT OR REPLACE INTO ingest_progress (source, rows_done) VALUES (?, ?)",
+                             (CSV_FILE, rows_done + written + len(data)))
+            written += len(data)
+            encoded += len(new_hashes)
+            elapsed = time.perf_counter() - start
+            print(f"  committed {rows_done + written} rows ({written / elapsed:.0f} rows/sec)")
+    except BaseException:
+        conn.close() # Committed batches stay; --resume continues after them
+        raise
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    with conn:
+        conn.execute("DELETE FROM ingest_progress WHERE source = ?", (CSV_FILE,))
+        bump_catalog_version(conn)
+    close_writer(conn)
+
+    elapsed = time.perf_counter() - start
+    ingest_peak_mb = peak_rss_mb()
+    build_search_artifacts() # O(N) memory: loads the full catalog
+    publish_peak_mb = peak_rss_mb()
+
+    print("--- Streaming Ingestion Report ---")
+    print(f"  Rows:       {written} in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.0f} rows/sec)")
+    print(f"  Encoded:    {encoded} distinct texts")
+    print(f"  Batch size: {batch_size} rows")
+    print(f"  Encoding:   {f'{workers} worker processes' if workers else 'in-process'}")
+    print(f"  Peak RSS:   {ingest_peak_mb:.0f} MB ingesting (bounded by batch size)")
+    # ru_maxrss only grows, so this is the peak of the whole run
+    print(f"              {publish_peak_mb:.0f} MB with the ANN index + publish (whole catalog in memory)")
     print("Expert Database Ready!")
 
 if __name__ == "__main__":
-    embed_products()
+    parser = argparse.ArgumentParser(description="Embed products.csv into product_search.db")
+    parser.add_argument('--vector-format', choices=['blob', 'json'], default='blob',
+                        help="Storage format of the vector column (default: float32 BLOB)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only re-embed new/changed rows of an existing DB")
+    parser.add_argument('--stream', action='store_true',
+                        help="Chunked, pipelined ingestion for large CSVs")
+    parser.add_argument('--batch-size', type=int, default=STREAM_BATCH_SIZE,
+                        help="Rows per batch in --stream mode")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Encoder worker processes in --stream mode (0 = encode in-process)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted --stream run from its last committed batch")
+    args = parser.parse_args()
+    if args.stream:
+        embed_products_streaming(vector_format=args.vector_format, batch_size=args.batch_size,
+                                 workers=args.workers, resume=args.resume)
+    elif args.incremental:
+        embed_products_incremental(vector_format=args.vector_format)
+    else:
+        embed_products(vector_format=args.vector_format)
@@ -0,0 +1,71 @@
+import numpy as np
+
+# --- COLUMNAR FILTER INDEX ---
+# Built once when the catalog loads. Prices are kept sorted next to their row
+# ids, so a price range is two binary searches (np.searchsorted, i.e. bisect)
+# plus one slice; each category has a precomputed boolean mask. The resulting
+# candidate mask feeds straight into vectorised scoring.
+
+class FilterIndex:
+    def __init__(self, prices, categories):
+        prices = np.asarray(prices, dtype=np.float64)
+        categories = np.asarray(categories, dtype=object)
+        category_names = sorted(set(categories.tolist()))
+        category_codes = {c: n for n, c in enumerate(category_names)}
+        price_order = np.argsort(prices, kind='stable') # row ids by ascending price
+        self._set_arrays(
+            prices, price_order, prices[price_order],
+            np.array([category_codes[c] for c in categories.tolist()], dtype=np.int32), category_names,
+        )
+
+    @classmethod
+    def from_arrays(cls, prices, price_order, sorted_prices, row_category_codes, category_names):
+        # Prebuilt arrays, e.g. memory-mapped from a published index (shared_index.py)
+        index = cls.__new__(cls)
+        index._set_arrays(prices, price_order, sorted_prices, row_category_codes, category_names)
+        return index
+
+    def _set_arrays(self, prices, price_order, sorted_prices, row_category_codes, category_names):
+        self.size = len(prices)
+        self.prices = prices
+        self.price_order = price_order
+        self.sorted_prices = sorted_prices
+        # Integer category codes, for building many queries' masks at once
+        self.category_codes = {c: n for n, c in enumerate(category_names)}
+        self.row_category_codes = row_category_codes
+        self.category_masks = {c: row_category_codes == n for c, n in self.category_codes.items()}
+
+    def price_rows(self, min_price, max_price):
+        # Row ids with min_price <= price <= max_price (same bounds as SQL BETWEEN)
+        lo = np.searchsorted(self.sorted_prices, min_price, side='left')
+        hi = np.searchsorted(self.sorted_prices, max_price, side='right')
+        return self.price_order[lo:hi]
+
+    def mask(self, min_price, max_price, category=None):
+        rows = self.price_rows(min_price, max_price)
+        if len(rows) == self.size:
+            mask = np.ones(self.size, dtype=bool)
+        else:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[rows] = True
+
+        if category and category != "All":
+            category_mask = self.category_masks.get(category)
+            if category_mask is None:
+                return np.zeros(self.size, dtype=bool)
+            mask &= category_mask
+        return mask
+
+    def masks(self, filters):
+        # (len(filters), size) candidate masks for (min_price, max_price, category)
+        # tuples, built with one broadcast comparison instead of one pass per query
+        min_prices = np.array([f[0] for f in filters], dtype=np.float64)[:, None]
+        max_prices = np.array([f[1] for f in filters], dtype=np.float64)[:, None]
+        # -1 = any category, -2 = unknown category (matches nothing)
+        codes = np.array([
+            -1 if not c or c == "All" else self.category_codes.get(c, -2) for _, _, c in filters
+        ], dtype=np.int32)[:, None]
+        return (
+            (self.prices >= min_prices) & (self.prices <= max_prices)
+            & ((codes == -1) | (self.row_category_codes == codes))
+        )
@@ -52,6 +52,8 @@ export default function Home() {
     { role: 'bot', text: "Namaste! I'm your AI Product Expert. Need a recommendation or have questions about specs? Just ask!" }
   ]);
   const [isChatLoading, setIsChatLoading] = useState(false);
+  // Follow-ups ("cheaper one?") are answered from this conversation's last results
+  const [chatSessionId] = useState(() => Math.random().toString(36).slice(2) + Date.now().toString(36));
 
   // --- MODAL STATE ---
   const [selectedProduct, setSelectedProduct] = useState<Product | null>(null);
@@ -101,7 +103,7 @@ export default function Home() {
     setIsChatLoading(true);
 
     try {
-      const res = await axios.post(`${API_URL}/chat`, { message: chatInput });
+      const res = await axios.post(`${API_URL}/chat`, { message: chatInput, session_id: chatSessionId });
       const botMsg = { role: 'bot', text: res.data.response };
       setChatMessages(prev => [...prev, botMsg]);
     } catch (err) {
@@ -103,71 +103,74 @@ def get_specs(category, name):
 
     return " | ".join(specs)
 
-def generate_products():
-    models = {
-        'Electronics': {
-            'Apple': ['MacBook Air M1', 'MacBook Air M2', 'MacBook Pro 14', 'iPhone 13', 'iPhone 14', 'iPhone 15 Pro', 'Watch Series 9', 'AirPods Pro 2'],
-            'Samsung': ['Galaxy S23 Ultra', 'Galaxy S21 FE', 'Galaxy Z Fold 5', 'Galaxy Book 3', 'Galaxy Watch 6', 'Galaxy Buds 2'],
-            'Sony': ['Alpha a7M4 Camera', 'Alpha ZV-E10', 'Bravia 55" 4K TV', 'WH-1000XM5 Headphones', 'PlayStation 5'],
-            'Dell': ['XPS 13 Plus', 'Inspiron 15', 'Alienware m15 R7', 'G15 Gaming'],
-            'HP': ['Pavilion 15', 'Spectre x360', 'Victus Gaming', 'Deskjet Ink Advantage'],
-            'Lenovo': ['ThinkPad X1 Carbon', 'IdeaPad Slim 3', 'Legion 5 Pro', 'Tab M10'],
-            'Asus': ['Vivobook 16X', 'TUF Gaming F15', 'ROG Zephyrus G14', 'Zenbook S 13'],
-            'Acer': ['Predator Helios', 'Nitro 5', 'Swift Go', 'Aspire 5'],
-            'MSI': ['Titan GT77', 'Stealth GS66', 'Katana GF66', 'Modern 14'],
-            'Google': ['Pixel 8 Pro', 'Pixel 7a', 'Pixel Watch 2', 'Pixel Buds Pro'],
-            'OnePlus': ['OnePlus 11 5G', 'OnePlus Nord CE 3', 'OnePlus Open Fold'],
-            'Nothing': ['Phone (2)', 'Phone (1)', 'Nothing Ear (2)'],
-            'Realme': ['Realme GT 2 Pro', 'Realme Narzo 60', 'Realme 11 Pro+'],
-            'Xiaomi': ['Xiaomi 13 Pro', 'Redmi Note 12', 'Mi Pad 6'],
-            'Vivo': ['Vivo X90 Pro', 'Vivo V27', 'Vivo T2x 5G'],
-            'Oppo': ['Oppo Reno 10 Pro', 'Oppo F23', 'Oppo Find N3 Flip'],
-            'JBL': ['Flip 6 Speaker', 'Boombox 3', 'Live 660NC'],
-            'Sennheiser': ['HD 660S2', 'Momentum 4', 'CX Plus'],
-            'Panasonic': ['Lumix S5II', 'Lumix GH6', 'Smart TV 4K'],
-            'Nikon': ['Z9 Mirrorless', 'Zfc Retro', 'D850 DSLR'],
-            'Canon': ['EOS R10 Mirrorless', 'EOS 1500D DSLR', 'Pixma G3000 Printer'],
-            'Fastrack': ['Limitless FS1 Smartwatch', 'Fastrack Reflex Beat', 'Stunners Analog Watch'],
-            'Titan': ['Titan Neo IV Analog', 'Titan Raga Viva', 'Titan Smart 3'],
-            'Casio': ['G-Shock GA-2100', 'Enticer Analog', 'Vintage Digital Watch'],
-            'Fossil': ['Gen 6 Smartwatch', 'Grant Chronograph', 'Machine Leather Watch'],
-            'Boat': ['Rockerz 450', 'Airdopes 141', 'Xtend Smartwatch', 'Stone 350 Speaker']
-        },
-        'Fashion': {
-            'Nike': ['Air Jordan 1', 'Air Force 1', 'Dri-Fit T-Shirt'],
-            'Adidas': ['Ultraboost Light', 'Stan Smith', 'Originals Track Jacket'],
-            'Levi\'s': ['501 Original Jeans', 'Sherpa Trucker Jacket', 'Graphic T-Shirt'],
-            'H&M': ['Oversized Hoodie', 'Relaxed Fit Jeans', 'Cotton T-Shirt'],
-            'Zara': ['Faux Leather Jacket', 'Slim Fit Suit', 'Summer Shirt'],
-            'Bata': ['Formal Leather Shoes', 'Casual Loafers', 'Hush Puppies'],
-            'Red Tape': ['Formal Oxfords', 'Retro Sneakers', 'Slim Fit Jeans'],
-            'Woodland': ['Camel Leather Boots', 'Casual Loafers'],
-            'Puma': ['RS-X Sneakers', 'Motorsport T-Shirt']
-        },
-        'Groceries': {
-            'Nestle': ['Maggi Masala Noodles', 'Nescafe Classic', 'KitKat Share Bag'],
-            'Britannia': ['Good Day Biscuits', 'Marie Gold', 'Milk Bikis'],
-            'ITC': ['Aashirvaad Ghee', 'Sunfeast Dark Fantasy', 'Bingo Mad Angles'],
-            'Tata': ['Premium Tea', 'Salt', 'Sampann Pulses'],
-            'Dabur': ['Chyawanprash', 'Honey', 'Red Paste'],
-            'Savlon': ['Antiseptic Liquid', 'Moisturizing Soap'],
-            'Dettol': ['Antiseptic Liquid', 'Liquid Handwash'],
-            'Boro Plus': ['Antiseptic Cream', 'Body Lotion'],
-            'Colgate': ['Strong Teeth Paste', 'MaxFresh Red Gel'],
-            'Amul': ['Salted Butter', 'Taaza Milk', 'Processed Cheese Block'],
-            'Maggi': ['2-Minute Masala Noodles']
-        }
+# Brand -> model lineup per category (also used by benchmarks/synthetic_catalog.py)
+MODELS = {
+    'Electronics': {
+        'Apple': ['MacBook Air M1', 'MacBook Air M2', 'MacBook Pro 14', 'iPhone 13', 'iPhone 14', 'iPhone 15 Pro', 'Watch Series 9', 'AirPods Pro 2'],
+        'Samsung': ['Galaxy S23 Ultra', 'Galaxy S21 FE', 'Galaxy Z Fold 5', 'Galaxy Book 3', 'Galaxy Watch 6', 'Galaxy Buds 2'],
+        'Sony': ['Alpha a7M4 Camera', 'Alpha ZV-E10', 'Bravia 55" 4K TV', 'WH-1000XM5 Headphones', 'PlayStation 5'],
+        'Dell': ['XPS 13 Plus', 'Inspiron 15', 'Alienware m15 R7', 'G15 Gaming'],
+        'HP': ['Pavilion 15', 'Spectre x360', 'Victus Gaming', 'Deskjet Ink Advantage'],
+        'Lenovo': ['ThinkPad X1 Carbon', 'IdeaPad Slim 3', 'Legion 5 Pro', 'Tab M10'],
+        'Asus': ['Vivobook 16X', 'TUF Gaming F15', 'ROG Zephyrus G14', 'Zenbook S 13'],
+        'Acer': ['Predator Helios', 'Nitro 5', 'Swift Go', 'Aspire 5'],
+        'MSI': ['Titan GT77', 'Stealth GS66', 'Katana GF66', 'Modern 14'],
+        'Google': ['Pixel 8 Pro', 'Pixel 7a', 'Pixel Watch 2', 'Pixel Buds Pro'],
+        'OnePlus': ['OnePlus 11 5G', 'OnePlus Nord CE 3', 'OnePlus Open Fold'],
+        'Nothing': ['Phone (2)', 'Phone (1)', 'Nothing Ear (2)'],
+        'Realme': ['Realme GT 2 Pro', 'Realme Narzo 60', 'Realme 11 Pro+'],
+        'Xiaomi': ['Xiaomi 13 Pro', 'Redmi Note 12', 'Mi Pad 6'],
+        'Vivo': ['Vivo X90 Pro', 'Vivo V27', 'Vivo T2x 5G'],
+        'Oppo': ['Oppo Reno 10 Pro', 'Oppo F23', 'Oppo Find N3 Flip'],
+        'JBL': ['Flip 6 Speaker', 'Boombox 3', 'Live 660NC'],
+        'Sennheiser': ['HD 660S2', 'Momentum 4', 'CX Plus'],
+        'Panasonic': ['Lumix S5II', 'Lumix GH6', 'Smart TV 4K'],
+        'Nikon': ['Z9 Mirrorless', 'Zfc Retro', 'D850 DSLR'],
+        'Canon': ['EOS R10 Mirrorless', 'EOS 1500D DSLR', 'Pixma G3000 Printer'],
+        'Fastrack': ['Limitless FS1 Smartwatch', 'Fastrack Reflex Beat', 'Stunners Analog Watch'],
+        'Titan': ['Titan Neo IV Analog', 'Titan Raga Viva', 'Titan Smart 3'],
+        'Casio': ['G-Shock GA-2100', 'Enticer Analog', 'Vintage Digital Watch'],
+        'Fossil': ['Gen 6 Smartwatch', 'Grant Chronograph', 'Machine Leather Watch'],
+        'Boat': ['Rockerz 450', 'Airdopes 141', 'Xtend Smartwatch', 'Stone 350 Speaker']
+    },
+    'Fashion': {
+        'Nike': ['Air Jordan 1', 'Air Force 1', 'Dri-Fit T-Shirt'],
+        'Adidas': ['Ultraboost Light', 'Stan Smith', 'Originals Track Jacket'],
+        'Levi\'s': ['501 Original Jeans', 'Sherpa Trucker Jacket', 'Graphic T-Shirt'],
+        'H&M': ['Oversized Hoodie', 'Relaxed Fit Jeans', 'Cotton T-Shirt'],
+        'Zara': ['Faux Leather Jacket', 'Slim Fit Suit', 'Summer Shirt'],
+        'Bata': ['Formal Leather Shoes', 'Casual Loafers', 'Hush Puppies'],
+        'Red Tape': ['Formal Oxfords', 'Retro Sneakers', 'Slim Fit Jeans'],
+        'Woodland': ['Camel Leather Boots', 'Casual Loafers'],
+        'Puma': ['RS-X Sneakers', 'Motorsport T-Shirt']
+    },
+    'Groceries': {
+        'Nestle': ['Maggi Masala Noodles', 'Nescafe Classic', 'KitKat Share Bag'],
+        'Britannia': ['Good Day Biscuits', 'Marie Gold', 'Milk Bikis'],
+        'ITC': ['Aashirvaad Ghee', 'Sunfeast Dark Fantasy', 'Bingo Mad Angles'],
+        'Tata': ['Premium Tea', 'Salt', 'Sampann Pulses'],
+        'Dabur': ['Chyawanprash', 'Honey', 'Red Paste'],
+        'Savlon': ['Antiseptic Liquid', 'Moisturizing Soap'],
+        'Dettol': ['Antiseptic Liquid', 'Liquid Handwash'],
+        'Boro Plus': ['Antiseptic Cream', 'Body Lotion'],
+        'Colgate': ['Strong Teeth Paste', 'MaxFresh Red Gel'],
+        'Amul': ['Salted Butter', 'Taaza Milk', 'Processed Cheese Block'],
+        'Maggi': ['2-Minute Masala Noodles']
     }
+}
+
+def product_name(brand, item):
+    if any(x in item for x in [brand, 'iPhone', 'Galaxy', 'MacBook', 'Pixel']):
+        return item
+    return f"{brand} {item}"
 
+def generate_products():
     products = []
     
-    for category, brands in models.items():
+    for category, brands in MODELS.items():
         for brand, items in brands.items():
             for item in items:
-                if any(x in item for x in [brand, 'iPhone', 'Galaxy', 'MacBook', 'Pixel']):
-                    final_name = item
-                else:
-                    final_name = f"{brand} {item}"
+                final_name = product_name(brand, item)
                 
                 # Generate copies (Increased for 1500+ items)
                 for _ in range(18): 
@@ -0,0 +1,76 @@
+import gzip
+import hashlib
+import os
+from query_cache import LRUCache
+
+try:
+    import brotli # In backend/requirements.txt; without it only gzip is offered
+except ImportError:
+    brotli = None
+
+# --- HTTP RESPONSE ENCODING ---
+# The API's JSON bodies carry a weak ETag (a hash of the uncompressed body):
+# a client repeating a query with If-None-Match gets an empty 304 instead of
+# the body. Bodies of COMPRESS_MIN_BYTES or more are compressed when the
+# client accepts it: br first (brotli is in backend/requirements.txt), else
+# gzip; an install without the brotli package serves gzip only.
+# Compressed bodies are cached by (ETag, encoding), so a popular response is
+# compressed once, not on every request.
+
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024)) # Smaller bodies go out as is
+COMPRESSED_CACHE_SIZE = int(os.environ.get("COMPRESSED_CACHE_SIZE", 512))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5 # Close to gzip -6 speed, smaller output
+
+compressed_cache = LRUCache(maxsize=COMPRESSED_CACHE_SIZE)
+
+def etag(body):
+    return 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+def not_modified(if_none_match, tag):
+    # If-None-Match holds one or more tags, or "*"; weak comparison (W/ ignored)
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or tag[2:] in (t[2:] if t.startswith("W/") else t for t in tags)
+
+def choose_encoding(accept_encoding):
+    # "br", "gzip" or None for an Accept-Encoding header (q=0 refuses an encoding)
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for name in (("br", "gzip") if brotli is not None else ("gzip",)):
+        if accepted.get(name, accepted.get("*", 0.0)) > 0:
+            return name
+    return None
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def encode_body(body, accept_encoding, if_none_match=None):
+    # -> (status, body to send, headers) for a JSON body and the request's
+    # Accept-Encoding / If-None-Match headers
+    tag = etag(body)
+    headers = {"ETag": tag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if not_modified(if_none_match, tag):
+        return 304, b"", headers
+    encoding = choose_encoding(accept_encoding) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding is None:
+        return 200, body, headers
+    key = (tag, encoding)
+    compressed = compressed_cache.get(key)
+    if compressed is None:
+        compressed = compress(body, encoding)
+        compressed_cache.put(key, compressed)
+    headers["Content-Encoding"] = encoding
+    return 200, compressed, headers
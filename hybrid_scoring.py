@@ -0,0 +1,53 @@
+import numpy as np
+from ann_index import ANN_MIN_ROWS, ANN_NPROBE
+from quantization import QUANT_MARGIN, QUANT_RESCORE, shortlist
+
+# --- HYBRID SCORING (API search) ---
+# The scoring half of backend/main.py search_products: semantic similarity +
+# BM25 keyword boost + exact name match, weighted by rating, over a set of
+# filtered candidate rows. It lives here so the search shards
+# (sharded_search.py) run exactly the same code on their slice of the catalog.
+
+EXACT_MATCH_BOOST = 10.0 # Whole query found in the product name
+KEYWORD_WEIGHT = 0.5     # Per unit of BM25 score (a distinctive word is ~3-4)
+
+def score_candidates(catalog, query, query_embedding, candidates, ann_index=None):
+    # -> (rows kept, their final scores, rows scanned, rows dropped by the threshold)
+
+    # --- KEYWORD SCORING (BM25) ---
+    # One sparse product over the whole catalog; only query terms are touched
+    lexical_scores = catalog.lexical.scores(query)
+
+    # Large catalogs: only score the rows of the closest IVF lists, plus every keyword hit
+    if ann_index is not None and len(catalog) >= ANN_MIN_ROWS:
+        probed = ann_index.probe_rows(query_embedding, ANN_NPROBE)
+        candidates = np.intersect1d(candidates, np.union1d(probed, np.flatnonzero(lexical_scores)), assume_unique=True)
+    scanned = len(candidates)
+
+    semantic_scores = catalog.approx_semantic_scores(query_embedding, candidates) # Exact unless quantized
+    lexical_scores = lexical_scores[candidates]
+
+    # Exact brand or name match boost (only rows with a keyword hit can match)
+    exact_match = np.zeros(len(candidates), dtype=bool)
+    hits = np.flatnonzero(lexical_scores)
+    exact_match[hits] = catalog.name_phrase_match(query, candidates[hits])
+
+    keyword_boost = np.where(exact_match, EXACT_MATCH_BOOST, 0.0) + KEYWORD_WEIGHT * lexical_scores
+
+    # Quantized catalog: approximate scores pick a shortlist, which is rescored at full precision
+    if catalog.quantized is not None:
+        approx_scores = (semantic_scores + keyword_boost) * (1 + (catalog.ratings[candidates] / 10))
+        approx_scores[(keyword_boost == 0) & (semantic_scores < 0.4 - QUANT_MARGIN)] = -np.inf
+        short = shortlist(approx_scores, QUANT_RESCORE)
+        candidates, keyword_boost = candidates[short], keyword_boost[short]
+        semantic_scores = catalog.semantic_scores(query_embedding, candidates)
+
+    # --- HYBRID SCORE ---
+    # Factor in semantic similarity + keyword boost
+    # We also add a threshold: if no keyword match AND similarity is low, we penalize
+    final_scores = (semantic_scores + keyword_boost) * (1 + (catalog.ratings[candidates] / 10))
+
+    # FILTERING: If the semantic score is too low AND there's no keyword boost,
+    # we don't want to show this garbage result as a "Best Match"
+    keep = ~((keyword_boost == 0) & (semantic_scores < 0.4)) # Skip unrelated items
+    return candidates[keep], final_scores[keep], scanned, len(keep) - int(keep.sum())
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+# --- BOUNDED INFERENCE EXECUTOR + LOAD SHEDDING ---
+# The API's async endpoints hand query encoding and scoring to this pool
+# instead of an unbounded thread pool. At most INFERENCE_WORKERS searches run
+# at once and at most INFERENCE_QUEUE_SIZE wait behind them; past that a
+# request is refused straight away, so a spike cannot pile up work until
+# every request is slow:
+#
+#   429  queue_full  INFERENCE_QUEUE_SIZE requests are already waiting
+#   503  deadline    the queue ahead would not clear within REQUEST_DEADLINE_MS
+#                    (estimated from the recent run time of a search)
+#   503  expired     the request waited longer than the deadline; it is
+#                    dropped without being run (its client has likely given up)
+#
+# REQUEST_DEADLINE_MS=0 turns the deadline checks off.
+
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 4))
+INFERENCE_QUEUE_SIZE = int(os.environ.get("INFERENCE_QUEUE_SIZE", 64))
+REQUEST_DEADLINE_MS = float(os.environ.get("REQUEST_DEADLINE_MS", 2000))
+RETRY_AFTER_SECONDS = 1
+
+class Overloaded(Exception):
+    def __init__(self, status_code, reason):
+        super().__init__(f"server overloaded ({reason})")
+        self.status_code = status_code
+        self.reason = reason
+
+class InferencePool:
+    def __init__(self, workers=INFERENCE_WORKERS, max_queue=INFERENCE_QUEUE_SIZE, deadline_ms=REQUEST_DEADLINE_MS):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.deadline = deadline_ms / 1000 if deadline_ms > 0 else None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self.queued = 0       # admitted, waiting for a worker
+        self.running = 0
+        self.completed = 0
+        self.rejected = {"queue_full": 0, "deadline": 0, "expired": 0}
+        self._service_seconds = 0.0 # Moving average of one job's run time
+
+    def _reject(self, status_code, reason):
+        # Called with the lock held
+        self.rejected[reason] += 1
+        metrics.requests_rejected.inc(reason=reason)
+        return Overloaded(status_code, reason)
+
+    def _admit(self):
+        with self._lock:
+            if self.queued >= self.max_queue:
+                raise self._reject(429, "queue_full")
+            # Jobs ahead run `workers` at a time: full rounds to wait + this job
+            rounds = (self.queued + self.running) // self.workers
+            if self.deadline and rounds and (rounds + 1) * self._service_seconds > self.deadline:
+                raise self._reject(503, "deadline")
+            self.queued += 1
+
+    async def run(self, fn, *args):
+        # fn(*args) on a worker thread; raises Overloaded instead when shedding load
+        self._admit()
+        future = self.executor.submit(self._call, time.monotonic(), fn, args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if future.cancel(): # Client went away before the job started
+                with self._lock:
+                    self.queued -= 1
+            raise
+
+    def _call(self, submitted, fn, args):
+        started = time.monotonic()
+        metrics.inference_queue_seconds.observe(started - submitted)
+        with self._lock:
+            self.queued -= 1
+            if self.deadline and started - submitted > self.deadline:
+                raise self._reject(503, "expired")
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self._service_seconds = elapsed if not self._service_seconds else 0.9 * self._service_seconds + 0.1 * elapsed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "deadline_ms": self.deadline * 1000 if self.deadline else 0,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected_queue_full": self.rejected["queue_full"],
+                "rejected_deadline": self.rejected["deadline"],
+                "rejected_expired": self.rejected["expired"],
+                "mean_service_ms": round(self._service_seconds * 1000, 3),
+            }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
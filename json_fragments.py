@@ -0,0 +1,47 @@
+import json
+import numpy as np
+from packed_rows import pack_bytes
+
+try:
+    import orjson # Optional: several times faster than json
+except ImportError:
+    orjson = None
+
+# --- PRE-SERIALIZED RESULT JSON ---
+# A search response is a list of product records plus a per-request score.
+# The static part of every record is serialized once, when the catalog is
+# built (and published with it, shared_index.py): UTF-8 JSON bytes without the
+# closing brace, e.g.  {"product_id":7,"product_name":"...","rating":4.5
+# A response body is then these fragments spliced with the scores:
+#   [<fragment>,"score":0.93},<fragment>,"score":0.91}]
+# with no per-request dict and no generic encoder pass over the records.
+# orjson is used when installed; json otherwise (same JSON, slower).
+
+def _default(value):
+    # numpy scalars as Python numbers; anything else as text (like default=str)
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+def dumps(obj):
+    # Compact UTF-8 JSON bytes
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def record_fragment(row):
+    return dumps(row)[:-1]
+
+def build_fragments(rows):
+    # (offsets, uint8 buffer) of every record's fragment, packed like a text column
+    return pack_bytes([record_fragment(r) for r in rows])
+
+def render_results(catalog, rows, scores, extras=None):
+    # JSON array of catalog.result(row, score) for every row, as bytes.
+    # extras[i] (optional) is appended to record i: pre-encoded ',"key":value' pairs.
+    parts = []
+    for i, (row, score) in enumerate(zip(rows, scores)):
+        extra = extras[i] if extras is not None else b""
+        parts.append(catalog.result_fragment(row) + b',"score":' + dumps(float(score)) + extra + b"}")
+    return b"[" + b",".join(parts) + b"]"
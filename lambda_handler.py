@@ -1,10 +1,19 @@
 import json
 import os
-import sqlite3
+from typing import NamedTuple
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from catalog import top_k, top_k_rows
+from ann_index import ANN_MIN_ROWS, ANN_NPROBE
+from shared_index import get_live_catalog, process_memory
+from query_cache import encode_queries, encode_query
+from startup import load_model, startup_report
+from quantization import QUANT_RESCORE, shortlist
+import metrics
+from metrics import log_event, stage
+from json_fragments import render_results
 
 MODEL_NAME = 'all-MiniLM-L6-v2'
+BATCH_QUERY_CHUNK = 64 # Queries scored per matrix product in batch searches (bounds memory)
 _model_cache = None
 
 def get_model():
@@ -12,7 +21,8 @@ def get_model():
     if _model_cache is None:
         print(f"Lazy Loading Model: {MODEL_NAME}...")
         try:
-            _model_cache = SentenceTransformer(MODEL_NAME)
+            # sentence_transformers (and torch) are only imported here, on first use
+            _model_cache = load_model(MODEL_NAME)
             print("Model loaded successfully.")
         except Exception as e:
             print(f"Error loading model: {e}")
@@ -23,85 +33,210 @@ def get_model():
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_FILE = os.path.join(BASE_DIR, 'product_search.db')
 
-def get_db_connection():
-    if not os.path.exists(DB_FILE):
-        print(f"CRITICAL ERROR: DB File not found at {DB_FILE}")
+# --- WARM CONTAINER STATE ---
+# The catalog (embedding matrix + metadata) and its ANN index survive across
+# warm invocations, like _model_cache. They come from the published index
+# (memory-mapped, shared with any other process on the host) and are swapped
+# when a new version is published; without one, the DB is scanned and
+# reloaded whenever the file's mtime or size changes (shared_index.LiveCatalog).
+
+def get_catalog():
+    return get_live_catalog(DB_FILE).get()
+
+def warmup():
+    # {"warmup": true}: preload model + catalog so the first real query is fast
+    model = get_model()
+    catalog, _ = get_catalog()
+    return {'statusCode': 200, 'body': json.dumps({
+        'warm': True,
+        'model_loaded': model is not None,
+        'products': len(catalog),
+        'startup_ms': startup_report.as_dict(),
+        'index': get_live_catalog(DB_FILE).stats(),
+        'memory': process_memory(),
+    })}
+
+EXACT_MATCH_JSON = b',"match_type":"Exact Match"'
+RECOMMENDATION_JSON = b',"match_type":"expert_recommendation"'
+
+def expert_results(catalog, rows, final_scores, sim_scores):
+    # JSON text of the result list for catalog `rows`, with scores aligned to
+    # them, spliced from the catalog's pre-serialized records (json_fragments.py)
+    match_types = [EXACT_MATCH_JSON if sim_score > 0.8 else RECOMMENDATION_JSON for sim_score in sim_scores]
+    return render_results(catalog, rows, final_scores, match_types).decode('utf-8')
+
+def batch_search(searches):
+    # {"queries": [{"query": ..., "min_price": ..., "max_price": ..., "category": ...}, ...]}
+    # One encode call for every query, then one (queries x products) matrix
+    # product per BATCH_QUERY_CHUNK queries, so the score matrices stay small
+    # whatever the batch size; the body is a list with one result list per query.
+    catalog, _ = get_catalog()
+    model = get_model()
+    queries = [s.get('query', '') for s in searches]
+    if model is None or not searches:
+        return {'statusCode': 200, 'body': json.dumps([[] for _ in searches])}
+
+    with stage("query_encode"):
+        query_vectors = encode_queries(model, queries, MODEL_NAME)
+    results = []
+    for start in range(0, len(searches), BATCH_QUERY_CHUNK):
+        end = start + BATCH_QUERY_CHUNK
+        results += batch_chunk(catalog, queries[start:end], query_vectors[start:end], searches[start:end])
+    log_event("search_batch", queries=len(searches))
+    return {'statusCode': 200, 'body': "[" + ",".join(results) + "]"}
+
+def batch_chunk(catalog, queries, query_vectors, searches):
+    # Result JSON texts of one chunk of a batch search
+    with stage("filter"):
+        masks = catalog.filter_masks([
+            (float(s.get('min_price', 0)), float(s.get('max_price', 1000000)), s.get('category', None))
+            for s in searches
+        ])
+    with stage("scoring"):
+        sim_scores = catalog.approx_semantic_scores_batch(query_vectors) # Exact unless quantized
+
+        # Same Expert Score as single searches: 70% Semantic Match + 30% Product Rating
+        final_scores = (sim_scores * 0.7) + ((catalog.ratings / 5.0) * 0.3)
+        final_scores = np.where(masks, final_scores, -np.inf)
+        metrics.candidates_scanned.inc(int(masks.sum()))
+
+        # Quantized catalog: rescore each query's shortlist at full precision
+        if catalog.quantized is not None:
+            for i, rows in enumerate(top_k_rows(final_scores, QUANT_RESCORE)):
+                rows = np.sort(rows)
+                sim_scores[i, rows] = catalog.semantic_scores(query_vectors[i], rows)
+                final_scores[i] = -np.inf
+                final_scores[i, rows] = (sim_scores[i, rows] * 0.7) + ((catalog.ratings[rows] / 5.0) * 0.3)
+
+    with stage("top_k"):
+        best_rows = top_k_rows(final_scores, 20)
+
+    with stage("serialize"):
+        return [
+            expert_results(catalog, rows, q_final[rows], q_sim[rows]) if query else "[]"
+            for query, rows, q_final, q_sim in zip(queries, best_rows, final_scores, sim_scores)
+        ]
+
+def expert_rows(query_text, min_price=0, max_price=1000000, category_filter=None, k=20):
+    # (catalog, rows, final_scores, sim_scores) of the top k by Expert Score,
+    # best first; None when there is nothing to search with (no query / model)
+    catalog, ann_index = get_catalog()
+
+    # Enhance Query with "Best" logic if user didn't specify
+    # (Implicitly looking for high quality)
+    search_query = query_text
+
+    # Encode
+    query_vector = None
+    model = get_model()
+    if search_query and model:
+        # Cached: repeat queries / filter-only changes skip inference
+        with stage("query_encode"):
+            query_vector = encode_query(model, search_query, MODEL_NAME)
+
+    # Vector Search
+    if query_vector is None:
         return None
-    return sqlite3.connect(DB_FILE)
 
-def cosine_similarity(v1, v2):
-    if np.linalg.norm(v1) == 0 or np.linalg.norm(v2) == 0: return 0
-    return np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
+    # Price/category filters come from the in-memory filter index
+    with stage("filter"):
+        candidates = np.flatnonzero(catalog.filter_mask(min_price, max_price, category_filter))
+
+    with stage("scoring"):
+        # Large catalogs: only score the rows of the closest IVF lists
+        if ann_index is not None and len(catalog) >= ANN_MIN_ROWS:
+            candidates = np.intersect1d(candidates, ann_index.probe_rows(query_vector, ANN_NPROBE), assume_unique=True)
+        metrics.candidates_scanned.inc(len(candidates))
+
+        # Similarity Score
+        sim_scores = catalog.approx_semantic_scores(query_vector, candidates) # Exact unless quantized
+
+        # Expert Score Logic:
+        # 70% Semantic Match + 30% Product Rating
+        # This ensures "Best" products float to top
+        rating_scores = catalog.ratings[candidates] / 5.0 # Normalize 0-1
+        final_scores = (sim_scores * 0.7) + (rating_scores * 0.3)
+
+        # Quantized catalog: rescore the best approximate matches at full precision
+        if catalog.quantized is not None:
+            short = shortlist(final_scores, QUANT_RESCORE)
+            candidates, rating_scores = candidates[short], rating_scores[short]
+            sim_scores = catalog.semantic_scores(query_vector, candidates)
+            final_scores = (sim_scores * 0.7) + (rating_scores * 0.3)
+
+    # Top k by Expert Score
+    with stage("top_k"):
+        best = top_k(final_scores, k)
+    return catalog, candidates[best], final_scores[best], sim_scores[best]
+
+# --- IN-PROCESS API ---
+# For callers in the same process (app.py): ranked result objects instead of
+# a JSON body that would be parsed straight back.
+class ExpertResult(NamedTuple):
+    product_id: int
+    score: float        # Expert Score
+    match_type: str     # 'Exact Match' or 'expert_recommendation'
+    rating: float
+    version: str        # catalog version the result comes from
+    row: int            # row in `catalog`
+    catalog: object
+
+    def record(self):
+        # The product dict of the lambda's JSON response
+        item = self.catalog.result(self.row, self.score)
+        item['match_type'] = self.match_type
+        return item
+
+def expert_search(query_text, min_price=0, max_price=1000000, category_filter=None, k=20):
+    # list of ExpertResult, best first ([] for an empty query)
+    if not os.path.exists(DB_FILE):
+        raise FileNotFoundError('Database not found. Run embed_products.py')
+    found = expert_rows(query_text, float(min_price), float(max_price), category_filter, k)
+    if found is None:
+        return []
+    catalog, rows, final_scores, sim_scores = found
+    product_ids = catalog.product_ids[rows].tolist()
+    ratings = catalog.ratings[rows].tolist()
+    results = [
+        ExpertResult(product_id, score, 'Exact Match' if sim_score > 0.8 else 'expert_recommendation',
+                     rating, catalog.version, row, catalog)
+        for product_id, score, sim_score, rating, row in zip(
+            product_ids, final_scores.tolist(), sim_scores.tolist(), ratings, rows.tolist())
+    ]
+    log_event("search", query=query_text, min_price=min_price, max_price=max_price,
+              category=category_filter, results=len(results), api="in_process")
+    return results
 
 def lambda_handler(event, context):
     try:
-        print(f"--- Expert Search: {event.get('query')} ---")
-        
+        if event.get('warmup'):
+            if not os.path.exists(DB_FILE):
+                return {'statusCode': 500, 'body': json.dumps({'error': 'Database not found. Run embed_products.py'})}
+            return warmup()
+
+        if 'queries' in event:
+            if not os.path.exists(DB_FILE):
+                return {'statusCode': 500, 'body': json.dumps({'error': 'Database not found. Run embed_products.py'})}
+            return batch_search(event['queries'])
+
         if not os.path.exists(DB_FILE):
-             print("DB Not Found")
+             log_event("search_error", always=True, error="DB Not Found")
              return {'statusCode': 500, 'body': json.dumps({'error': 'Database not found. Run embed_products.py'})}
 
-        conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         # Search Params
         query_text = event.get('query', '')
         min_price = float(event.get('min_price', 0))
         max_price = float(event.get('max_price', 1000000)) 
         category_filter = event.get('category', None)
-        
-        # Enhance Query with "Best" logic if user didn't specify
-        # (Implicitly looking for high quality)
-        search_query = query_text
-        
-        # Encode
-        query_vector = None
-        model = get_model()
-        if search_query and model:
-            query_vector = model.encode(search_query)
-
-        # Vector Search
-        candidates = []
-        if query_vector is not None:
-            sql = "SELECT * FROM products_vectors"
-            params = []
-            if category_filter and category_filter != "All":
-                sql += " WHERE category = ?"
-                params.append(category_filter)
-            cursor.execute(sql, params)
-            all_rows = cursor.fetchall()
-            
-            for row in all_rows:
-                # Price Filter
-                if not (min_price <= row['price'] <= max_price): continue
-                
-                p_vec = np.array(json.loads(row['vector']))
-                
-                # Similarity Score
-                sim_score = cosine_similarity(query_vector, p_vec)
-                
-                # Expert Score Logic:
-                # 70% Semantic Match + 30% Product Rating
-                # This ensures "Best" products float to top
-                rating_score = row['rating'] / 5.0 # Normalize 0-1
-                final_score = (sim_score * 0.7) + (rating_score * 0.3)
-                
-                item = dict(row)
-                item['score'] = float(final_score)
-                item['match_type'] = 'Exact Match' if sim_score > 0.8 else 'expert_recommendation'
-                candidates.append(item)
-                
-            # Sort by Expert Score
-            candidates.sort(key=lambda x: x['score'], reverse=True)
-            top_results = candidates[:20]
-
-            # Clean response (remove vector)
-            for item in top_results: 
-                if 'vector' in item: del item['vector']
-            
-            print(f"Returning {len(top_results)} expert results.")
-            return {'statusCode': 200, 'body': json.dumps(top_results, default=str)}
+
+        found = expert_rows(query_text, min_price, max_price, category_filter)
+        if found is not None:
+            catalog, rows, final_scores, sim_scores = found
+            with stage("serialize"):
+                body = expert_results(catalog, rows, final_scores, sim_scores)
+            log_event("search", query=query_text, min_price=min_price, max_price=max_price,
+                      category=category_filter, results=len(rows))
+            return {'statusCode': 200, 'body': body}
         
         return {'statusCode': 200, 'body': json.dumps([])}
 
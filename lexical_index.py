@@ -0,0 +1,78 @@
+import re
+import numpy as np
+from scipy import sparse
+
+# --- BM25 LEXICAL INDEX ---
+# Term-document matrix over product_name + specifications, built once when
+# the catalog loads, with the BM25 weight of every (term, product) pair
+# precomputed. Keyword scores for the whole catalog then come from one sparse
+# vector x matrix product that only touches the query's terms, instead of a
+# substring test per row and per query word. Tokens are whole words, so "pro"
+# no longer matches inside "product".
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+class BM25Index:
+    def __init__(self, texts, k1=BM25_K1, b=BM25_B):
+        self.vocab = {}
+        doc_ids, term_ids, doc_lengths = [], [], []
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for token in tokens:
+                doc_ids.append(doc_id)
+                term_ids.append(self.vocab.setdefault(token, len(self.vocab)))
+
+        n_docs, n_terms = len(doc_lengths), len(self.vocab)
+        # Duplicate (doc, term) entries are summed into term frequencies
+        tf = sparse.csr_matrix(
+            (np.ones(len(doc_ids), dtype=np.float32), (doc_ids, term_ids)), shape=(n_docs, n_terms)
+        )
+        tf.sum_duplicates()
+
+        doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        avg_length = doc_lengths.mean() if n_docs else 1.0
+        df = np.bincount(tf.indices, minlength=n_terms)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        # BM25 term weight: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len))
+        row_lengths = np.repeat(doc_lengths, np.diff(tf.indptr))
+        tf.data = idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + k1 * (1 - b + b * row_lengths / max(avg_length, 1e-9)))
+
+        self.num_docs = n_docs
+        self.term_docs = tf.T.tocsr() # (n_terms, n_docs): a query only reads its own rows
+
+    @classmethod
+    def from_arrays(cls, terms, data, indices, indptr, num_docs):
+        # Prebuilt term_docs matrix, e.g. memory-mapped from a published index (shared_index.py)
+        index = cls.__new__(cls)
+        index.vocab = {term: n for n, term in enumerate(terms)}
+        index.num_docs = num_docs
+        index.term_docs = sparse.csr_matrix((data, indices, indptr), shape=(len(terms), num_docs))
+        return index
+
+    def query_vector(self, query):
+        term_ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        return sparse.csr_matrix(
+            (np.ones(len(term_ids), dtype=np.float32), term_ids, [0, len(term_ids)]),
+            shape=(1, len(self.vocab)),
+        )
+
+    def scores(self, query):
+        # Dense BM25 score for every document (0.0 where no query term matches)
+        hits = self.query_vector(query) @ self.term_docs
+        result = np.zeros(self.num_docs, dtype=np.float32)
+        result[hits.indices] = hits.data
+        return result
+
+    def scores_batch(self, queries):
+        # (len(queries), num_docs) dense BM25 scores from one sparse matrix product
+        if not queries:
+            return np.zeros((0, self.num_docs), dtype=np.float32)
+        return (sparse.vstack([self.query_vector(q) for q in queries]) @ self.term_docs).toarray()
@@ -0,0 +1,120 @@
+import bisect
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# --- HOT-PATH METRICS ---
+# Latency histograms per search stage plus a few counters, kept in process and
+# rendered in the Prometheus text format (backend GET /metrics). Recording one
+# observation costs a bisect and a lock, so it stays on for every request.
+#
+# Stages: db_fetch, vector_decode (catalog load), filter, query_encode, scoring,
+# top_k, serialize, http_encode (compression / ETag).
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Fraction of requests that get a structured log line (errors are always logged)
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 0.01))
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {} # sorted label tuple -> count
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {} # sorted label tuple -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        # First bucket whose upper bound holds the value (len(buckets) = +Inf)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_label_text(key + (('le', bound),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_label_text(key)} {series[-1]}")
+                lines.append(f"{self.name}_count{_label_text(key)} {cumulative}")
+        return lines
+
+stage_seconds = Histogram("search_stage_seconds", "Latency of each search stage in seconds")
+candidates_scanned = Counter("search_candidates_scanned_total", "Catalog rows scored against a query")
+results_below_threshold = Counter("search_results_below_threshold_total",
+                                  "Scored rows dropped by the 0.4 semantic threshold (no keyword match)")
+shard_seconds = Histogram("search_shard_seconds", "Time a search shard spent scoring its slice (sharded_search.py)")
+requests_rejected = Counter("inference_rejected_total", "Requests shed by the inference pool, by reason (inference_pool.py)")
+inference_queue_seconds = Histogram("inference_queue_seconds", "Time a request waited for an inference worker")
+chat_turns = Counter("chat_turns_total", "Session /chat turns: search, refined (answered from the session's candidates), "
+                     "intent_change or exhausted (chat_sessions.py)")
+http_responses = Counter("http_json_responses_total", "API JSON responses by Content-Encoding (not_modified = 304)")
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=name)
+
+def stats_lines(prefix, stats):
+    # Existing .stats() dicts as gauges: every numeric top-level value
+    lines = []
+    for key, value in (stats or {}).items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+    return lines
+
+def render(extra_stats=None):
+    # Prometheus text exposition of the metrics above plus {prefix: stats dict}
+    lines = stage_seconds.render() + candidates_scanned.render() + results_below_threshold.render() + shard_seconds.render()
+    lines += http_responses.render() + requests_rejected.render() + inference_queue_seconds.render() + chat_turns.render()
+    for prefix, stats in (extra_stats or {}).items():
+        lines += stats_lines(prefix, stats)
+    return "\n".join(lines) + "\n"
+
+# --- STRUCTURED LOGS ---
+def log_event(event, always=False, **fields):
+    # One JSON line per event, for LOG_SAMPLE_RATE of the calls (or always)
+    if always or random.random() < LOG_SAMPLE_RATE:
+        print(json.dumps({"event": event, "ts": round(time.time(), 3), **fields}, default=str))
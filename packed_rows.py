@@ -0,0 +1,86 @@
+import json
+import numpy as np
+
+# --- PACKED PRODUCT METADATA ---
+# Search only reads the vectors and the numeric columns (price, rating);
+# product records are only needed for the top-k that is returned. Instead of
+# one dict per product (~1 KB of Python objects each), the metadata is kept
+# column by column: numbers in numpy arrays, text as one UTF-8 buffer plus an
+# offsets array. A record dict is built only when a row is read, i.e. for the
+# results. The same columns are what shared_index.py writes to disk and
+# memory-maps.
+
+def column_kind(values):
+    if all(type(v) is int for v in values) and all(-2**63 <= v < 2**63 for v in values):
+        return "int"
+    if all(type(v) is float for v in values):
+        return "float"
+    if all(type(v) is str for v in values):
+        return "str"
+    return "json" # Mixed types / NULLs: kept exactly as json text
+
+def pack_strings(values):
+    return pack_bytes([v.encode('utf-8') for v in values])
+
+def pack_bytes(values):
+    # (offsets, uint8 buffer): value i is buffer[offsets[i]:offsets[i + 1]]
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in values])
+    return offsets, np.frombuffer(b"".join(values), dtype=np.uint8)
+
+def pack_rows(rows):
+    # PackedRows holding the same records as a list of dicts (all with the same keys)
+    columns = {}
+    for name in (list(rows[0]) if rows else []):
+        values = [r[name] for r in rows]
+        kind = column_kind(values)
+        if kind in ("int", "float"):
+            columns[name] = (kind, np.array(values, dtype=np.int64 if kind == "int" else np.float64))
+        else:
+            offsets, blob = pack_strings(values if kind == "str" else [json.dumps(v) for v in values])
+            columns[name] = (kind, (offsets, memoryview(blob)))
+    return PackedRows(columns, len(rows))
+
+class PackedRows:
+    # Read-only list of row dicts over packed columns; a dict is only built
+    # for the rows that are actually read (results)
+    def __init__(self, columns, size):
+        self.columns = columns # name -> (kind, array) or (kind, (offsets, memoryview of utf-8 bytes))
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def _value(self, kind, data, i):
+        if kind == "int":
+            return int(data[i])
+        if kind == "float":
+            return float(data[i])
+        offsets, blob = data
+        text = str(blob[offsets[i]:offsets[i + 1]], 'utf-8')
+        return text if kind == "str" else json.loads(text)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice): # Contiguous rows, still over the same columns
+            start, stop, step = i.indices(self.size)
+            if step != 1:
+                raise ValueError("PackedRows only supports contiguous slices")
+            stop = max(start, stop)
+            return PackedRows({
+                name: (kind, data[start:stop] if kind in ("int", "float") else (data[0][start:stop + 1], data[1]))
+                for name, (kind, data) in self.columns.items()
+            }, stop - start)
+        if not -self.size <= i < self.size:
+            raise IndexError(i)
+        i %= self.size
+        return {name: self._value(kind, data, i) for name, (kind, data) in self.columns.items()}
+
+    def __iter__(self):
+        return (self[i] for i in range(self.size))
+
+    @property
+    def nbytes(self):
+        total = 0
+        for kind, data in self.columns.values():
+            total += data.nbytes if kind in ("int", "float") else data[0].nbytes + data[1].nbytes
+        return total
@@ -0,0 +1,139 @@
+import argparse
+import mmap
+import os
+import numpy as np
+
+# --- QUANTIZED EMBEDDINGS ---
+# VECTOR_QUANTIZATION=int8 | float16 keeps a compact copy of the embedding
+# matrix and scores every candidate against that copy:
+#   int8     1 byte per dim + one float32 scale per row (~4x smaller than float32)
+#   float16  2 bytes per dim (2x smaller)
+# Quantized scores only choose a shortlist (the QUANT_RESCORE best rows), which
+# is then rescored against the float32 vectors. When the catalog is served from
+# the published index (shared_index.py), both copies are read-only memory maps
+# shared by all workers and rescoring only reads the shortlisted float32 rows.
+# A catalog loaded from SQLite holds its float32 matrix in RAM, so it is not
+# quantized (a warning says so). With the default (none), everything is exact
+# float32 as before.
+#
+#   python quantization.py report [product_search.db]   memory saved + ranking drift
+
+VECTOR_QUANTIZATION = os.environ.get("VECTOR_QUANTIZATION", "none").lower()
+QUANT_RESCORE = int(os.environ.get("QUANT_RESCORE", 256))
+QUANT_KINDS = ("int8", "float16")
+QUANT_MARGIN = 0.02 # slack on the 0.4 semantic threshold while shortlisting (int8 error is a few 1e-3)
+
+SCORE_CHUNK = 32768 # rows dequantized at a time, bounds the float32 scratch space
+
+class QuantizedMatrix:
+    def __init__(self, kind, data, scales=None):
+        self.kind = kind
+        self.data = data        # (n, dim) int8 or float16
+        self.scales = scales    # (n,) float32 per-row scale (int8 only)
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    @classmethod
+    def quantize(cls, matrix, kind):
+        if kind not in QUANT_KINDS:
+            raise ValueError(f"Unknown quantization {kind!r} (expected one of {QUANT_KINDS})")
+        n, dim = matrix.shape
+        data = np.empty((n, dim), dtype=np.int8 if kind == "int8" else np.float16)
+        scales = np.empty(n, dtype=np.float32) if kind == "int8" else None
+        for start in range(0, n, SCORE_CHUNK):
+            chunk = np.asarray(matrix[start:start + SCORE_CHUNK], dtype=np.float32)
+            if kind == "int8":
+                # Symmetric per-row scale: the largest |value| of the row maps to 127
+                chunk_scales = np.abs(chunk).max(axis=1) / 127.0
+                chunk_scales[chunk_scales == 0] = 1.0
+                data[start:start + len(chunk)] = np.rint(chunk / chunk_scales[:, None])
+                scales[start:start + len(chunk)] = chunk_scales
+            else:
+                data[start:start + len(chunk)] = chunk
+        return cls(kind, data, scales)
+
+    def _dequantize(self, rows):
+        chunk = self.data[rows].astype(np.float32)
+        if self.scales is not None:
+            chunk *= self.scales[rows][:, None]
+        return chunk
+
+    def scores(self, q, rows=None):
+        # Approximate q . row for every row (or just `rows`); q is unit-norm float32
+        n = len(self.data) if rows is None else len(rows)
+        out = np.empty(n, dtype=np.float32)
+        for start in range(0, n, SCORE_CHUNK):
+            chunk_rows = slice(start, start + SCORE_CHUNK) if rows is None else rows[start:start + SCORE_CHUNK]
+            out[start:start + SCORE_CHUNK] = self._dequantize(chunk_rows) @ q
+        return out
+
+    def scores_batch(self, queries):
+        # (n_queries, n_rows) approximate scores for unit-norm queries
+        out = np.empty((len(queries), len(self.data)), dtype=np.float32)
+        for start in range(0, len(self.data), SCORE_CHUNK):
+            out[:, start:start + SCORE_CHUNK] = queries @ self._dequantize(slice(start, start + SCORE_CHUNK)).T
+        return out
+
+def release_pages(matrix):
+    # Drop the resident pages of a memory-mapped matrix (they are re-read on demand)
+    mapping = getattr(matrix, '_mmap', None)
+    if isinstance(matrix, np.memmap) and mapping is not None and hasattr(mapping, 'madvise'):
+        mapping.madvise(mmap.MADV_DONTNEED)
+
+def shortlist(approx_scores, size=QUANT_RESCORE):
+    # Positions of the `size` best approximate scores, in their original order
+    # (so the exact rescoring keeps the usual tie-break by catalog order)
+    if len(approx_scores) <= size:
+        return np.arange(len(approx_scores))
+    return np.sort(np.argpartition(-approx_scores, size - 1)[:size])
+
+# --- MEMORY / DRIFT REPORT ---
+def drift_report(db_path, num_queries=200, k=10, noise=0.5, seed=0):
+    # Queries are perturbed product vectors (no model download), as in ann_index.recall_report.
+    # Drift is measured on pure semantic top-k, with and without rescoring.
+    from catalog import load_catalog, normalize_rows, top_k
+
+    catalog = load_catalog(db_path)
+    matrix = np.asarray(catalog.matrix, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(matrix), min(num_queries, len(matrix)), replace=False)
+    queries = normalize_rows(matrix[picks] + noise * rng.standard_normal((len(picks), matrix.shape[1]), dtype=np.float32) / np.sqrt(matrix.shape[1]))
+
+    exact = [matrix @ q for q in queries]
+    exact_top = [top_k(s, k) for s in exact]
+    print(f"Catalog: {len(catalog)} products, {len(matrix)} distinct vectors x {matrix.shape[1]} dims, "
+          f"{len(queries)} queries, top-{k}, rescore {QUANT_RESCORE}")
+    print(f"{'format':>8} {'MB':>8} {'saved':>7} {'max err':>9} {'overlap':>8} {'same order':>11} {'overlap+rescore':>16} {'same order+rescore':>19}")
+    print(f"{'float32':>8} {matrix.nbytes / 1e6:>8.1f} {0:>6.0f}% {0:>9.5f} {1:>8.3f} {1:>11.3f} {1:>16.3f} {1:>19.3f}")
+
+    for kind in QUANT_KINDS:
+        quantized = QuantizedMatrix.quantize(matrix, kind)
+        max_err, overlap, same, overlap_r, same_r = 0.0, 0, 0, 0, 0
+        for q, scores, top in zip(queries, exact, exact_top):
+            approx = quantized.scores(q)
+            max_err = max(max_err, float(np.abs(approx - scores).max()))
+            # Tie-aware: a returned row counts if it scores >= the exact k-th best
+            kth = scores[top[-1]]
+            raw = top_k(approx, k)
+            overlap += int(np.sum(scores[raw] >= kth - 1e-6))
+            same += int(np.array_equal(raw, top))
+            rows = shortlist(approx)
+            rescored = rows[top_k(scores[rows], k)]
+            overlap_r += int(np.sum(scores[rescored] >= kth - 1e-6))
+            same_r += int(np.array_equal(rescored, top))
+        n = len(queries)
+        print(f"{kind:>8} {quantized.nbytes / 1e6:>8.1f} {100 * (1 - quantized.nbytes / matrix.nbytes):>6.0f}% {max_err:>9.5f} "
+              f"{overlap / (k * n):>8.3f} {same / n:>11.3f} {overlap_r / (k * n):>16.3f} {same_r / n:>19.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory / ranking drift of quantized embeddings")
+    parser.add_argument('command', choices=['report'])
+    parser.add_argument('db_path', nargs='?', default='product_search.db')
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    drift_report(args.db_path, num_queries=args.queries)
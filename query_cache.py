@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# --- QUERY EMBEDDING CACHE ---
+# model.encode() costs 10-30 ms per query on CPU, while users often resend the
+# same text (e.g. the Gradio app when only the price sliders move). Embeddings
+# are cached in a bounded LRU keyed by (model name, normalised query), with an
+# optional TTL. One process-wide cache is shared by lambda_handler, the FastAPI
+# backend and the Gradio app (which calls lambda_handler in-process).
+
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", 1024))
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", 0)) # seconds, 0 = never expire
+
+# Thread-safe LRU with optional TTL and hit/miss counters (also used by response_cache.py)
+class LRUCache:
+    def __init__(self, maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl or None
+        self._entries = OrderedDict() # key -> (vector, stored_at)
+        self._lock = threading.Lock() # FastAPI runs sync handlers in a thread pool
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, vector):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+query_cache = LRUCache()
+
+def normalize_query(text):
+    # all-MiniLM-L6-v2 uses an uncased tokenizer, so case and extra whitespace
+    # never change the embedding.
+    return " ".join(text.lower().split())
+
+def encode_query(model, query, model_name, cache=None):
+    cache = query_cache if cache is None else cache
+    key = (model_name, normalize_query(query))
+    vector = cache.get(key)
+    if vector is None:
+        vector = model.encode(query)
+        vector.setflags(write=False) # Shared between requests: never mutate in place
+        cache.put(key, vector)
+    return vector
+
+def encode_queries(model, queries, model_name, cache=None):
+    # Batch version of encode_query: cache hits are reused and every miss is
+    # encoded together in a single model.encode() call. Returns (n, dim).
+    cache = query_cache if cache is None else cache
+    keys = [(model_name, normalize_query(q)) for q in queries]
+    vectors = [cache.get(key) for key in keys]
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        encoded = model.encode([queries[i] for i in missing])
+        for i, vector in zip(missing, encoded):
+            vector.setflags(write=False)
+            cache.put(keys[i], vector)
+            vectors[i] = vector
+    return np.array(vectors, dtype=np.float32).reshape(len(queries), -1)
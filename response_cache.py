@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from query_cache import LRUCache, normalize_query
+
+# --- FULL RESPONSE CACHE ---
+# Popular searches and frontend retries repeat the same (query, min_price,
+# max_price, category) tuples, so whole /search and /chat responses are cached.
+# Every key includes the version of the catalog that produced the response.
+# embed_products.py writes a new version whenever it rewrites the DB, so
+# entries from an older catalog can never be served.
+#
+# Backends:
+#   in-process LRU (default)
+#   local socket (RESPONSE_CACHE_SOCKET=/path) shared by several workers, served by
+#       python response_cache.py serve /path
+# The socket backend fails open: if the server is unreachable, lookups count as misses.
+
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 2048))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 0)) # seconds, 0 = never expire
+RESPONSE_CACHE_SOCKET = os.environ.get("RESPONSE_CACHE_SOCKET", "")
+SOCKET_TIMEOUT = 0.05 # A slow cache must never be slower than recomputing
+
+def response_key(endpoint, catalog_version, query, *filters):
+    raw = json.dumps([endpoint, catalog_version, normalize_query(query), *filters], separators=(",", ":"))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class SocketBackend:
+    # Client side of the shared cache: one persistent connection per thread,
+    # newline-delimited JSON requests and replies.
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.errors = 0
+
+    def _call(self, request):
+        for attempt in range(2): # Reconnect once if the server restarted
+            conn = getattr(self._local, 'conn', None)
+            try:
+                if conn is None:
+                    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    sock.settimeout(SOCKET_TIMEOUT)
+                    sock.connect(self.path)
+                    conn = self._local.conn = sock.makefile('rwb')
+                conn.write(json.dumps(request).encode('utf-8') + b"\n")
+                conn.flush()
+                return json.loads(conn.readline())
+            except (OSError, ValueError):
+                self._local.conn = None
+        self.errors += 1
+        return {}
+
+    def get(self, key):
+        return self._call({"op": "get", "key": key}).get("value")
+
+    def put(self, key, value):
+        self._call({"op": "put", "key": key, "value": value})
+
+class ResponseCache:
+    def __init__(self, socket_path=RESPONSE_CACHE_SOCKET, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.backend = SocketBackend(socket_path) if socket_path else LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.backend.put(key, value)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": "socket" if isinstance(self.backend, SocketBackend) else "lru",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+        if isinstance(self.backend, SocketBackend):
+            stats["socket_errors"] = self.backend.errors
+        else:
+            stats["size"] = len(self.backend)
+        return stats
+
+response_cache = ResponseCache()
+
+# --- SHARED CACHE SERVER ---
+class _CacheRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            request = json.loads(line)
+            if request.get("op") == "put":
+                self.server.cache.put(request["key"], request["value"])
+                reply = {}
+            else:
+                reply = {"value": self.server.cache.get(request["key"])}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b"\n")
+
+def serve(path, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+    if os.path.exists(path):
+        os.remove(path)
+    server = socketserver.ThreadingUnixStreamServer(path, _CacheRequestHandler)
+    server.daemon_threads = True
+    server.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+    print(f"Response cache listening on {path} (maxsize={maxsize})")
+    try:
+        server.serve_forever()
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "serve":
+        print("Usage: python response_cache.py serve /path/to/cache.sock")
+        sys.exit(1)
+    serve(sys.argv[2])
@@ -0,0 +1,28 @@
+-- products_vectors: one row per product, written by embed_products.py
+CREATE TABLE IF NOT EXISTS products_vectors (
+    product_id INTEGER PRIMARY KEY,
+    product_name TEXT NOT NULL,
+    category TEXT,
+    price INTEGER,
+    rating REAL,
+    specifications TEXT,
+    vector BLOB,        -- only in DBs built before the embeddings table (float32 BLOB or JSON text)
+    content_hash TEXT,  -- sha256(model name + embedded text), for --incremental
+    embedding_id INTEGER REFERENCES embeddings (embedding_id)
+);
+
+-- embeddings: one row per distinct embedded text, shared by every product that embeds it
+CREATE TABLE IF NOT EXISTS embeddings (
+    embedding_id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    vector BLOB NOT NULL  -- float32 BLOB (vector_store.py), or JSON text with --vector-format json
+);
+
+-- Category + price range filters use this instead of a full table scan
+CREATE INDEX IF NOT EXISTS idx_products_category_price ON products_vectors (category, price);
+
+-- catalog_meta: 'version' changes every time embed_products.py rewrites the catalog
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
@@ -0,0 +1,225 @@
+import argparse
+import heapq
+import multiprocessing
+import os
+import threading
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from catalog import Catalog, normalize_rows, top_k
+from filter_index import FilterIndex
+from hybrid_scoring import score_candidates
+from lexical_index import BM25Index
+from quantization import QuantizedMatrix
+from metrics import log_event, shard_seconds
+
+# --- SHARDED SCATTER-GATHER SEARCH ---
+# One search_products call scores the whole catalog on one core, so at a
+# million products it is bound by a single core's memory bandwidth.
+# SEARCH_SHARDS=N splits the catalog into N contiguous slices, each held by its
+# own worker process with its own slice of the vectors, filter and BM25
+# indexes. The coordinator (the API process, which owns the model) broadcasts
+# the encoded query and filters; every shard filters and scores its slice with
+# hybrid_scoring.score_candidates and returns its local top-k; the lists are
+# merged with a heap. Results are identical to an in-process exact scan:
+# BM25 keeps the global idf and ties still go to the lower catalog row.
+#
+# Shards always scan their slice exactly (no ANN), and only single searches
+# are sharded; /search/batch already spreads its work over a matrix product.
+# With a published index (shared_index.py) each shard maps the same files, so
+# the slices cost no extra copies of the metadata.
+#
+#   python sharded_search.py bench [product_search.db] --shards 4   timing + per-shard balance
+
+SEARCH_SHARDS = int(os.environ.get("SEARCH_SHARDS", 0))          # < 2 = off
+SHARD_MIN_ROWS = int(os.environ.get("SHARD_MIN_ROWS", 100000))   # smaller catalogs stay in-process
+
+def shard_bounds(n, shards):
+    # Contiguous [start, end) row ranges of (almost) equal size
+    edges = np.linspace(0, n, shards + 1).astype(int)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+def shard_catalog(catalog, start, end):
+    # Catalog holding only rows [start, end): local row i is global row start + i
+    vector_rows = np.asarray(catalog.vector_rows[start:end])
+    used = np.unique(vector_rows)
+    if len(used) and used[-1] - used[0] + 1 == len(used):
+        matrix = catalog.matrix[used[0]:used[-1] + 1] # Contiguous: a view, nothing copied
+        vector_rows = vector_rows - used[0]
+        used = slice(used[0], used[-1] + 1)
+    else:
+        matrix = np.asarray(catalog.matrix[used]) # Only the distinct vectors this shard uses
+        vector_rows = np.searchsorted(used, vector_rows)
+
+    prices = catalog.prices[start:end]
+    price_order = np.argsort(prices, kind='stable')
+    filters = catalog.filters
+    lexical = catalog.lexical
+    term_docs = lexical.term_docs[:, start:end].tocsr() # Same idf as the whole catalog
+    indexes = {
+        'product_ids': catalog.product_ids[start:end],
+        'prices': prices,
+        'ratings': catalog.ratings[start:end],
+        'filters': FilterIndex.from_arrays(
+            prices, price_order, prices[price_order], filters.row_category_codes[start:end],
+            sorted(filters.category_codes, key=filters.category_codes.get),
+        ),
+        'lexical': BM25Index.from_arrays(
+            sorted(lexical.vocab, key=lexical.vocab.get), term_docs.data, term_docs.indices, term_docs.indptr, end - start,
+        ),
+        'name_phrases': catalog.name_phrases[start:end],
+    }
+    if catalog.fragments is not None:
+        offsets, blob = catalog.fragments
+        indexes['fragments'] = (offsets[start:end + 1], blob)
+    if catalog.quantized is not None:
+        q = catalog.quantized
+        indexes['quantized'] = QuantizedMatrix(q.kind, q.data[used], q.scales[used] if q.scales is not None else None)
+    return Catalog(catalog.rows[start:end], matrix, catalog.version, vector_rows, indexes)
+
+# --- SHARD PROCESS ---
+_shard = None # (start, Catalog of the slice) in a shard process
+
+def _init_shard(db_path, published, start, end):
+    global _shard
+    from shared_index import attach_published
+    catalog = attach_published(db_path, published) if published else Catalog.from_db(db_path)
+    _shard = (start, shard_catalog(catalog, start, end))
+
+def _shard_info():
+    start, catalog = _shard
+    return catalog.version, start, len(catalog)
+
+def _search_shard(query, query_embedding, min_price, max_price, category, k):
+    # Local top-k of this slice, as global rows
+    t0 = time.perf_counter()
+    start, catalog = _shard
+    candidates = np.flatnonzero(catalog.filter_mask(min_price, max_price, category))
+    if len(candidates) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0), 0, 0, time.perf_counter() - t0
+    rows, scores, scanned, dropped = score_candidates(catalog, query, query_embedding, candidates)
+    best = top_k(scores, k)
+    return rows[best] + start, scores[best], scanned, dropped, time.perf_counter() - t0
+
+# --- COORDINATOR ---
+class ShardedSearch:
+    def __init__(self, db_path, catalog, shards, published=None):
+        self.bounds = shard_bounds(len(catalog), shards)
+        self.version = catalog.version
+        self.broken = False
+        context = multiprocessing.get_context("spawn") # The API process has threads (and maybe torch): no fork
+        self.executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_shard,
+                                initargs=(db_path, published, start, end))
+            for start, end in self.bounds
+        ]
+        # Wait for every shard, and make sure they all loaded the coordinator's version
+        for (start, _), info in zip(self.bounds, [e.submit(_shard_info) for e in self.executors]):
+            version, shard_start, _ = info.result()
+            if version != self.version or shard_start != start:
+                self.close()
+                raise RuntimeError(f"shard at row {start} loaded catalog {version}, expected {self.version}")
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._shard_ms = [0.0] * shards   # scoring time inside each shard
+        self._max_ms = [0.0] * shards
+        self._round_trip_ms = 0.0          # submit -> all shards answered, as seen here
+
+    def search(self, query, query_embedding, min_price, max_price, category, k=10):
+        # -> (global rows, scores, scanned, dropped) of the best k, or None if a shard failed
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        start = time.perf_counter()
+        futures = [e.submit(_search_shard, query, query_embedding, min_price, max_price, category, k) for e in self.executors]
+        try:
+            results = [f.result() for f in futures]
+        except Exception as e:
+            self.broken = True
+            log_event("shard_error", always=True, error=str(e))
+            return None
+        round_trip = time.perf_counter() - start
+
+        with self._lock:
+            self._requests += 1
+            for i, (_, _, _, _, seconds) in enumerate(results):
+                shard_seconds.observe(seconds, shard=str(i))
+                self._shard_ms[i] += seconds * 1000
+                self._max_ms[i] = max(self._max_ms[i], seconds * 1000)
+            self._round_trip_ms += round_trip * 1000
+
+        # Every shard list is sorted by (score desc, row asc): merge, keep the first k
+        merged = heapq.merge(*[zip((-s for s in scores.tolist()), rows.tolist()) for rows, scores, _, _, _ in results])
+        best = [next(merged) for _ in range(min(k, sum(len(r[0]) for r in results)))]
+        rows = np.array([row for _, row in best], dtype=np.intp)
+        scores = np.array([-score for score, _ in best])
+        return rows, scores, sum(r[2] for r in results), sum(r[3] for r in results)
+
+    def stats(self):
+        with self._lock:
+            n = max(self._requests, 1)
+            shards = [{
+                "rows": end - start,
+                "mean_ms": round(self._shard_ms[i] / n, 3),
+                "max_ms": round(self._max_ms[i], 3),
+            } for i, (start, end) in enumerate(self.bounds)]
+            means = [s["mean_ms"] for s in shards]
+            return {
+                "shards": len(self.bounds),
+                "requests": self._requests,
+                "mean_round_trip_ms": round(self._round_trip_ms / n, 3),
+                # Slowest / fastest shard: ~1.0 when the load is balanced
+                "imbalance": round(max(means) / min(means), 2) if self._requests and min(means) > 0 else None,
+                "per_shard": shards,
+            }
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# --- BENCHMARK ---
+def bench(db_path, shards, num_queries=200, noise=0.5, seed=0):
+    # Queries are perturbed product vectors + their product names (no model download)
+    from shared_index import get_live_catalog
+    live = get_live_catalog(db_path)
+    catalog, _ = live.get()
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(catalog), min(num_queries, len(catalog)), replace=False)
+    vectors = np.asarray(catalog.matrix[catalog.vector_rows[picks]], dtype=np.float32)
+    vectors = normalize_rows(vectors + noise * rng.standard_normal(vectors.shape, dtype=np.float32) / np.sqrt(vectors.shape[1]))
+    queries = [catalog.rows[int(i)]['product_name'] for i in picks]
+
+    def local(query, vector):
+        candidates = np.flatnonzero(catalog.filter_mask(0, 10**9, "All"))
+        rows, scores, _, _ = score_candidates(catalog, query, vector, candidates)
+        best = top_k(scores, 10)
+        return rows[best], scores[best]
+
+    start = time.perf_counter()
+    expected = [local(q, v) for q, v in zip(queries, vectors)]
+    local_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    sharded = ShardedSearch(db_path, catalog, shards, live.published)
+    try:
+        sharded.search(queries[0], vectors[0], 0, 10**9, "All") # Warm up
+        start = time.perf_counter()
+        found = [sharded.search(q, v, 0, 10**9, "All") for q, v in zip(queries, vectors)]
+        sharded_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        same = sum(np.array_equal(f[0], e[0]) and np.allclose(f[1], e[1]) for f, e in zip(found, expected))
+        print(f"Catalog: {len(catalog)} products, {len(queries)} queries, {shards} shards")
+        print(f"  in-process: {local_ms:8.2f} ms/query")
+        print(f"  sharded:    {sharded_ms:8.2f} ms/query  (same top-10: {same}/{len(queries)})")
+        stats = sharded.stats()
+        print(f"  round trip {stats['mean_round_trip_ms']:.2f} ms, imbalance {stats['imbalance']}")
+        for i, shard in enumerate(stats['per_shard']):
+            print(f"    shard {i}: {shard['rows']:>9} rows  mean {shard['mean_ms']:7.2f} ms  max {shard['max_ms']:7.2f} ms")
+    finally:
+        sharded.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded scatter-gather search")
+    parser.add_argument('command', choices=['bench'])
+    parser.add_argument('db_path', nargs='?', default='product_search.db')
+    parser.add_argument('--shards', type=int, default=max(2, min(4, os.cpu_count() or 2)))
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    bench(args.db_path, args.shards, num_queries=args.queries)
@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import numpy as np
+from catalog import Catalog, db_signature
+from ann_index import load_index
+from filter_index import FilterIndex
+from lexical_index import BM25Index
+from packed_rows import PackedRows, pack_rows
+from json_fragments import build_fragments
+from quantization import QUANT_KINDS, VECTOR_QUANTIZATION, QuantizedMatrix
+from metrics import log_event
+from startup import startup_report
+
+# --- SHARED, VERSIONED SEARCH INDEX ---
+# With several uvicorn workers (WEB_CONCURRENCY) every process used to hold its
+# own copy of the catalog. embed_products.py now publishes everything a search
+# reads as .npy files next to the DB:
+#
+#   product_search.index/
+#     CURRENT                 name of the live version directory
+#     v<timestamp>/           one complete, never-modified version
+#       meta.json             version, DB signature, column kinds, vocab
+#       matrix.npy            distinct unit-norm float32 vectors (+ int8/float16 copies)
+#       col.<name>.npy        numeric product columns; text columns are packed
+#                             as UTF-8 bytes + offsets (col.<name>.offsets.npy)
+#       fragments.npy         pre-serialized result JSON per product (json_fragments.py)
+#       ...                   filter, BM25 and name-phrase indexes
+#
+# Workers attach to the live version with np.load(mmap_mode='r'): the pages
+# are shared through the OS page cache, so N workers cost one copy of the
+# index plus their own small per-process state. A new version is written to a
+# fresh directory and goes live with one os.replace() of CURRENT; each worker
+# notices on its next request and swaps its whole (catalog, ANN index) pair,
+# while requests already running finish on the version they started with.
+# A version is self-contained: workers keep serving it while the DB is being
+# rewritten, until the next publish.
+#
+#   python shared_index.py publish [product_search.db]   (re)publish from the DB
+#   python shared_index.py status  [product_search.db]   live version + this process' memory
+
+KEEP_VERSIONS = 2 # The live one + the previous one, for workers still opening it
+
+def index_dir(db_path):
+    return os.path.splitext(db_path)[0] + ".index"
+
+def current_version(db_path):
+    # Directory name of the live version, or None when nothing is published
+    try:
+        with open(os.path.join(index_dir(db_path), "CURRENT"), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+# --- PUBLISH ---
+def publish(catalog, db_path):
+    root = index_dir(db_path)
+    os.makedirs(root, exist_ok=True)
+    name = f"v{time.time_ns()}"
+    tmp = os.path.join(root, f".tmp-{name}")
+    os.makedirs(tmp)
+
+    def save(file_name, array):
+        np.save(os.path.join(tmp, file_name), np.ascontiguousarray(array))
+
+    rows = catalog.rows if isinstance(catalog.rows, PackedRows) else pack_rows(list(catalog.rows))
+    kinds = {}
+    for column, (kind, data) in rows.columns.items():
+        kinds[column] = kind
+        if kind in ("int", "float"):
+            save(f"col.{column}.npy", data)
+        else:
+            offsets, blob = data
+            # Rebased, in case `rows` is a slice of a larger buffer
+            save(f"col.{column}.offsets.npy", offsets - offsets[0])
+            save(f"col.{column}.npy", np.frombuffer(blob, dtype=np.uint8)[offsets[0]:offsets[-1]])
+
+    matrix = np.asarray(catalog.matrix, dtype=np.float32)
+    save("matrix.npy", matrix)
+    for kind in QUANT_KINDS:
+        quantized = QuantizedMatrix.quantize(matrix, kind)
+        save(f"matrix.{kind}.npy", quantized.data)
+        if quantized.scales is not None:
+            save(f"matrix.{kind}.scales.npy", quantized.scales)
+    save("vector_rows.npy", catalog.vector_rows)
+    save("product_ids.npy", catalog.product_ids)
+    save("prices.npy", catalog.prices)
+    save("ratings.npy", catalog.ratings)
+    save("name_phrases.npy", catalog.name_phrases)
+    offsets, blob = catalog.fragments if catalog.fragments is not None else build_fragments(list(rows))
+    save("fragments.offsets.npy", offsets - offsets[0])
+    save("fragments.npy", blob[offsets[0]:offsets[-1]])
+
+    filters = catalog.filters
+    save("filter.price_order.npy", filters.price_order)
+    save("filter.sorted_prices.npy", filters.sorted_prices)
+    save("filter.category_codes.npy", filters.row_category_codes)
+
+    term_docs = catalog.lexical.term_docs
+    save("bm25.data.npy", term_docs.data)
+    save("bm25.indices.npy", term_docs.indices)
+    save("bm25.indptr.npy", term_docs.indptr)
+
+    meta = {
+        "version": catalog.version,
+        "db_signature": list(db_signature(db_path)),
+        "size": len(rows),
+        "columns": kinds,
+        "categories": sorted(filters.category_codes, key=filters.category_codes.get),
+        "terms": sorted(catalog.lexical.vocab, key=catalog.lexical.vocab.get),
+    }
+    with open(os.path.join(tmp, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, separators=(",", ":"))
+
+    # Complete directory first, then the one-step switch readers go by
+    os.rename(tmp, os.path.join(root, name))
+    pointer = os.path.join(root, "CURRENT")
+    with open(pointer + ".tmp", 'w', encoding='utf-8') as f:
+        f.write(name)
+    os.replace(pointer + ".tmp", pointer)
+    remove_old_versions(root, keep=name)
+    return name
+
+def remove_old_versions(root, keep):
+    # Workers still on an old version keep its mapped pages after the unlink
+    versions = sorted(d for d in os.listdir(root) if d.startswith("v") and d != keep)
+    for old in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    for tmp in (d for d in os.listdir(root) if d.startswith(".tmp-")):
+        # Left by a publisher that died half-way
+        if time.time() - os.path.getmtime(os.path.join(root, tmp)) > 3600:
+            shutil.rmtree(os.path.join(root, tmp), ignore_errors=True)
+
+# --- ATTACH ---
+def attach_published(db_path, name=None):
+    # Catalog over the memory-mapped files of the live version (or `name`);
+    # None when nothing is published
+    name = name or current_version(db_path)
+    if name is None:
+        return None
+    path = os.path.join(index_dir(db_path), name)
+    with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+
+    def load(file_name):
+        # Plain ndarray view of the mapping: np.memmap's per-index overhead adds up in hot loops
+        return np.load(os.path.join(path, file_name), mmap_mode='r').view(np.ndarray)
+
+    columns = {}
+    for column, kind in meta['columns'].items():
+        data = load(f"col.{column}.npy")
+        columns[column] = (kind, data if kind in ("int", "float") else (load(f"col.{column}.offsets.npy"), memoryview(data)))
+
+    size = meta['size']
+    prices = load("prices.npy")
+    indexes = {
+        'product_ids': load("product_ids.npy"),
+        'prices': prices,
+        'ratings': load("ratings.npy"),
+        'filters': FilterIndex.from_arrays(
+            prices, load("filter.price_order.npy"), load("filter.sorted_prices.npy"),
+            load("filter.category_codes.npy"), meta['categories'],
+        ),
+        'lexical': BM25Index.from_arrays(
+            meta['terms'], load("bm25.data.npy"), load("bm25.indices.npy"), load("bm25.indptr.npy"), size,
+        ),
+        'name_phrases': load("name_phrases.npy"),
+    }
+    if os.path.exists(os.path.join(path, "fragments.npy")): # Versions published before fragments: built per result
+        indexes['fragments'] = (load("fragments.offsets.npy"), load("fragments.npy"))
+    if VECTOR_QUANTIZATION in QUANT_KINDS and size:
+        scales = f"matrix.{VECTOR_QUANTIZATION}.scales.npy"
+        indexes['quantized'] = QuantizedMatrix(
+            VECTOR_QUANTIZATION, load(f"matrix.{VECTOR_QUANTIZATION}.npy"),
+            load(scales) if os.path.exists(os.path.join(path, scales)) else None,
+        )
+    matrix = np.load(os.path.join(path, "matrix.npy"), mmap_mode='r')
+    return Catalog(PackedRows(columns, size), matrix, meta['version'], load("vector_rows.npy"), indexes)
+
+# --- LIVE CATALOG PER WORKER ---
+class LiveCatalog:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.published = None # Version directory served, None when loaded from SQLite
+        self.swaps = 0
+        self._state = None     # (key, catalog, ann_index), replaced as a whole
+        self._lock = threading.Lock()
+
+    def _key(self):
+        # Changes when a new version is published; without a published index,
+        # when the DB file is rewritten
+        try:
+            st = os.stat(os.path.join(index_dir(self.db_path), "CURRENT"))
+            return ("published", st.st_ino, st.st_mtime_ns)
+        except FileNotFoundError:
+            return ("db",) + db_signature(self.db_path)
+
+    def get(self):
+        # (catalog, ann_index) for the live version; a request should call this
+        # once and use that pair throughout
+        key = self._key()
+        state = self._state
+        if state is None or state[0] != key:
+            with self._lock:
+                if self._state is None or self._state[0] != key:
+                    self._load(key)
+                state = self._state
+        return state[1], state[2]
+
+    def _load(self, key):
+        print(f"Loading Catalog Snapshot: {self.db_path}...")
+        published = current_version(self.db_path)
+        catalog = None
+        with startup_report.stage("catalog_load"): # Published index if there is one, else SQLite
+            if published:
+                try:
+                    catalog = attach_published(self.db_path, published)
+                except Exception as e:
+                    print(f"Error attaching published index, falling back to DB: {e}")
+            if catalog is None:
+                published = None
+                catalog = Catalog.from_db(self.db_path)
+        with startup_report.stage("ann_index_load"):
+            ann_index = load_index(self.db_path)
+        if ann_index is not None and not ann_index.bind(catalog.product_ids):
+            print("ANN index is stale (rebuild with embed_products.py). Using exact search.")
+            ann_index = None
+        self.published = published
+        if self._state is not None:
+            self.swaps += 1
+            log_event("index_swap", always=True, version=catalog.version, published=self.published, **process_memory())
+        self._state = (key, catalog, ann_index)
+        print(f"Catalog loaded: {len(catalog)} products ({self.stats()['source']}).")
+
+    def stats(self):
+        state = self._state
+        return {
+            "published_version": self.published,
+            "catalog_version": state[1].version if state else None,
+            "source": "shared_mmap" if self.published else "private",
+            "swaps": self.swaps,
+        }
+
+_live_catalogs = {}
+_live_catalogs_lock = threading.Lock()
+
+def get_live_catalog(db_path):
+    # One LiveCatalog per DB path and process
+    with _live_catalogs_lock:
+        live = _live_catalogs.get(db_path)
+        if live is None:
+            live = _live_catalogs[db_path] = LiveCatalog(db_path)
+        return live
+
+# --- PROCESS MEMORY ---
+def process_memory():
+    # Resident memory of this worker, in MB. rss counts the shared index pages in
+    # every process that touched them; pss splits them between the processes.
+    stats = {"pid": os.getpid()}
+    fields = {"VmRSS": "rss_mb", "RssAnon": "rss_private_mb", "RssFile": "rss_file_mb", "RssShmem": "rss_shmem_mb"}
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    stats[fields[key]] = round(int(value.split()[0]) / 1024, 1)
+        with open("/proc/self/smaps_rollup", 'r') as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    stats["pss_mb"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        import resource # No /proc (macOS): peak RSS is the best available
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        stats["peak_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish / inspect the shared search index")
+    parser.add_argument('command', choices=['publish', 'status'])
+    parser.add_argument('db_path', nargs='?', default='product_search.db')
+    args = parser.parse_args()
+    if args.command == "publish":
+        name = publish(Catalog.from_db(args.db_path), args.db_path)
+        print(f"Published {os.path.join(index_dir(args.db_path), name)}")
+    else:
+        live = get_live_catalog(args.db_path)
+        catalog, _ = live.get()
+        print(f"Live version: {current_version(args.db_path)} ({len(catalog)} products)")
+        print(json.dumps({**live.stats(), **process_memory()}, indent=2))
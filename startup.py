@@ -0,0 +1,41 @@
+import os
+import time
+from contextlib import contextmanager
+
+# --- STARTUP TIMING ---
+# sentence_transformers pulls in torch, which takes seconds to import. It is
+# now imported on first use (load_model) instead of at module import time, and
+# every expensive startup step is timed so cold starts can be broken down
+# into import / model load / catalog + index load.
+
+# Backend only: LAZY_STARTUP=1 defers the model until the first encode
+LAZY_STARTUP = os.environ.get("LAZY_STARTUP", "0") == "1"
+
+class StartupReport:
+    def __init__(self):
+        self.stages = {} # name -> ms (accumulates if a stage runs again, e.g. a reload)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def as_dict(self):
+        return {name: round(ms, 1) for name, ms in self.stages.items()}
+
+    def print_report(self):
+        print("--- Startup Timing ---")
+        for name, ms in self.stages.items():
+            print(f"  {name:<16} {ms:>9.1f} ms")
+        print(f"  {'total':<16} {sum(self.stages.values()):>9.1f} ms")
+
+startup_report = StartupReport()
+
+def load_model(model_name):
+    with startup_report.stage("import"):
+        from sentence_transformers import SentenceTransformer
+    with startup_report.stage("model_load"):
+        return SentenceTransformer(model_name)
@@ -0,0 +1,41 @@
+import importlib.util
+import os
+import sys
+import types
+import pytest
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+from hash_encoder import HashEncoder
+
+# --- TEST SETUP ---
+# Tests never load the real model: HashEncoder (benchmarks/hash_encoder.py)
+# stands in for SentenceTransformer. embed_products.py imports it at module
+# level, so a stand-in module is registered when sentence-transformers is not
+# installed.
+if importlib.util.find_spec("sentence_transformers") is None:
+    stand_in = types.ModuleType("sentence_transformers")
+    stand_in.SentenceTransformer = HashEncoder
+    sys.modules["sentence_transformers"] = stand_in
+
+@pytest.fixture(scope="session")
+def catalog_db(tmp_path_factory):
+    # Seeded synthetic catalog (benchmarks/synthetic_catalog.py), embedded with
+    # HashEncoder, with its ANN index and published search index
+    from synthetic_catalog import build_catalog
+    return build_catalog(str(tmp_path_factory.mktemp("catalog") / "catalog.db"), 3000, encoder=HashEncoder())
+
+@pytest.fixture(scope="session")
+def backend(catalog_db):
+    # backend/main.py serving `catalog_db`, with HashEncoder behind the batching encoder
+    from batch_encoder import BatchEncoder
+    spec = importlib.util.spec_from_file_location("backend_main", os.path.join(ROOT_DIR, "backend", "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.DB_PATH = catalog_db
+    module.model = HashEncoder()
+    module.encoder = BatchEncoder(module.model)
+    module.load_resources()
+    return module
@@ -0,0 +1,39 @@
+import numpy as np
+from ann_index import ANN_NPROBE, IVFIndex, load_index
+from catalog import Catalog, normalize_rows
+
+def perturbed_queries(catalog, n=100, noise=0.5, seed=0):
+    # Product vectors plus noise, as in ann_index.recall_report
+    rng = np.random.default_rng(seed)
+    picks = catalog.vector_rows[rng.choice(len(catalog), n, replace=False)]
+    dim = catalog.matrix.shape[1]
+    return normalize_rows(catalog.matrix[picks] + noise * rng.standard_normal((n, dim), dtype=np.float32) / np.sqrt(dim))
+
+def test_saved_index_matches_the_catalog(catalog_db):
+    catalog = Catalog.from_db(catalog_db)
+    index = load_index(catalog_db)
+    assert index.bind(catalog.product_ids)
+    # Every product is in exactly one list
+    assert np.array_equal(np.sort(index.rows), np.arange(len(catalog)))
+    assert not index.bind(catalog.product_ids[:-1])
+
+def test_probing_every_list_scans_every_row(catalog_db):
+    catalog = Catalog.from_db(catalog_db)
+    index = IVFIndex.build_for_catalog(catalog)
+    index.bind(catalog.product_ids)
+    rows = index.probe_rows(perturbed_queries(catalog, 1)[0], nprobe=index.nlist)
+    assert np.array_equal(rows, np.arange(len(catalog))) # Sorted: ties break as in a full scan
+
+def test_recall_at_default_nprobe(catalog_db, k=10):
+    catalog = Catalog.from_db(catalog_db)
+    index = load_index(catalog_db)
+    index.bind(catalog.product_ids)
+    hits = 0
+    queries = perturbed_queries(catalog)
+    for q in queries:
+        scores = catalog.semantic_scores(q)
+        kth = np.sort(scores)[-k] # Tie-aware: any row scoring >= the exact k-th best is a hit
+        rows = index.probe_rows(q, ANN_NPROBE)
+        found = rows[np.argsort(-scores[rows], kind="stable")[:k]]
+        hits += int(np.sum(scores[found] >= kth - 1e-6))
+    assert hits / (k * len(queries)) >= 0.95
@@ -0,0 +1,44 @@
+import threading
+import numpy as np
+from batch_encoder import BatchEncoder
+from hash_encoder import HashEncoder
+
+class ThreadRecorder(HashEncoder):
+    # Records the thread of every model call
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def encode(self, texts, **kwargs):
+        self.threads.add(threading.current_thread().name)
+        return super().encode(texts)
+
+def test_results_match_the_model():
+    model = HashEncoder()
+    encoder = BatchEncoder(model)
+    assert np.allclose(encoder.encode("red running shoes"), model.encode("red running shoes"))
+    texts = [f"query {i}" for i in range(100)] # Larger than max_batch: encoded on its own
+    assert np.allclose(encoder.encode(texts), model.encode(texts))
+
+def test_only_the_worker_thread_calls_the_model():
+    model = ThreadRecorder()
+    encoder = BatchEncoder(model, window_ms=5)
+    reference = HashEncoder()
+    results = {}
+
+    def request(i):
+        # Single texts and lists arrive together and share batches
+        results[i] = encoder.encode(f"text {i}") if i % 2 else encoder.encode([f"text {i}", f"other {i}"])
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.threads == {"batch-encoder"}
+    for i, vectors in results.items():
+        expected = reference.encode(f"text {i}") if i % 2 else reference.encode([f"text {i}", f"other {i}"])
+        assert np.allclose(vectors, expected)
+    assert encoder.stats()["items"] == 60
+    assert encoder.stats()["batches"] < 40
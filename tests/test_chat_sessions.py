@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from chat_sessions import ChatSession, parse_followup, parse_prices
+
+@pytest.mark.parametrize("message, low, high", [
+    # Decimals and lakh / k / thousand suffixes
+    ("under 1.5 lakh", None, 150000),
+    ("above 1.5l", 150000, None),
+    ("under 2 lakhs", None, 200000),
+    ("under 50k", None, 50000),
+    ("below 20 thousand", None, 20000),
+    # Thousands separators, currency
+    ("under 50,000", None, 50000),
+    ("less than ₹20,000", None, 20000),
+    ("above rs. 50,000", 50000, None),
+    ("under 50000 rs", None, 50000),
+    # Phrasings
+    ("less than 20000", None, 20000),
+    ("more than 30k", 30000, None),
+    ("not more than 25000", None, 25000),
+    ("at least 10k", 10000, None),
+    ("max 50k please", None, 50000),
+    ("between 20k and 40k", 20000, 40000),
+    ("between 20 and 30k", 20000, 30000),
+    ("from 10 to 15 thousand", 10000, 15000),
+    ("between 1 lakh and 1.5 lakh", 100000, 150000),
+    # Numbers that are not prices
+    ("at least 4 stars", None, None),
+    ("more than 16 GB", None, None),
+    ("under 1.5 gb", None, None),
+    ("with more RAM", None, None),
+    ("cheaper one?", None, None),
+])
+def test_parse_prices(message, low, high):
+    assert parse_prices(message) == (low, high)
+
+def test_less_than_is_a_price_not_an_attribute():
+    intent = parse_followup("less than 20000")
+    assert intent["max_price"] == 20000
+    assert intent["attribute"] is None
+    assert intent["content"] == []
+
+@pytest.mark.parametrize("message, key", [
+    ("cheaper one?", "cheaper"),
+    ("something less expensive", "cheaper"),
+    ("more expensive", "pricier"),
+    ("better rated ones", "rating"),
+])
+def test_parse_followup_flags(message, key):
+    intent = parse_followup(message)
+    assert intent[key] is True
+    assert intent["content"] == []
+
+def test_parse_followup_attribute_and_content():
+    intent = parse_followup("bigger battery under 1 lakh")
+    assert intent["attribute"] == ("battery", 1)
+    assert intent["max_price"] == 100000
+    assert intent["content"] == ["battery"]
+    assert parse_followup("smaller screen")["attribute"] == ("screen", -1)
+    # An amount after "max" is a price, not a spec to rank by
+    assert parse_followup("max 50k")["attribute"] is None
+    # New topic: content words, no constraints
+    intent = parse_followup("what about phones?")
+    assert intent["content"] == ["phones"]
+    assert intent["max_price"] is None and intent["min_price"] is None
+
+def test_session_memory_is_capped():
+    session = ChatSession("v1", "gaming laptop", np.ones(384), np.arange(5000), np.ones(5000))
+    assert len(session.rows) == len(session.scores) <= 200
+    assert session.rows.dtype == np.int32 and session.scores.dtype == np.float32
+    assert session.nbytes <= 8192
+
+def chat(backend, session_id, *messages):
+    return [backend.chat_turn(message, session_id) for message in messages]
+
+def test_shared_word_with_a_new_topic_searches_again(backend):
+    # "dell" matches the Dell laptops kept in the session, but "printer" matches none of them
+    first, second = chat(backend, "new-topic", "dell laptop", "dell printer")
+    assert first["turn"] == "search"
+    assert second["turn"] == "intent_change"
+    assert "Printer" in second["best_match"]["product_name"]
+
+def test_followup_keeps_the_search_score_scale(backend):
+    first, second = chat(backend, "same-topic", "gaming laptop", "gaming laptop with ssd")
+    assert second["turn"] == "refined"
+    # Ranked with the follow-up text, but scored like a normal search of the last query
+    catalog, rows, scores = backend.search_rows("gaming laptop", 0, 1000000, "All", backend.CHAT_CANDIDATES)
+    search_scores = {catalog.rows[int(r)]['product_id']: s for r, s in zip(rows, scores)}
+    assert second["best_match"]["score"] == pytest.approx(search_scores[second["product_id"]], abs=1e-5)
+
+def test_refinement_cue_stays_on_the_candidates(backend):
+    first, second = chat(backend, "cheaper", "gaming laptop", "cheaper one?")
+    assert second["turn"] == "refined"
+    assert second["best_match"]["price"] < first["best_match"]["price"]
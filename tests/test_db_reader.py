@@ -0,0 +1,13 @@
+import sqlite3
+import pytest
+from db_reader import read_connection
+
+def test_read_connection_is_read_only_and_closed_after_use(catalog_db):
+    with read_connection(catalog_db) as conn:
+        (count,) = conn.execute("SELECT COUNT(*) FROM products_vectors").fetchone()
+        assert count == 3000
+        assert conn.execute("SELECT product_id FROM products_vectors LIMIT 1").fetchone().keys()[0] == "product_id"
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM products_vectors")
+    with pytest.raises(sqlite3.ProgrammingError): # Closed, not kept around per thread
+        conn.execute("SELECT 1")
@@ -0,0 +1,144 @@
+import os
+import shutil
+import sqlite3
+import pandas as pd
+import pytest
+import embed_products
+from catalog import Catalog, read_catalog_version
+from hash_encoder import HashEncoder
+from synthetic_catalog import write_csv
+
+ROWS = 300
+
+class CountingEncoder(HashEncoder):
+    # HashEncoder that records every text it encodes, and can fail on the n-th call
+    def __init__(self, model_name=None, fail_on_call=None):
+        super().__init__()
+        self.texts = []
+        self.calls = 0
+        self.fail_on_call = fail_on_call
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("interrupted")
+        self.texts += [texts] if isinstance(texts, str) else list(texts)
+        return super().encode(texts)
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # embed_products.py works on products.csv / product_search.db in the current directory
+    shutil.copy(os.path.join(os.path.dirname(embed_products.__file__), "schema.sql"), tmp_path)
+    write_csv(str(tmp_path / "products.csv"), ROWS)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def use_encoder(monkeypatch, encoder):
+    monkeypatch.setattr(embed_products, "SentenceTransformer", lambda model_name: encoder)
+
+def products(db_path="product_search.db"):
+    # product_id -> (row fields, content_hash, vector bytes)
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT p.product_id, p.product_name, p.category, p.price, p.rating, p.specifications, p.content_hash, e.vector "
+        "FROM products_vectors p JOIN embeddings e ON e.embedding_id = p.embedding_id"
+    ).fetchall()
+    conn.close()
+    return {r[0]: r[1:] for r in rows}
+
+def catalog_version(db_path="product_search.db"):
+    conn = sqlite3.connect(db_path)
+    version = read_catalog_version(conn)
+    conn.close()
+    return version
+
+def full_build(monkeypatch, db_path):
+    # Reference: a full build of the current products.csv, kept at `db_path`
+    use_encoder(monkeypatch, CountingEncoder())
+    embed_products.embed_products()
+    os.replace("product_search.db", db_path)
+    return products(db_path)
+
+def test_interrupted_stream_resumes_where_it_stopped(workdir, monkeypatch):
+    expected = full_build(monkeypatch, "full.db")
+
+    use_encoder(monkeypatch, CountingEncoder(fail_on_call=3))
+    with pytest.raises(RuntimeError, match="interrupted"):
+        embed_products.embed_products_streaming(batch_size=64)
+    conn = sqlite3.connect("product_search.db")
+    (rows_done,) = conn.execute("SELECT rows_done FROM ingest_progress").fetchone()
+    (stored,) = conn.execute("SELECT COUNT(*) FROM products_vectors").fetchone()
+    conn.close()
+    assert rows_done == stored == 128 # The two batches encoded before the failure
+
+    encoder = CountingEncoder()
+    use_encoder(monkeypatch, encoder)
+    embed_products.embed_products_streaming(batch_size=64, resume=True)
+    assert products() == expected
+    # Only rows after the committed ones were read again, and no stored text was re-encoded
+    remaining = embed_products.embed_texts(pd.read_csv("products.csv").iloc[128:])
+    assert set(encoder.texts) <= set(remaining)
+    assert len(encoder.texts) == len(set(encoder.texts))
+    conn = sqlite3.connect("product_search.db")
+    assert conn.execute("SELECT COUNT(*) FROM ingest_progress").fetchone() == (0,)
+    conn.close()
+
+def test_stream_without_resume_starts_over(workdir, monkeypatch):
+    expected = full_build(monkeypatch, "full.db")
+    use_encoder(monkeypatch, CountingEncoder(fail_on_call=2))
+    with pytest.raises(RuntimeError):
+        embed_products.embed_products_streaming(batch_size=64)
+    use_encoder(monkeypatch, CountingEncoder())
+    embed_products.embed_products_streaming(batch_size=64)
+    assert products() == expected
+
+def test_incremental_with_unchanged_csv_is_a_no_op(workdir, monkeypatch):
+    use_encoder(monkeypatch, CountingEncoder())
+    embed_products.embed_products()
+    before, version = products(), catalog_version()
+
+    encoder = CountingEncoder()
+    use_encoder(monkeypatch, encoder)
+    embed_products.embed_products_incremental()
+    assert encoder.texts == []
+    assert products() == before
+    assert catalog_version() == version
+
+def test_incremental_matches_a_full_build(workdir, monkeypatch):
+    use_encoder(monkeypatch, CountingEncoder())
+    embed_products.embed_products()
+    version = catalog_version()
+
+    df = pd.read_csv("products.csv")
+    df.loc[0, 'specifications'] = "Processor: M3 | 24GB RAM | 1TB SSD" # Re-embedded
+    df.loc[1, 'price'] = df.loc[1, 'price'] + 1                        # Same embedding, new price
+    added = df.iloc[[2]].assign(product_id=ROWS + 1)                  # New product
+    df = pd.concat([df.drop(index=3), added])                          # Product 4 removed
+    df.to_csv("products.csv", index=False)
+
+    encoder = CountingEncoder()
+    use_encoder(monkeypatch, encoder)
+    embed_products.embed_products_incremental()
+    assert catalog_version() != version
+    assert encoder.texts == embed_products.embed_texts(df.iloc[[0]]) # Only the changed text
+    updated = products()
+    shutil.move("product_search.db", "incremental.db")
+    assert updated == full_build(monkeypatch, "full.db")
+
+@pytest.mark.parametrize("build", ["embed_products", "embed_products_streaming"])
+def test_built_db_opens_read_only_from_a_read_only_directory(workdir, monkeypatch, build):
+    use_encoder(monkeypatch, CountingEncoder())
+    getattr(embed_products, build)()
+    os.mkdir("ro")
+    shutil.move("product_search.db", "ro/product_search.db")
+    os.chmod("ro", 0o555)
+    try:
+        # A WAL DB would need -wal/-shm files next to it, even for mode=ro readers
+        conn = sqlite3.connect(f"file:{workdir / 'ro' / 'product_search.db'}?mode=ro", uri=True)
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+        assert conn.execute("SELECT COUNT(*) FROM products_vectors").fetchone() == (ROWS,)
+        conn.close()
+        assert len(Catalog.from_db("ro/product_search.db")) == ROWS
+        assert os.listdir("ro") == ["product_search.db"]
+    finally:
+        os.chmod("ro", 0o755)
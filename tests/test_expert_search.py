@@ -0,0 +1,39 @@
+import json
+import pytest
+import lambda_handler
+from hash_encoder import HashEncoder
+
+QUERIES = ["gaming laptop", "nike running shoes", "tea", "zzqx"]
+FILTERS = [(0, 1000000, None), (1000, 60000, "Electronics"), (0, 5000, "Fashion")]
+
+@pytest.fixture
+def engine(catalog_db, monkeypatch):
+    monkeypatch.setattr(lambda_handler, "DB_FILE", catalog_db)
+    monkeypatch.setattr(lambda_handler, "_model_cache", HashEncoder())
+    return lambda_handler
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("filters", FILTERS)
+def test_in_process_results_match_the_lambda_response(engine, query, filters):
+    min_price, max_price, category = filters
+    results = engine.expert_search(query, min_price, max_price, category)
+    response = engine.lambda_handler(
+        {"query": query, "min_price": min_price, "max_price": max_price, "category": category}, None)
+    assert [r.record() for r in results] == json.loads(response["body"])
+    for result in results:
+        assert result.catalog.product_ids[result.row] == result.product_id
+        assert result.version == result.catalog.version
+
+def test_empty_query_and_k(engine):
+    assert engine.expert_search("") == []
+    assert len(engine.expert_search("gaming laptop", k=1)) == 1
+
+def test_app_cards_are_rendered_once_per_product(engine, monkeypatch):
+    app = pytest.importorskip("app") # Needs gradio
+    monkeypatch.setattr(app, "engine_search", engine.expert_search)
+    results = engine.expert_search("gaming laptop")
+    html = app.generate_expert_cards(results)
+    assert all(app.card_cache.get((r.version, r.product_id)) is not None for r in results)
+    assert app.generate_expert_cards(results) == html
+    assert html.count("AI BEST CHOICE") == 1
+    assert str(int(results[0].score * 100)) + "%" in html
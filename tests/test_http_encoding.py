@@ -0,0 +1,67 @@
+import gzip
+import json
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+import http_encoding
+from catalog import Catalog
+from http_encoding import choose_encoding, encode_body, etag, not_modified
+from json_fragments import render_results
+
+def test_not_modified_uses_weak_comparison():
+    tag = etag(b'[{"a":1}]')
+    assert tag.startswith('W/"')
+    assert not_modified(tag, tag)
+    assert not_modified(tag[2:], tag) # Strong form of the same tag
+    assert not_modified(f'W/"other", {tag}', tag)
+    assert not_modified("*", tag)
+    assert not not_modified('W/"other"', tag)
+    assert not not_modified(None, tag)
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("*", "gzip"),
+    (None, None),
+])
+def test_choose_encoding(header, expected, monkeypatch):
+    monkeypatch.setattr(http_encoding, "brotli", None)
+    assert choose_encoding(header) == expected
+
+def test_encode_body(monkeypatch):
+    monkeypatch.setattr(http_encoding, "brotli", None)
+    big = json.dumps([{"name": f"product {i}"} for i in range(200)]).encode()
+    status, body, headers = encode_body(big, "gzip")
+    assert status == 200 and headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == big
+    # Small bodies go out as is; a matching If-None-Match gets an empty 304
+    status, body, small_headers = encode_body(b"[]", "gzip")
+    assert (status, body) == (200, b"[]") and "Content-Encoding" not in small_headers
+    status, body, _ = encode_body(big, "gzip", headers["ETag"])
+    assert status == 304 and body == b""
+
+def test_brotli_preferred_when_accepted():
+    brotli = pytest.importorskip("brotli")
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("gzip, br;q=0") == "gzip"
+    big = json.dumps([{"name": f"product {i}"} for i in range(200)]).encode()
+    status, body, headers = encode_body(big, "br, gzip")
+    assert status == 200 and headers["Content-Encoding"] == "br"
+    assert brotli.decompress(body) == big
+
+def test_rendered_results_match_result_records(catalog_db):
+    catalog = Catalog.from_db(catalog_db)
+    rows, scores = np.array([5, 0, 42]), np.array([1.5, 0.25, 1 / 3])
+    assert json.loads(render_results(catalog, rows, scores)) == [
+        catalog.result(row, score) for row, score in zip(rows, scores)
+    ]
+
+def test_search_etag_and_gzip(backend):
+    client = TestClient(backend.app)
+    body = {"query": "gaming laptop etag", "min_price": 0, "max_price": 500000}
+    first = client.post("/search", json=body, headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.json() == backend.search_products(body["query"], 0, 500000, "All")
+    again = client.post("/search", json=body, headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304 and again.content == b""
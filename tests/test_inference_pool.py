@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from inference_pool import InferencePool, Overloaded
+
+def test_full_queue_is_refused_with_429():
+    async def scenario():
+        pool = InferencePool(workers=1, max_queue=1, deadline_ms=0)
+        release = threading.Event()
+        running = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05) # Holds the only worker
+        queued = asyncio.ensure_future(pool.run(lambda: "ran"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(Overloaded) as refused:
+            await pool.run(lambda: "never")
+        release.set()
+        assert await queued == "ran"
+        await running
+        pool.close()
+        return refused.value, pool.stats()
+
+    error, stats = asyncio.run(scenario())
+    assert (error.status_code, error.reason) == (429, "queue_full")
+    assert stats["rejected_queue_full"] == 1 and stats["completed"] == 2 and stats["queued"] == 0
+
+def test_queue_that_cannot_clear_in_time_is_refused_with_503():
+    async def scenario():
+        pool = InferencePool(workers=1, max_queue=10, deadline_ms=150)
+        await pool.run(time.sleep, 0.1) # Service time estimate: ~100 ms
+        release = threading.Event()
+        running = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        # One job ahead: ~100 ms for it plus ~100 ms for this one > 150 ms
+        with pytest.raises(Overloaded) as refused:
+            await pool.run(lambda: "never")
+        release.set()
+        await running
+        pool.close()
+        return refused.value
+
+    error = asyncio.run(scenario())
+    assert (error.status_code, error.reason) == (503, "deadline")
+
+def test_expired_request_is_dropped_without_running():
+    calls = []
+
+    async def scenario():
+        pool = InferencePool(workers=1, max_queue=10, deadline_ms=50) # No service time estimate yet
+        running = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+        await asyncio.sleep(0.02)
+        with pytest.raises(Overloaded) as refused:
+            await pool.run(calls.append, "ran") # Waits ~180 ms for the worker
+        await running
+        pool.close()
+        return refused.value, pool.stats()
+
+    error, stats = asyncio.run(scenario())
+    assert (error.status_code, error.reason) == (503, "expired")
+    assert calls == [] and stats["rejected_expired"] == 1 and stats["queued"] == 0
+
+@pytest.fixture
+def client(backend, monkeypatch):
+    # TestClient for the backend, and a function that swaps in a fresh inference pool
+    pools = []
+    def use_pool(**kwargs):
+        pools.append(InferencePool(**kwargs))
+        monkeypatch.setattr(backend, "inference", pools[-1])
+        return pools[-1]
+    yield TestClient(backend.app), use_pool
+    for pool in pools:
+        pool.close()
+
+def test_search_answers_429_and_503_with_retry_after(client):
+    client, use_pool = client
+    use_pool(workers=1, max_queue=0, deadline_ms=0) # Nothing may wait
+    response = client.post("/search", json={"query": "shed me 429"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+
+    pool = use_pool(workers=1, max_queue=10, deadline_ms=100)
+    pool.running, pool._service_seconds = 1, 0.5 # A slow search is running
+    response = client.post("/search", json={"query": "shed me 503"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+    pool.running = 0
+    assert client.post("/search", json={"query": "shed me 503"}).status_code == 200
@@ -0,0 +1,39 @@
+import itertools
+import json
+import pytest
+import lambda_handler
+from hash_encoder import HashEncoder
+
+QUERIES = ["gaming laptop", "nike running shoes", "samsung galaxy", "iphone", "tea", "leather jacket", "", "zzqx"]
+FILTERS = [{}, {"min_price": 1000, "max_price": 60000, "category": "Electronics"},
+           {"max_price": 5000, "category": "Fashion"}, {"min_price": 0, "max_price": 1}]
+
+@pytest.fixture
+def handler(catalog_db, monkeypatch):
+    monkeypatch.setattr(lambda_handler, "DB_FILE", catalog_db)
+    monkeypatch.setattr(lambda_handler, "_model_cache", HashEncoder())
+    return lambda_handler.lambda_handler
+
+def test_batch_matches_single_searches(handler):
+    searches = [{"query": q, **f} for q, f in itertools.product(QUERIES, FILTERS)] * 3
+    assert len(searches) > lambda_handler.BATCH_QUERY_CHUNK # Spans several chunks
+    response = handler({"queries": searches}, None)
+    assert response["statusCode"] == 200
+    batch = json.loads(response["body"])
+    assert len(batch) == len(searches)
+    for search, found in zip(searches, batch):
+        single = handler(search, None)
+        assert single["statusCode"] == 200
+        expected = json.loads(single["body"])
+        if not search["query"]:
+            assert found == expected == []
+            continue
+        assert [r["product_id"] for r in found] == [r["product_id"] for r in expected]
+        assert [r["score"] for r in found] == pytest.approx([r["score"] for r in expected], abs=1e-5)
+        assert [r["match_type"] for r in found] == [r["match_type"] for r in expected]
+        # Per-query filters
+        assert all(search.get("min_price", 0) <= r["price"] <= search.get("max_price", 1000000) for r in found)
+        assert all(r["category"] == search["category"] for r in found if "category" in search)
+
+def test_empty_batch(handler):
+    assert json.loads(handler({"queries": []}, None)["body"]) == []
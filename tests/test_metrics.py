@@ -0,0 +1,52 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+import metrics
+from metrics import Counter, Histogram, log_event, stats_lines
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "test", buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.01, 0.05, 0.5, 5.0):
+        histogram.observe(value, stage="scoring")
+    lines = histogram.render()
+    assert 'test_seconds_bucket{stage="scoring",le="0.01"} 2' in lines # Upper bounds are inclusive
+    assert 'test_seconds_bucket{stage="scoring",le="0.1"} 3' in lines
+    assert 'test_seconds_bucket{stage="scoring",le="1.0"} 4' in lines
+    assert 'test_seconds_bucket{stage="scoring",le="+Inf"} 5' in lines
+    assert 'test_seconds_count{stage="scoring"} 5' in lines
+    assert any(line.startswith('test_seconds_sum{stage="scoring"} 5.56') for line in lines)
+
+def test_counter_labels():
+    counter = Counter("test_total", "test")
+    counter.inc(reason="a")
+    counter.inc(2, reason="a")
+    counter.inc()
+    assert counter.value(reason="a") == 3 and counter.value() == 1 and counter.value(reason="b") == 0
+    assert counter.render()[2:] == ["test_total 1", 'test_total{reason="a"} 3']
+
+def test_stats_lines_keep_numbers_only():
+    lines = stats_lines("cache", {"hits": 3, "hit_rate": 0.5, "enabled": True, "name": "lru", "nested": {}})
+    assert lines == ["# TYPE cache_hits gauge", "cache_hits 3", "# TYPE cache_hit_rate gauge", "cache_hit_rate 0.5"]
+
+def test_log_event_sampling(capsys, monkeypatch):
+    monkeypatch.setattr(metrics, "LOG_SAMPLE_RATE", 0.0)
+    log_event("search", query="sampled out")
+    log_event("search_error", always=True, error="boom")
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    event = json.loads(lines[0])
+    assert event["event"] == "search_error" and event["error"] == "boom" and "ts" in event
+
+def stage_count(text, stage):
+    prefix = f'search_stage_seconds_count{{stage="{stage}"}} '
+    return next((int(line[len(prefix):]) for line in text.splitlines() if line.startswith(prefix)), 0)
+
+def test_metrics_endpoint_records_search_stages(backend):
+    client = TestClient(backend.app)
+    before = client.get("/metrics").text
+    assert client.post("/search", json={"query": "metrics stage test laptop"}).status_code == 200
+    after = client.get("/metrics")
+    assert after.headers["content-type"].startswith("text/plain")
+    for stage in ("filter", "query_encode", "scoring", "top_k"):
+        assert stage_count(after.text, stage) == stage_count(before, stage) + 1, stage
+    assert "# TYPE inference_completed gauge" in after.text
@@ -0,0 +1,55 @@
+import json
+import sqlite3
+import pytest
+from catalog import Catalog
+from json_fragments import record_fragment
+from packed_rows import pack_rows
+from shared_index import attach_published
+
+ROWS = [
+    {"product_id": 1, "product_name": "Café Noir ☕", "price": 499.0, "rating": 4.5, "specifications": None},
+    {"product_id": 2, "product_name": "", "price": 10.0, "rating": 5.0, "specifications": "Size: M | Fit: Slim"},
+    {"product_id": -2**40, "product_name": "Élan\n\"quoted\"", "price": 0.5, "rating": 4.0, "specifications": 3},
+]
+
+def test_pack_rows_round_trip():
+    packed = pack_rows(ROWS)
+    assert len(packed) == len(ROWS)
+    assert list(packed) == ROWS
+    assert packed[-1] == ROWS[-1]
+    assert [type(v) for v in packed[0].values()] == [type(v) for v in ROWS[0].values()]
+    assert packed.columns["specifications"][0] == "json" # NULLs and mixed types
+    with pytest.raises(IndexError):
+        packed[3]
+
+def test_slices_share_the_columns():
+    packed = pack_rows(ROWS)
+    assert list(packed[1:]) == ROWS[1:]
+    assert list(packed[1:2]) == ROWS[1:2]
+    assert list(packed[2:1]) == []
+    with pytest.raises(ValueError):
+        packed[::2]
+
+def db_records(catalog_db):
+    # Product records straight from SQLite, as the API returned them before packing
+    conn = sqlite3.connect(catalog_db)
+    conn.row_factory = sqlite3.Row
+    records = []
+    for row in conn.execute("SELECT * FROM products_vectors ORDER BY rowid"):
+        record = dict(row)
+        for column in ("vector", "content_hash", "embedding_id"):
+            record.pop(column, None)
+        records.append(record)
+    conn.close()
+    return records
+
+@pytest.mark.parametrize("load", ["from_db", "published"])
+def test_hydrated_records_are_byte_identical(catalog_db, load):
+    catalog = Catalog.from_db(catalog_db) if load == "from_db" else attach_published(catalog_db)
+    expected = db_records(catalog_db)
+    assert len(catalog) == len(expected)
+    for row in range(0, len(catalog), 7):
+        record = catalog.rows[row]
+        assert json.dumps(record) == json.dumps(expected[row])
+        assert json.dumps(catalog.result(row, 1.25)) == json.dumps({**expected[row], "score": 1.25})
+        assert catalog.result_fragment(row) == record_fragment(expected[row])
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+import catalog as catalog_module
+import shared_index
+from catalog import Catalog, top_k
+from hash_encoder import HashEncoder
+from hybrid_scoring import score_candidates
+from shared_index import attach_published, current_version
+
+QUERIES = ["gaming laptop", "nike running shoes", "samsung galaxy", "iphone", "tea", "leather jacket"]
+
+def search(catalog, query):
+    # (product_ids, scores) of the top 10, as the backend ranks them
+    candidates = np.arange(len(catalog))
+    rows, scores, _, _ = score_candidates(catalog, query, HashEncoder().encode(query), candidates)
+    best = top_k(scores, 10)
+    return catalog.product_ids[rows[best]].tolist(), scores[best]
+
+@pytest.mark.parametrize("kind", ["int8", "float16"])
+def test_quantized_shortlist_rescored_matches_exact(catalog_db, monkeypatch, kind):
+    exact = Catalog.from_db(catalog_db)
+    monkeypatch.setattr(shared_index, "VECTOR_QUANTIZATION", kind)
+    quantized = attach_published(catalog_db, current_version(catalog_db))
+    assert quantized.quantized.kind == kind
+    assert quantized.embedding_stats()["format"] == kind
+    for query in QUERIES:
+        exact_ids, exact_scores = search(exact, query)
+        ids, scores = search(quantized, query)
+        assert ids == exact_ids
+        assert scores == pytest.approx(exact_scores, abs=1e-5) # Rescored at float32
+
+def test_sqlite_catalog_is_not_quantized(catalog_db, monkeypatch, capsys):
+    # An in-RAM float32 matrix plus a quantized copy would only use more memory
+    monkeypatch.setattr(catalog_module, "VECTOR_QUANTIZATION", "int8")
+    monkeypatch.setattr(catalog_module, "_warned_not_quantized", False)
+    catalog = Catalog.from_db(catalog_db)
+    assert catalog.quantized is None
+    assert catalog.embedding_stats()["format"] == "float32"
+    assert "VECTOR_QUANTIZATION=int8 ignored" in capsys.readouterr().out
@@ -0,0 +1,92 @@
+import math
+import re
+import sqlite3
+from collections import Counter
+import numpy as np
+import pytest
+from catalog import top_k, top_k_rows
+from hash_encoder import HashEncoder
+from hybrid_scoring import EXACT_MATCH_BOOST, KEYWORD_WEIGHT
+from vector_store import decode_vector
+
+QUERIES = ["gaming laptop", "nike running shoes", "samsung galaxy", "iphone", "tea", "leather jacket", "zzqx"]
+FILTERS = [(0, 1000000, "All"), (1000, 60000, "Electronics"), (0, 5000, "Fashion"), (0, 1, "All")]
+
+def stable_top(scores, k):
+    # Reference: a stable sort, best first (ties keep catalog order)
+    return sorted(range(len(scores)), key=lambda i: -scores[i])[:k]
+
+@pytest.mark.parametrize("k", [1, 5, 10, 50, 500])
+def test_top_k_keeps_catalog_order_for_ties(k):
+    rng = np.random.default_rng(k)
+    scores = rng.integers(0, 5, 200).astype(np.float64) # Many ties
+    scores[rng.choice(200, 20, replace=False)] = -np.inf
+    assert top_k(scores, k).tolist() == stable_top(scores.tolist(), k)
+
+def test_top_k_rows_matches_top_k():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 4, (6, 300)).astype(np.float64)
+    scores[scores == 0] = -np.inf # Filtered out: never returned
+    for row_scores, rows in zip(scores, top_k_rows(scores, 10)):
+        expected = [i for i in stable_top(row_scores.tolist(), 10) if row_scores[i] > -np.inf]
+        assert rows.tolist() == expected
+
+def words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def bm25(docs, query, k1=1.2, b=0.75):
+    # BM25 of every doc (a list of words) for the query, term by term
+    avg_length = sum(len(doc) for doc in docs) / len(docs)
+    df = Counter(word for doc in docs for word in set(doc))
+    scores = []
+    for doc in docs:
+        tf = Counter(doc)
+        score = 0.0
+        for term in set(words(query)):
+            if tf[term]:
+                idf = math.log(1 + (len(docs) - df[term] + 0.5) / (df[term] + 0.5))
+                score += idf * tf[term] * (k1 + 1) / (tf[term] + k1 * (1 - b + b * len(doc) / avg_length))
+        scores.append(score)
+    return scores
+
+def brute_force(catalog_db, query, min_price, max_price, category, k=10):
+    # The search written as a loop over DB rows: cosine against each product's
+    # own vector, BM25 keyword boost, exact name match, rating weight, 0.4
+    # threshold, stable sort
+    conn = sqlite3.connect(catalog_db)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(
+        "SELECT p.*, e.vector AS shared_vector FROM products_vectors p "
+        "JOIN embeddings e ON e.embedding_id = p.embedding_id ORDER BY p.rowid").fetchall()
+    conn.close()
+    query_vector = HashEncoder().encode(query)
+    lexical = bm25([words(f"{row['product_name']} {row['specifications']}") for row in rows], query)
+    phrase = " ".join(words(query))
+    results = []
+    for row, keyword_score in zip(rows, lexical):
+        if not min_price <= row['price'] <= max_price or category not in ("All", row['category']):
+            continue
+        vector = decode_vector(row['shared_vector'])
+        semantic = float(np.dot(query_vector, vector) / (np.linalg.norm(query_vector) * np.linalg.norm(vector)))
+        keyword_boost = KEYWORD_WEIGHT * keyword_score
+        if phrase and f" {phrase} " in f" {' '.join(words(row['product_name']))} ":
+            keyword_boost += EXACT_MATCH_BOOST
+        if keyword_boost == 0 and semantic < 0.4:
+            continue
+        results.append((row['product_id'], (semantic + keyword_boost) * (1 + row['rating'] / 10)))
+    results.sort(key=lambda r: -r[1])
+    return results[:k]
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("filters", FILTERS)
+def test_search_matches_brute_force(backend, catalog_db, query, filters):
+    expected = brute_force(catalog_db, query, *filters)
+    found = backend.search_products(query, *filters)
+    assert [r['product_id'] for r in found] == [pid for pid, _ in expected]
+    assert [r['score'] for r in found] == pytest.approx([score for _, score in expected], abs=1e-5)
+
+def test_batch_search_matches_single_searches(backend):
+    requests = [(q, *f) for q in QUERIES for f in FILTERS]
+    for batch, single in zip(backend.search_products_batch(requests), [backend.search_products(*r) for r in requests]):
+        assert [r['product_id'] for r in batch] == [r['product_id'] for r in single]
+        assert [r['score'] for r in batch] == pytest.approx([r['score'] for r in single], abs=1e-5)
@@ -0,0 +1,83 @@
+import shutil
+import sqlite3
+import time
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from catalog import Catalog, read_catalog_version
+from response_cache import ResponseCache
+from shared_index import publish
+
+@pytest.fixture
+def client(backend, monkeypatch):
+    # Fresh, empty response cache for each test
+    monkeypatch.setattr(backend, "response_cache", ResponseCache(socket_path="", maxsize=64))
+    return TestClient(backend.app)
+
+def wait_cached(backend, size):
+    # Responses are stored off the event loop, after the reply was sent
+    deadline = time.monotonic() + 5
+    while len(backend.response_cache.backend) < size and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(backend.response_cache.backend) == size
+
+class BrokenEncoder:
+    def encode(self, texts):
+        raise RuntimeError("encoder unavailable")
+
+def test_repeat_search_is_served_from_cache(backend, client):
+    body = {"query": "samsung galaxy phone cache", "min_price": 0, "max_price": 500000}
+    first = client.post("/search", json=body)
+    wait_cached(backend, 1)
+    second = client.post("/search", json=body)
+    assert second.json() == first.json() != []
+    assert backend.response_cache.hits == 1
+
+def test_failed_search_is_not_cached(backend, client, monkeypatch):
+    search = {"query": "leather jacket while the encoder is down"}
+    chat = {"message": "gaming laptop while the encoder is down"}
+    with monkeypatch.context() as patch:
+        patch.setattr(backend, "encoder", BrokenEncoder())
+        assert client.post("/search", json=search).json() == []
+        assert "product_id" not in client.post("/chat", json=chat).json()
+    time.sleep(0.1)
+    assert len(backend.response_cache.backend) == 0
+
+    # Encoder back: real results, not a cached empty answer
+    assert len(client.post("/search", json=search).json()) > 0
+    assert "product_id" in client.post("/chat", json=chat).json()
+    assert backend.response_cache.hits == 0
+
+def publish_price_change(db_path, product_id, price):
+    # What embed_products.py does on a catalog update: new rows, new version, republish
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE products_vectors SET price = ? WHERE product_id = ?", (price, product_id))
+        conn.execute("INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('version', ?)", (uuid.uuid4().hex,))
+    conn.close()
+    publish(Catalog.from_db(db_path), db_path)
+
+def test_published_version_is_never_served_stale_responses(backend, client, catalog_db, tmp_path, monkeypatch):
+    # The backend serves a private copy of the catalog, which this test republishes
+    db_path = str(tmp_path / "catalog.db")
+    shutil.copy(catalog_db, db_path)
+    publish(Catalog.from_db(db_path), db_path)
+    for name in ("DB_PATH", "catalog", "ann_index", "live_catalog"):
+        monkeypatch.setattr(backend, name, getattr(backend, name))
+    backend.DB_PATH = db_path
+    backend.load_resources()
+
+    search = {"query": "gaming laptop", "min_price": 0, "max_price": 500000}
+    top = client.post("/search", json=search).json()[0]
+    wait_cached(backend, 1)
+    assert client.post("/search", json=search).json()[0] == top # From the cache
+    assert backend.response_cache.hits == 1
+
+    # No search runs between the publish and the next request
+    publish_price_change(db_path, top['product_id'], top['price'] + 1)
+    found = client.post("/search", json=search).json()
+    assert [r['price'] for r in found if r['product_id'] == top['product_id']] == [top['price'] + 1]
+    assert backend.response_cache.hits == 1
+    conn = sqlite3.connect(db_path)
+    assert client.get("/stats").json()["catalog_version"] == read_catalog_version(conn)
+    conn.close()
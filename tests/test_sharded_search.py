@@ -0,0 +1,61 @@
+import time
+import numpy as np
+import pytest
+from catalog import Catalog, top_k
+from hash_encoder import HashEncoder
+from hybrid_scoring import score_candidates
+from sharded_search import ShardedSearch, shard_bounds
+
+QUERIES = ["gaming laptop", "nike running shoes", "samsung galaxy", "tea", "zzqx"]
+FILTERS = [(0, 1000000, "All"), (1000, 60000, "Electronics"), (0, 5000, "Fashion"), (0, 1, "All")]
+
+def in_process(catalog, query, min_price, max_price, category, k=10):
+    candidates = np.flatnonzero(catalog.filter_mask(min_price, max_price, category))
+    rows, scores, _, _ = score_candidates(catalog, query, HashEncoder().encode(query), candidates)
+    best = top_k(scores, k)
+    return rows[best], scores[best]
+
+def test_shard_bounds_cover_every_row():
+    bounds = shard_bounds(1001, 3)
+    assert bounds[0][0] == 0 and bounds[-1][1] == 1001
+    assert all(end == start for (_, end), (start, _) in zip(bounds, bounds[1:]))
+
+def test_sharded_search_matches_in_process(catalog_db):
+    catalog = Catalog.from_db(catalog_db)
+    sharded = ShardedSearch(catalog_db, catalog, 3)
+    try:
+        for query in QUERIES:
+            for filters in FILTERS:
+                rows, scores, _, _ = sharded.search(query, HashEncoder().encode(query), *filters)
+                expected_rows, expected_scores = in_process(catalog, query, *filters)
+                assert rows.tolist() == expected_rows.tolist()
+                assert scores == pytest.approx(expected_scores, abs=1e-6)
+    finally:
+        sharded.close()
+
+@pytest.fixture
+def sharded_backend(backend, monkeypatch):
+    monkeypatch.setattr(backend, "SEARCH_SHARDS", 2)
+    monkeypatch.setattr(backend, "SHARD_MIN_ROWS", 0)
+    yield backend
+    if backend.shards is not None:
+        backend.shards.close()
+    backend.shards = None
+
+def test_backend_starts_shards_in_the_background(sharded_backend):
+    backend = sharded_backend
+    expected = {(q, f): backend.search_products(q, *f) for q in QUERIES for f in FILTERS}
+
+    catalog, _ = backend.current_catalog()
+    assert backend.current_shards(catalog) is None # Not ready yet: this search runs in-process
+    deadline = time.monotonic() + 60
+    while backend.current_shards(catalog) is None:
+        assert time.monotonic() < deadline, "shards never started"
+        time.sleep(0.05)
+    assert backend.shards.version == catalog.version
+
+    for (query, filters), results in expected.items():
+        found = backend.search_products(query, *filters)
+        assert [r['product_id'] for r in found] == [r['product_id'] for r in results]
+        assert [r['score'] for r in found] == pytest.approx([r['score'] for r in results], abs=1e-6)
+    assert backend.shards.stats()["requests"] == len(expected)
@@ -0,0 +1,35 @@
+import os
+import shutil
+import numpy as np
+from catalog import Catalog
+from shared_index import KEEP_VERSIONS, LiveCatalog, current_version, index_dir, publish
+from test_response_cache import publish_price_change
+
+def test_live_catalog_swaps_to_a_new_version(catalog_db, tmp_path):
+    db_path = str(tmp_path / "catalog.db")
+    shutil.copy(catalog_db, db_path)
+    first_version = publish(Catalog.from_db(db_path), db_path)
+    live = LiveCatalog(db_path)
+    old, _ = live.get()
+    assert live.stats()["source"] == "shared_mmap" and live.published == first_version
+    assert isinstance(old.matrix, np.memmap) # Pages shared through the OS page cache
+    assert live.get()[0] is old # Nothing published since: the same pair
+
+    product_id, price = int(old.product_ids[0]), old.rows[0]['price']
+    publish_price_change(db_path, product_id, price + 1)
+    new, _ = live.get()
+    assert new is not old and new.version != old.version
+    assert new.rows[0]['price'] == price + 1
+    assert live.stats()["swaps"] == 1 and live.published == current_version(db_path) != first_version
+    # A request still holding the old pair finishes on the old version
+    assert old.rows[0]['price'] == price
+    assert old.result(0, 1.0)['product_id'] == product_id
+
+def test_publish_keeps_the_previous_version_only(catalog_db, tmp_path):
+    db_path = str(tmp_path / "catalog.db")
+    shutil.copy(catalog_db, db_path)
+    catalog = Catalog.from_db(db_path)
+    names = [publish(catalog, db_path) for _ in range(KEEP_VERSIONS + 2)]
+    kept = sorted(d for d in os.listdir(index_dir(db_path)) if d.startswith("v"))
+    assert kept == names[-KEEP_VERSIONS:]
+    assert current_version(db_path) == names[-1]
@@ -0,0 +1,79 @@
+import json
+import os
+import sqlite3
+import sys
+import numpy as np
+
+# --- VECTOR STORAGE FORMAT ---
+# Embeddings are stored (embeddings.vector, or products_vectors.vector in older
+# DBs) as raw little-endian float32 BLOBs (384 dims -> 1536 bytes) instead of
+# json.dumps(list) text. Readers detect the format per value, so databases
+# built before the switch keep working until they are migrated with:
+#
+#   python vector_store.py migrate [product_search.db]
+
+VECTOR_DTYPE = np.dtype('<f4')
+
+def encode_vector(vector):
+    return np.asarray(vector, dtype=VECTOR_DTYPE).tobytes()
+
+def is_binary(value):
+    return isinstance(value, (bytes, memoryview))
+
+def decode_vector(value):
+    # Zero-copy view over a BLOB; legacy rows still hold JSON text
+    if is_binary(value):
+        return np.frombuffer(value, dtype=VECTOR_DTYPE)
+    return np.array(json.loads(value), dtype=VECTOR_DTYPE)
+
+def decode_matrix(values):
+    # Stack many stored vectors into one (n, dim) float32 matrix. For an all-BLOB
+    # column this is a single join + frombuffer, no per-row parsing.
+    if not values:
+        return np.empty((0, 0), dtype=np.float32)
+    if all(is_binary(v) for v in values):
+        return np.frombuffer(b"".join(values), dtype=VECTOR_DTYPE).reshape(len(values), -1)
+    return np.array([decode_vector(v) for v in values], dtype=np.float32)
+
+# --- MIGRATION ---
+def migrate_db(db_path):
+    if not os.path.exists(db_path):
+        print(f"CRITICAL ERROR: DB File not found at {db_path}")
+        return 0
+
+    size_before = os.path.getsize(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        # Shared vectors live in `embeddings`; DBs built before it keep them inline
+        tables = ["products_vectors"] + [name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'embeddings'"
+        )]
+        rows = {
+            table: conn.execute(f"SELECT rowid, vector FROM {table} WHERE typeof(vector) = 'text'").fetchall()
+            for table in tables
+        }
+        total = sum(len(r) for r in rows.values())
+        if not total:
+            print("Vectors are already stored as float32 BLOBs. Nothing to migrate.")
+            return 0
+
+        print(f"Migrating {total} JSON vectors to float32 BLOBs...")
+        with conn: # One transaction: either every row is converted or none are
+            for table, table_rows in rows.items():
+                conn.executemany(
+                    f"UPDATE {table} SET vector = ? WHERE rowid = ?",
+                    ((encode_vector(json.loads(vector)), rowid) for rowid, vector in table_rows),
+                )
+        conn.execute("VACUUM") # Give the freed pages back to the filesystem
+    finally:
+        conn.close()
+
+    size_after = os.path.getsize(db_path)
+    print(f"Migration Done! {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+    return total
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: python vector_store.py migrate [path/to/product_search.db]")
+        sys.exit(1)
+    migrate_db(sys.argv[2] if len(sys.argv) > 2 else 'product_search.db')